@@ -1,7 +1,24 @@
 import streamlit as st
 import os
-from modules import input_data, calculate, out_data, visual_out_data, analiz_if
+import importlib
 from utils import utils
+from utils.cache import calculation_cache
+from utils import profiling, jobs
+from modules.project_model import session_footprint
+
+# Модули страниц загружаются только при первом открытии страницы,
+# вместе с их тяжелыми зависимостями (plotly, scipy, openpyxl)
+PAGES = {
+    "Ввод данных": "modules.input_data",
+    "Расчеты": "modules.calculate",
+    "Результаты": "modules.out_data",
+    "Визуализация": "modules.visual_out_data",
+    "Анализ чувствительности": "modules.analiz_if",
+    "Сценарии": "modules.scenario_compare",
+}
+
+def load_page(page):
+    return importlib.import_module(PAGES[page])
 
 def main():
     st.set_page_config(page_title="Расчет экономической эффективности инвестиционных IT-проектов и ЗНИ", layout="wide")
@@ -14,33 +31,61 @@ def main():
         st.success(f"Создан тестовый файл: {test_file}")
 
     # Создаем боковую панель для навигации
-    page = st.sidebar.selectbox(
-        "Выберите раздел",
-        ["Ввод данных", "Расчеты", "Результаты", "Визуализация", "Анализ чувствительности"]
-    )
-
-    if page == "Ввод данных":
-        input_data.render()
-    elif page == "Расчеты":
-        calculate.render()
-    elif page == "Результаты":
-        out_data.render()
-    elif page == "Визуализация":
-        visual_out_data.render()
-    elif page == "Анализ чувствительности":
-        analiz_if.render()
+    page = st.sidebar.selectbox("Выберите раздел", list(PAGES))
+    profile = st.sidebar.checkbox("Профилирование", value=profiling.ENABLED)
+    with profiling.run(page, enabled=profile) as recorder:
+        with profiling.span('page.import'):
+            module = load_page(page)
+        with profiling.span('page.render'):
+            module.render()
 
     # Добавляем кнопку для сохранения результатов в Excel
     if 'calculation_results' in st.session_state:
+        from utils import export
         st.sidebar.header("Экспорт результатов")
-        if st.sidebar.button("Сохранить результаты в Excel"):
-            results_data = utils.save_to_excel(st.session_state['project_data'])
+        project_data = st.session_state['project_data']
+        results = st.session_state['calculation_results']
+        export_format = st.sidebar.selectbox("Формат", ["Excel", "CSV"])
+        # Файл формируется один раз по нажатию кнопки скачивания
+        if export_format == "Excel":
             st.sidebar.download_button(
                 label="Скачать результаты",
-                data=results_data,
+                data=lambda: export.results_xlsx_file(project_data, results),
                 file_name="project_results.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
             )
+        else:
+            st.sidebar.download_button(
+                label="Скачать результаты",
+                data=lambda: results['df'].to_csv(),
+                file_name="project_results.csv",
+                mime="text/csv"
+            )
+
+    stats = calculation_cache.stats()
+    st.sidebar.caption(f"Кэш расчетов: {stats['entries']} записей, попаданий {stats['hits'] + stats['disk_hits']}, промахов {stats['misses']}")
+
+    # Память сессии; результаты расчета разделяются с другими сессиями и учитываются отдельно
+    footprint = session_footprint(st.session_state)
+    shared = footprint['Общий']
+    st.sidebar.caption(f"Память сессии: {footprint.loc[~shared, 'Байт'].sum() / 1024:.0f} КБ, "
+                       f"общие результаты расчета: {footprint.loc[shared, 'Байт'].sum() / 1024:.0f} КБ")
+
+    # Выполняющиеся фоновые задачи
+    active = [job for job in jobs.list_jobs() if job['state'] in (jobs.PENDING, jobs.RUNNING)]
+    if active:
+        st.sidebar.caption("Фоновые задачи: " + ", ".join(
+            f"{job.get('title') or job['id']} ({job.get('progress', 0.0):.0%})" for job in active))
+
+    # Замеры этапов последнего прогона страницы
+    if recorder is not None:
+        with st.sidebar.expander("Профилирование", expanded=True):
+            st.write(f"**Страница:** {recorder.seconds * 1e3:.1f} мс")
+            st.dataframe(recorder.table(), hide_index=True)
+            if recorder.counters:
+                st.json(recorder.counters)
+            st.write("**Память сессии по ключам:**")
+            st.dataframe(footprint, hide_index=True)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,45 @@
+import json
+import os
+
+DEFAULT_THRESHOLD = 0.25
+
+def load(path):
+    """
+    Сохраненные результаты замеров {имя: секунды}; пустой словарь, если путь не задан.
+    Базовые результаты зависят от машины и в репозитории не хранятся: их нужно
+    сначала сохранить ключом --save-baseline, поэтому отсутствующий файл - ошибка.
+    """
+    if not path:
+        return {}
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Нет файла базовых результатов {path}; создайте его ключом --save-baseline")
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['results']
+
+def save(path, results, meta=None):
+    """Сохраняет результаты замеров в JSON"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'meta': meta or {}, 'results': results}, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Сравнение с базовыми замерами. Возвращает список регрессий
+    (имя, базовое время, текущее время, относительное изменение) для замеров,
+    ставших медленнее более чем на threshold.
+    """
+    regressions = []
+    for name, seconds in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        change = seconds / base - 1
+        if change > threshold:
+            regressions.append((name, base, seconds, change))
+    return regressions
+
+def report(regressions):
+    for name, base, seconds, change in regressions:
+        print(f"РЕГРЕССИЯ {name}: {base * 1e3:.2f} мс -> {seconds * 1e3:.2f} мс (+{change:.0%})")
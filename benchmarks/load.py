@@ -0,0 +1,285 @@
+"""
+Нагрузочный тест страниц приложения: N одновременных сессий без браузера.
+
+Каждая сессия - streamlit.testing AppTest с app.py в отдельном процессе (AppTest
+хранит состояние Runtime в глобальных переменных процесса и не работает из
+нескольких потоков). Процессы прогреваются, дожидаются друг друга на барьере и
+проходят страницы "Ввод данных" -> "Расчеты" -> "Результаты" -> "Визуализация" ->
+"Анализ чувствительности" с загрузкой книги Excel, изменением ползунков и
+скачиванием результатов. Для каждого уровня одновременности выводятся p50/p95/p99
+времени перезапуска по страницам, загрузка CPU и память процессов и сессии:
+
+    python benchmarks/load.py --sessions 1 2 4 8 --output load.json
+    python benchmarks/load.py --sessions 4 --baseline benchmarks/load_baseline.json
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import platform
+import queue
+import sys
+import tempfile
+import threading
+import time
+import traceback
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import baseline
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+PERCENTILES = (50, 95, 99)
+DOWNLOAD = "Скачивание"
+DOWNLOAD_FILE = "Скачивание: файл Excel"
+
+def _widget(elements, label):
+    """Виджет по началу подписи"""
+    for element in elements:
+        if element.label.startswith(label):
+            return element
+    raise LookupError(f"Не найден элемент: {label}")
+
+def _page(name):
+    return lambda at, context: at.sidebar.selectbox[0].set_value(name)
+
+def _upload(at, context):
+    return at.file_uploader[0].set_value(("project.xlsx", context['workbook'], XLSX_MIME))
+
+def _download(at, context):
+    return at.sidebar.get('download_button')[0].click()
+
+# Шаги сессии: (страница, действие, изменение виджетов перед перезапуском).
+# Значения ползунков зависят от номера прохода, чтобы каждый проход менял данные
+FLOW = [
+    ("Ввод данных", "открытие", None),
+    ("Ввод данных", "срок проекта",
+     lambda at, context: _widget(at.slider, "Срок проекта").set_value(5 + context['round'] % 5)),
+    ("Ввод данных", "сохранение", lambda at, context: _widget(at.button, "Сохранить данные").click()),
+    ("Ввод данных", "загрузка Excel", _upload),
+    ("Расчеты", "открытие", _page("Расчеты")),
+    ("Расчеты", "отчет проверки", lambda at, context: at.toggle(key='validation_details').set_value(True)),
+    ("Результаты", "открытие", _page("Результаты")),
+    ("Визуализация", "открытие", _page("Визуализация")),
+    ("Визуализация", "число категорий",
+     lambda at, context: _widget(at.slider, "Число категорий").set_value(3 + context['round'] % 3)),
+    ("Анализ чувствительности", "открытие", _page("Анализ чувствительности")),
+    ("Анализ чувствительности", "изменение выручки",
+     lambda at, context: _widget(at.slider, "Изменение выручки").set_value(10 + context['round'])),
+    ("Анализ чувствительности", "изменение ставки",
+     lambda at, context: _widget(at.slider, "Изменение ставки").set_value(1.0)),
+    (DOWNLOAD, "кнопка", _download),
+    ("Ввод данных", "возврат", _page("Ввод данных")),
+]
+
+def flow(n_lines):
+    """
+    Шаги сессии для проекта с n_lines строками затрат: ползунок числа категорий
+    тепловой карты есть, только если категорий больше charts.HEATMAP_TOP_N
+    """
+    from modules import charts
+    return [step for step in FLOW if step[1] != "число категорий" or n_lines > charts.HEATMAP_TOP_N]
+
+def workbook(index, seed, horizon, n_lines):
+    """Книга Excel синтетического проекта в формате приложения"""
+    from utils import export, synthetic
+    buffer = io.BytesIO()
+    export.write_results_xlsx(buffer, synthetic.generate_project(index, seed, horizon=horizon, n_lines=n_lines))
+    return buffer.getvalue()
+
+def rss_bytes():
+    """Текущий резидентный размер процесса (Linux) или пиковый, если текущий недоступен"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def session_bytes(at):
+    """Память session_state сессии без разделяемых результатов расчета"""
+    from modules.project_model import session_footprint
+    footprint = session_footprint(at.session_state)
+    return int(footprint.loc[~footprint['Общий'], 'Байт'].sum())
+
+def run_session(at, context, rounds, records, errors):
+    """Проход сессии по страницам; время каждого перезапуска добавляется в records"""
+    from utils import export
+    steps = flow(context['lines'])
+    for n in range(rounds):
+        context['round'] = n
+        for page, step, action in steps:
+            if action is not None:
+                action(at, context)
+            started = time.perf_counter()
+            at.run()
+            records.append((page, step, time.perf_counter() - started))
+            if at.exception:
+                errors.append(f"{page} / {step}: {at.exception[0].message}")
+            if page == DOWNLOAD:
+                # Файл формируется так же, как при скачивании из браузера
+                state = at.session_state
+                started = time.perf_counter()
+                export.results_xlsx_file(state['project_data'], state['calculation_results'])
+                records.append((DOWNLOAD_FILE, "формирование", time.perf_counter() - started))
+
+def session_process(context, rounds, timeout, barrier, results):
+    """
+    Сессия в отдельном процессе: прогрев на своем проекте (импорт страниц и их
+    зависимостей не входит в замеры), ожидание остальных сессий на барьере и
+    проход по страницам. Итог - словарь с замерами, ошибками, CPU и памятью в results.
+    """
+    from streamlit.testing.v1 import AppTest
+    result = {'records': [], 'errors': [], 'cpu': 0.0, 'rss_before': 0, 'rss': 0}
+    try:
+        try:
+            warmup = AppTest.from_file(os.path.join(ROOT, 'app.py'), default_timeout=timeout)
+            run_session(warmup, dict(context, workbook=context['warmup']), 1, [], [])
+            at = AppTest.from_file(os.path.join(ROOT, 'app.py'), default_timeout=timeout)
+            result['rss_before'] = rss_bytes()
+        except Exception:
+            # Без прерывания барьера остальные сессии и главный процесс ждали бы эту сессию бесконечно
+            barrier.abort()
+            raise
+        try:
+            barrier.wait()
+        except threading.BrokenBarrierError:
+            result['errors'].append("Уровень прерван: не все сессии запустились")
+            return
+        cpu = time.process_time()
+        run_session(at, context, rounds, result['records'], result['errors'])
+        result['cpu'] = time.process_time() - cpu
+        result['rss'] = rss_bytes()
+        result['memory'] = session_bytes(at)
+    except Exception:
+        result['errors'].append(traceback.format_exc(limit=3))
+    finally:
+        results.put(result)
+
+def run_level(n_sessions, offset, args):
+    """Одновременный запуск n_sessions сессий в отдельных процессах; сводка времени, CPU и памяти уровня"""
+    ctx = multiprocessing.get_context('spawn')
+    barrier = ctx.Barrier(n_sessions + 1)
+    results = ctx.Queue()
+    # Прогрев всех сессий идет на проекте 0, поэтому замеряемые проекты не берутся из кэша
+    warmup = workbook(0, args.seed, args.horizon, args.lines)
+    processes = [ctx.Process(target=session_process, daemon=True, args=(
+        {'workbook': workbook(offset + k, args.seed, args.horizon, args.lines), 'warmup': warmup,
+         'lines': args.lines}, args.rounds, args.timeout, barrier, results))
+        for k in range(n_sessions)]
+    # Предел ожидания: все перезапуски прохода (и прогрева) по args.timeout
+    limit = args.timeout * len(flow(args.lines)) * (args.rounds + 1)
+    errors = []
+    for process in processes:
+        process.start()
+    try:
+        barrier.wait(timeout=limit)
+    except threading.BrokenBarrierError:
+        errors.append("Не все сессии запустились")
+    wall = time.perf_counter()
+    sessions = []
+    for _ in processes:
+        try:
+            sessions.append(results.get(timeout=limit))
+        except queue.Empty:
+            errors.append("Сессия не завершилась за отведенное время")
+            break
+    wall = time.perf_counter() - wall
+    for process in processes:
+        process.join(timeout=10)
+        if process.is_alive():
+            process.terminate()
+
+    pages = {}
+    for session in sessions:
+        errors.extend(session['errors'])
+        for page, step, seconds in session['records']:
+            pages.setdefault(page, []).append(seconds)
+    completed = [session for session in sessions if session['records']]
+    memory = [session['memory'] for session in completed if 'memory' in session]
+    n_records = sum(len(session['records']) for session in completed)
+    return {
+        'sessions': n_sessions,
+        'pages': {page: np.percentile(times, PERCENTILES).tolist() + [len(times)] for page, times in pages.items()},
+        'seconds': wall,
+        'reruns_per_second': n_records / wall if wall else 0.0,
+        'cpu': sum(session['cpu'] for session in completed) / wall / (os.cpu_count() or 1) if wall else 0.0,
+        'rss': sum(session['rss'] for session in completed),
+        'rss_per_session': float(np.mean([max(session['rss'] - session['rss_before'], 0) for session in completed]))
+                           if completed else 0.0,
+        'session_memory': float(np.mean(memory)) if memory else 0.0,
+        'errors': errors
+    }
+
+def report(level):
+    print(f"\nСессий: {level['sessions']}, время {level['seconds']:.1f} с, "
+          f"{level['reruns_per_second']:.1f} перезапусков/с, CPU {level['cpu']:.0%} ({os.cpu_count()} ядер)")
+    print(f"Память процессов сессий {level['rss'] / 2**20:.0f} МБ, прирост за проход {level['rss_per_session'] / 2**20:.1f} МБ, "
+          f"session_state {level['session_memory'] / 1024:.0f} КБ")
+    print(f"{'Страница':<26}" + "".join(f"{f'p{q}':>10}" for q in PERCENTILES) + f"{'шт.':>6}")
+    for page, values in level['pages'].items():
+        print(f"{page:<26}" + "".join(f"{value * 1e3:8.0f}мс" for value in values[:-1]) + f"{values[-1]:6d}")
+    for error in level['errors'][:5]:
+        print(f"ОШИБКА {error}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест страниц при одновременных сессиях")
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 2, 4, 8], help="уровни одновременности")
+    parser.add_argument('--rounds', type=int, default=2, help="проходов по страницам в каждой сессии")
+    parser.add_argument('--horizon', type=int, default=5, help="срок проектов в годах")
+    parser.add_argument('--lines', type=int, default=50, help="число строк переменных затрат")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timeout', type=float, default=120, help="предел времени одного перезапуска, с")
+    parser.add_argument('--output', help="файл JSON для результатов")
+    parser.add_argument('--baseline', help="файл JSON с базовыми результатами для сравнения")
+    parser.add_argument('--threshold', type=float, default=baseline.DEFAULT_THRESHOLD)
+    parser.add_argument('--save-baseline', help="сохранить результаты как базовые в указанный файл")
+    args = parser.parse_args()
+    reference = baseline.load(args.baseline)
+    from modules import charts
+    if args.lines <= charts.HEATMAP_TOP_N:
+        print(f"Строк затрат не больше {charts.HEATMAP_TOP_N}: шаг \"число категорий\" пропускается")
+
+    # База данных, кэш на диске и тестовый файл приложения - во временном каталоге;
+    # процессы сессий наследуют переменные окружения и текущий каталог
+    workdir = tempfile.mkdtemp(prefix='economic_load_')
+    os.environ.setdefault('ECONOMIC_DB_PATH', os.path.join(workdir, 'project_data.db'))
+    os.chdir(workdir)
+
+    results, levels = {}, []
+    offset = 1
+    for n_sessions in args.sessions:
+        # Каждая сессия загружает свой проект, поэтому расчеты не берутся из кэша других уровней
+        level = run_level(n_sessions, offset, args)
+        offset += n_sessions
+        levels.append(level)
+        report(level)
+        for page, values in level['pages'].items():
+            for q, value in zip(PERCENTILES, values):
+                results[f"load[sessions={n_sessions}]:{page}:p{q}"] = value
+
+    meta = {'python': platform.python_version(), 'machine': platform.machine(), 'cpus': os.cpu_count(),
+            'rounds': args.rounds, 'horizon': args.horizon, 'lines': args.lines,
+            'levels': [{key: value for key, value in level.items() if key not in ('pages', 'errors')}
+                       for level in levels]}
+    if args.output:
+        baseline.save(args.output, results, meta)
+    if args.save_baseline:
+        baseline.save(args.save_baseline, results, meta)
+
+    regressions = baseline.compare(results, reference, args.threshold)
+    baseline.report(regressions)
+    failed = any(level['errors'] for level in levels)
+    sys.exit(1 if regressions or failed else 0)
+
+if __name__ == "__main__":
+    main()
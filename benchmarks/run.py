@@ -0,0 +1,180 @@
+"""
+Набор замеров производительности горячих путей расчета без запуска Streamlit.
+
+    python benchmarks/run.py --output bench.json
+    python benchmarks/run.py --baseline benchmarks/baseline.json --threshold 0.2
+    python benchmarks/run.py --quick --filter irr
+
+Каждый замер - медиана времени одного вызова по нескольким повторам.
+При регрессии больше порога относительно базовых результатов код возврата 1.
+Базовые результаты зависят от машины и не хранятся в репозитории: сначала
+сохраните их ключом --save-baseline на той же машине.
+"""
+import argparse
+import io
+import os
+import platform
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+import baseline
+from modules import engine, portfolio, irr, sensitivity, goal_seek, sweep, scenarios, validation
+from utils import utils
+
+HORIZONS = [1, 5, 15, 180]
+LINES = [7, 1000, 10000]
+PROJECTS = [1, 1000, 100000]
+QUICK_HORIZONS = [5, 15]
+QUICK_LINES = [7, 1000]
+QUICK_PROJECTS = [1, 1000]
+
+def make_project(horizon, n_lines, seed=0):
+    """Синтетический проект в формате project_data"""
+    rng = np.random.default_rng(seed)
+    years = range(1, horizon + 1)
+    yearly_data = pd.DataFrame({
+        'Выручка': rng.integers(1000000, 5000000, horizon),
+        'Фиксированные операционные затраты': rng.integers(500000, 2000000, horizon),
+        'Капитальные затраты': rng.integers(100000, 1000000, horizon)
+    }, index=years)
+    var_costs = pd.DataFrame({
+        'Коэффициент': rng.choice(['K1', 'K2', 'K3', 'K4', 'K5'], n_lines),
+        'Количество': rng.integers(1, 10, n_lines),
+        'Ставка': rng.integers(50000, 200000, n_lines),
+        'Количество лет': rng.integers(1, max(horizon, 2), n_lines),
+        'Процент индексирования': rng.uniform(0.01, 0.1, n_lines)
+    }, index=[f"Специалист {i}" for i in range(n_lines)])
+    return {
+        'project_duration': horizon,
+        'impact_duration': min(horizon, 3),
+        'discount_rate': 0.1,
+        'yearly_data': yearly_data.to_dict(),
+        'coefficients': {'K1': 1.0, 'K2': 1.2, 'K3': 1.5, 'K4': 1.3, 'K5': 1.1},
+        'var_costs': var_costs.to_dict()
+    }
+
+def measure(func, repeat, min_time=0.05):
+    """Медиана времени одного вызова; быстрые функции вызываются пачками"""
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time or loops >= 1_000_000:
+            break
+        loops *= 10
+    times = [elapsed / loops]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        times.append((time.perf_counter() - started) / loops)
+    return statistics.median(times)
+
+def cases(quick):
+    """Замеры: (имя, функция без аргументов)"""
+    horizons = QUICK_HORIZONS if quick else HORIZONS
+    lines = QUICK_LINES if quick else LINES
+    projects = QUICK_PROJECTS if quick else PROJECTS
+
+    for horizon in horizons:
+        for n_lines in lines:
+            project_data = make_project(horizon, n_lines)
+            var_costs = engine.prepare_var_costs(project_data['var_costs'], horizon)
+            yield (f"var_costs[h={horizon},lines={n_lines}]",
+                   lambda v=var_costs, c=project_data['coefficients'], h=horizon: engine.calculate_var_costs(v, c, h))
+            yield (f"calculate_project[h={horizon},lines={n_lines}]",
+                   lambda p=project_data: engine.calculate_project(p))
+            results = engine.calculate_project(project_data)
+            yield (f"validate_project[h={horizon},lines={n_lines}]",
+                   lambda r=results, p=project_data: validation.validate_project(r, p))
+
+    rng = np.random.default_rng(0)
+    for horizon in horizons:
+        cf = pd.Series(rng.normal(2e5, 3e5, horizon))
+        cf.iloc[0] = -1e6
+        yield f"calculate_npv[h={horizon}]", lambda cf=cf, h=horizon: engine.calculate_npv(cf, 0.1, h)
+        yield f"calculate.calculate_irr[h={horizon}]", lambda cf=cf: engine.calculate_irr(cf)
+
+    for n_projects in projects:
+        matrix = rng.normal(2e5, 3e5, (n_projects, 15))
+        matrix[:, 0] = -rng.uniform(1e5, 2e6, n_projects)
+        rates = rng.uniform(0.05, 0.2, n_projects)
+        yield (f"evaluate_portfolio[projects={n_projects}]",
+               lambda m=matrix, r=rates: portfolio.evaluate_portfolio(m, r, 15, np.ones(len(m))))
+        yield f"solve_irr[projects={n_projects}]", lambda m=matrix: irr.solve_irr(m)
+        components = {col: rng.uniform(1e5, 1e6, (n_projects, 15)) for col in engine.CASH_FLOW_COMPONENTS}
+        yield (f"break_even_table[projects={n_projects}]",
+               lambda c=components, r=rates: goal_seek.break_even_table(c, r, 15, target_irr=0.15))
+
+    for n_lines in lines:
+        project_data = make_project(15, n_lines)
+        deltas = {f"Сценарий {k}": {'multipliers': {'Выручка': 1 + k / 1000}, 'coefficients': {'K1': 1 + k / 100},
+                                    'var_costs': {'Количество': {'Специалист 0': k}}} for k in range(100)}
+        yield (f"evaluate_scenarios[h=15,lines={n_lines},scenarios=100]",
+               lambda p=project_data, d=deltas: scenarios.evaluate_scenarios({'P': p}, {'P': d}))
+
+    for horizon in horizons:
+        results = engine.calculate_project(make_project(horizon, 7))
+        model = sensitivity.build_sensitivity_model(results['df'], 0.1, min(horizon, 3))
+        changes = {param: 10 for param in engine.CASH_FLOW_COMPONENTS}
+        yield (f"sensitivity_model[h={horizon}]",
+               lambda df=results['df'], h=horizon: sensitivity.build_sensitivity_model(df, 0.1, min(h, 3)))
+        yield (f"sensitivity_update[h={horizon}]",
+               lambda m=model: (sensitivity.scenario_npv(m, changes, 0.12),
+                                sensitivity.tornado(m, changes, 2.0, 0.12, 0.0)))
+        axes = {'Выручка': sweep.axis_values(0.5, 1.5, 101),
+                'Переменные операционные затраты': sweep.axis_values(0.5, 1.5, 101),
+                sweep.RATE: sweep.axis_values(0.05, 0.15, 21)}
+        yield (f"sweep[h={horizon},101x101x21]",
+               lambda df=results['df'], h=horizon: sweep.sweep(df, 0.1, min(h, 3), axes, with_irr=True, parallel=False))
+
+    for n_lines in lines:
+        project_data = make_project(5, n_lines)
+        results = engine.calculate_project(project_data)
+        workbook = utils.save_to_excel(project_data, results=results)
+        yield (f"save_to_excel[lines={n_lines}]",
+               lambda p=project_data, r=results: utils.save_to_excel(p, results=r))
+        yield f"load_from_excel[lines={n_lines}]", lambda w=workbook: utils.load_from_excel(io.BytesIO(w))
+
+def main():
+    parser = argparse.ArgumentParser(description="Замеры производительности расчетов")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--quick', action='store_true', help="только малые масштабы")
+    parser.add_argument('--filter', default='', help="выполнять только замеры, содержащие подстроку")
+    parser.add_argument('--output', help="файл JSON для результатов")
+    parser.add_argument('--baseline', help="файл JSON с базовыми результатами для сравнения")
+    parser.add_argument('--threshold', type=float, default=baseline.DEFAULT_THRESHOLD)
+    parser.add_argument('--save-baseline', help="сохранить результаты как базовые в указанный файл")
+    args = parser.parse_args()
+    reference = baseline.load(args.baseline)
+
+    results = {}
+    for name, func in cases(args.quick):
+        if args.filter not in name:
+            continue
+        results[name] = measure(func, args.repeat)
+        print(f"{name:<48} {results[name] * 1e3:12.3f} мс")
+
+    meta = {'python': platform.python_version(), 'machine': platform.machine(),
+            'numpy': np.__version__, 'pandas': pd.__version__, 'repeat': args.repeat}
+    if args.output:
+        baseline.save(args.output, results, meta)
+    if args.save_baseline:
+        baseline.save(args.save_baseline, results, meta)
+
+    regressions = baseline.compare(results, reference, args.threshold)
+    baseline.report(regressions)
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Время холодного импорта модулей приложения.
+
+Каждый модуль импортируется в отдельном чистом интерпретаторе; берется медиана
+нескольких запусков. Результаты пишутся в JSON и сравниваются с базовыми:
+
+    python benchmarks/startup.py --output startup.json --baseline benchmarks/startup_baseline.json
+    python benchmarks/startup.py --save-baseline benchmarks/startup_baseline.json
+"""
+import argparse
+import os
+import platform
+import statistics
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import baseline
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = [
+    'app',
+    'utils.utils',
+    'utils.cache',
+    'modules.engine',
+    'modules.input_data',
+    'modules.calculate',
+    'modules.out_data',
+    'modules.visual_out_data',
+    'modules.analiz_if',
+]
+SNIPPET = "import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+
+def cold_import_time(module, repeat):
+    """Медиана времени импорта модуля в новом процессе, секунды"""
+    times = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', SNIPPET.format(module=module)],
+                                cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        times.append(float(output.strip().splitlines()[-1]))
+    return statistics.median(times)
+
+def main():
+    parser = argparse.ArgumentParser(description="Замер времени холодного импорта модулей")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help="файл JSON для результатов")
+    parser.add_argument('--baseline', help="файл JSON с базовыми результатами для сравнения")
+    parser.add_argument('--threshold', type=float, default=baseline.DEFAULT_THRESHOLD)
+    parser.add_argument('--save-baseline', help="сохранить результаты как базовые в указанный файл")
+    parser.add_argument('modules', nargs='*', default=MODULES)
+    args = parser.parse_args()
+    reference = baseline.load(args.baseline)
+
+    results = {}
+    for module in args.modules:
+        results[f"import:{module}"] = cold_import_time(module, args.repeat)
+        print(f"{module:<28} {results[f'import:{module}'] * 1e3:8.1f} мс")
+
+    meta = {'python': platform.python_version(), 'machine': platform.machine(), 'repeat': args.repeat}
+    if args.output:
+        baseline.save(args.output, results, meta)
+    if args.save_baseline:
+        baseline.save(args.save_baseline, results, meta)
+
+    regressions = baseline.compare(results, reference, args.threshold)
+    baseline.report(regressions)
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
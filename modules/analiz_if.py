@@ -2,19 +2,56 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
-from modules.calculate import calculate_npv
+from modules.sensitivity import build_sensitivity_model, scenario_npv, tornado
+from modules import monte_carlo, charts, goal_seek, sweep
+from modules.engine import CASH_FLOW_COMPONENTS
+from modules.calculate import get_results
+from utils import profiling, jobs, utils
+from utils.cache import project_hash
 
 def render():
     st.header("Анализ чувствительности")
 
-    if 'calculation_results' not in st.session_state:
-        st.warning("Пожалуйста, сначала выполните расчеты на странице 'Расчеты'")
+    if 'project_data' not in st.session_state:
+        st.warning("Пожалуйста, сначала введите данные на странице 'Ввод данных' и сохраните их.")
         return
 
-    results = st.session_state['calculation_results']
-    df = results['df'].copy()
+    results = get_results(st.session_state['project_data'])
+    mode = st.radio("Режим анализа", ["Сценарий", "Поиск цели", "Таблицы данных", "Моделирование Монте-Карло"],
+                    horizontal=True)
+    if mode == "Сценарий":
+        with profiling.span('analiz_if.scenario'):
+            render_scenario(results)
+    elif mode == "Поиск цели":
+        with profiling.span('analiz_if.goal_seek'):
+            render_goal_seek(results)
+    elif mode == "Таблицы данных":
+        with profiling.span('analiz_if.data_tables'):
+            render_data_tables(results)
+    else:
+        with profiling.span('analiz_if.monte_carlo'):
+            render_monte_carlo(results)
+
+def get_sensitivity_model(results):
+    """
+    Модель чувствительности, построенная вместе с результатами расчета.
+    Результаты из общего кэша не изменяются: если модели в них нет, она строится
+    и хранится в сессии по ключу расчета.
+    """
+    if 'sensitivity' in results:
+        return results['sensitivity']
+    key = st.session_state.get('calculation_key')
+    cached = st.session_state.get('sensitivity_model')
+    if cached is None or cached[0] != key:
+        project_data = st.session_state['project_data']
+        cached = (key, build_sensitivity_model(
+            results['df'], project_data['discount_rate'], project_data['impact_duration'], times=results.get('times')))
+        st.session_state['sensitivity_model'] = cached
+    return cached[1]
+
+def render_scenario(results):
+    model = get_sensitivity_model(results)
     original_npv = results['npv']
-    impact_duration = int(st.session_state['project_data']['impact_duration'])
 
     st.subheader("Изменение параметров")
 
@@ -26,20 +63,13 @@ def render():
         'Переменные операционные затраты': st.slider("Изменение переменных операционных затрат (%)", -50, 50, 0),
         'Ставка дисконтирования': st.slider("Изменение ставки дисконтирования (процентные пункты)", -5.0, 5.0, 0.0, step=0.1)
     }
+    rate_change = params.pop('Ставка дисконтирования')
+    new_rate = model['discount_rate'] + rate_change / 100
+    st.write(f"Новая ставка дисконтирования: {new_rate:.2%}")
 
-    # Применяем изменения к DataFrame
-    for param, change in params.items():
-        if param != 'Ставка дисконтирования':
-            df[param] *= (1 + change / 100)
-        else:
-            new_rate = st.session_state['project_data']['discount_rate'] + change / 100
-            st.write(f"Новая ставка дисконтирования: {new_rate:.2%}")
-
-    # Пересчитываем NPV
-    df['CFO'] = df['Выручка'] - df['Фиксированные операционные затраты'] - df['Переменные операционные затраты']
-    df['CFI'] = -df['Капитальные затраты']
-    df['CF'] = df['CFO'] + df['CFI']
-    new_npv = calculate_npv(df['CF'], new_rate, impact_duration)
+    # NPV сценария - скалярное произведение предрасчитанных составляющих на множители
+    with profiling.span('sensitivity.scenario'):
+        new_npv = scenario_npv(model, params, new_rate)
 
     # Отображаем результаты
     st.subheader("Результаты анализа")
@@ -56,15 +86,8 @@ def render():
     st.plotly_chart(fig)
 
     # Диаграмма торнадо
-    tornado_data = []
-    for param, change in params.items():
-        if param != 'Ставка дисконтирования':
-            low_npv = calculate_npv(df['CF'] * (1 - abs(change) / 100), new_rate, impact_duration)
-            high_npv = calculate_npv(df['CF'] * (1 + abs(change) / 100), new_rate, impact_duration)
-        else:
-            low_npv = calculate_npv(df['CF'], new_rate - abs(change) / 100, impact_duration)
-            high_npv = calculate_npv(df['CF'], new_rate + abs(change) / 100, impact_duration)
-        tornado_data.append((param, low_npv - original_npv, high_npv - original_npv))
+    with profiling.span('sensitivity.tornado'):
+        tornado_data = tornado(model, params, rate_change, new_rate, original_npv)
 
     tornado_data.sort(key=lambda x: abs(x[2] - x[1]), reverse=True)
 
@@ -79,5 +102,214 @@ def render():
                               xaxis_title='Изменение NPV')
     st.plotly_chart(fig_tornado)
 
+def render_goal_seek(results):
+    project_data = st.session_state['project_data']
+    st.subheader("Поиск цели")
+    st.write("Множитель к исходным значениям составляющей, при котором достигается цель, "
+             "при неизменных остальных параметрах.")
+    col1, col2 = st.columns(2)
+    with col1:
+        target_npv = st.number_input("Целевое NPV", value=0.0, step=100000.0)
+    with col2:
+        target_irr = st.number_input("Целевой IRR", value=float(project_data['discount_rate']), step=0.01, format="%.4f")
+
+    times = results['times']
+    table = goal_seek.break_even_table(results['df'], project_data['discount_rate'], project_data['impact_duration'],
+                                       target_npv, times=times, target_irr=target_irr, irr_times=times - times[0])
+    row = table.iloc[0]
+    summary = pd.DataFrame({
+        'Множитель (NPV)': [row[param] for param in CASH_FLOW_COMPONENTS],
+        'Множитель (IRR)': [row[f"{param} (IRR)"] for param in CASH_FLOW_COMPONENTS]
+    }, index=CASH_FLOW_COMPONENTS)
+    summary['Изменение для NPV, %'] = (summary['Множитель (NPV)'] - 1) * 100
+    summary['Изменение для IRR, %'] = (summary['Множитель (IRR)'] - 1) * 100
+    st.dataframe(summary)
+
+    rate = row[goal_seek.RATE]
+    if np.isnan(rate):
+        st.write("**Ставка дисконтирования для целевого NPV:** не существует")
+    else:
+        st.write(f"**Ставка дисконтирования для целевого NPV:** {rate:.2%}")
+
+def render_data_tables(results):
+    project_data = st.session_state['project_data']
+    discount_rate = float(project_data['discount_rate'])
+    st.subheader("Таблицы данных")
+    st.write("NPV и IRR на полной сетке значений параметров: для выручки и затрат задаются множители "
+             "к исходным значениям, для ставки дисконтирования - сами ставки.")
+    params = st.multiselect("Параметры сетки", sweep.PARAMETERS, default=['Выручка', sweep.RATE])
+    if len(params) < 2:
+        st.info("Выберите не меньше двух параметров")
+        return
+
+    defaults = sweep.default_axes(discount_rate)
+    axes = {}
+    for param in params:
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            start = st.number_input(f"{param}: от", value=float(defaults[param][0]), format="%.4f",
+                                    key=f"sweep_start_{param}")
+        with col2:
+            stop = st.number_input(f"{param}: до", value=float(defaults[param][-1]), format="%.4f",
+                                   key=f"sweep_stop_{param}")
+        with col3:
+            n_points = st.number_input(f"{param}: точек", min_value=2, max_value=1001,
+                                       value=21 if param == sweep.RATE else 101, key=f"sweep_points_{param}")
+        axes[param] = sweep.axis_values(start, stop, n_points)
+    size = int(np.prod([len(values) for values in axes.values()], dtype=np.int64))
+    with_irr = st.checkbox("Рассчитывать IRR", value=True)
+    st.caption(f"Точек сетки: {size:,}".replace(',', ' '))
+
+    if st.button("Рассчитать сетку"):
+        bar = st.progress(0.0, text="IRR на сетке") if with_irr else None
+        progress = (lambda done, total: bar.progress(done / total, text="IRR на сетке")) if with_irr else None
+        with profiling.span('sweep.grid'):
+            st.session_state['sweep_results'] = sweep.sweep(
+                results['df'], discount_rate, project_data['impact_duration'], axes, times=results.get('times'),
+                with_irr=with_irr, progress=progress)
+        profiling.count('sweep.points', size)
+
+    if 'sweep_results' not in st.session_state:
+        return
+    result = st.session_state['sweep_results']
+    names = result['axes']
+    st.write(f"Сетка {' x '.join(str(len(v)) for v in result['values'])} рассчитана за {result['seconds']:.2f} с")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        rows = st.selectbox("Строки", names, key="sweep_rows")
+    with col2:
+        columns = st.selectbox("Столбцы", [name for name in names if name != rows], key="sweep_columns")
+    with col3:
+        metrics = ['npv'] + (['irr'] if result['irr'] is not None else [])
+        metric = st.selectbox("Показатель", metrics, format_func=sweep.METRICS.get, key="sweep_metric")
+
+    # Остальные оси сетки фиксируются в выбранной точке (по умолчанию - ближайшей к исходной)
+    fixed = {}
+    for name, values in zip(names, result['values']):
+        if name not in (rows, columns):
+            fixed[name] = st.select_slider(name, options=range(len(values)),
+                                           value=sweep.base_position(result, name, discount_rate),
+                                           format_func=lambda k, values=values: f"{values[k]:.4g}",
+                                           key=f"sweep_fixed_{name}")
+    table = sweep.data_table(result, rows, columns, metric, fixed)
+    kind = st.radio("Вид графика", ["Контурный", "Тепловая карта"], horizontal=True, key="sweep_chart")
+    st.plotly_chart(charts.surface_figure(table, sweep.METRICS[metric], contour=kind == "Контурный"))
+    st.dataframe(table)
+
+def distribution_input(param, default):
+    """Выбор распределения и его параметров для одного параметра"""
+    names = list(monte_carlo.DISTRIBUTIONS)
+    cols = st.columns(4)
+    with cols[0]:
+        dist = st.selectbox(param, names, index=names.index(default['dist']), key=f"mc_dist_{param}")
+    spec = {'dist': dist}
+    center = default['mean']
+    spread = default['std']
+    defaults = {
+        'value': center, 'mean': center, 'std': spread, 'sigma': spread / center if center else 0.1,
+        'low': center - 2 * spread, 'high': center + 2 * spread,
+        'left': center - 2 * spread, 'mode': center, 'right': center + 2 * spread
+    }
+    for i, name in enumerate(monte_carlo.DISTRIBUTIONS[dist]):
+        with cols[i + 1]:
+            spec[name] = st.number_input(name, value=float(defaults[name]), step=spread / 10 or 0.01,
+                                         format="%.4f", key=f"mc_{name}_{param}")
+    return spec
+
+def render_monte_carlo(results):
+    df = results['df']
+    project_data = st.session_state['project_data']
+    impact_duration = int(project_data['impact_duration'])
+
+    st.subheader("Распределения параметров")
+    st.write("Для выручки и затрат задается распределение множителя к исходным значениям, для ставки дисконтирования - распределение самой ставки.")
+    defaults = monte_carlo.default_specs(project_data['discount_rate'])
+    specs = {param: distribution_input(param, defaults[param]) for param in monte_carlo.PARAMETERS}
+
+    correlation = None
+    if st.checkbox("Учитывать корреляции параметров"):
+        identity = pd.DataFrame(np.eye(len(monte_carlo.PARAMETERS)),
+                                index=monte_carlo.PARAMETERS, columns=monte_carlo.PARAMETERS)
+        correlation = st.data_editor(identity, key="mc_correlation").to_numpy()
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        n_draws = st.selectbox("Число испытаний", [10_000, 100_000, 1_000_000], index=1)
+    with col2:
+        seed = st.number_input("Зерно генератора", min_value=0, value=42, step=1)
+    with col3:
+        with_irr = st.checkbox("Рассчитывать IRR", value=False)
+    with col4:
+        background = st.checkbox("Выполнять в фоне", value=n_draws >= 1_000_000)
+
+    options = {'correlation': correlation, 'seed': int(seed), 'with_irr': with_irr, 'times': results.get('times')}
+    if st.button("Запустить моделирование"):
+        if background:
+            # Задача с теми же входными данными не запускается повторно, а берется готовой
+            key = 'mc-' + project_hash({'df': df[monte_carlo.COMPONENTS], 'impact_duration': impact_duration,
+                                        'specs': specs, 'n_draws': n_draws, 'options': options})
+            st.session_state['monte_carlo_job'] = jobs.submit(
+                jobs.simulate_task, df[monte_carlo.COMPONENTS], impact_duration, specs, n_draws,
+                key=key, title="Моделирование Монте-Карло", **options)
+        else:
+            try:
+                with profiling.span('monte_carlo.simulate'):
+                    st.session_state['monte_carlo_results'] = monte_carlo.simulate(
+                        df, impact_duration, specs, n_draws, **options)
+                profiling.count('monte_carlo.draws', n_draws)
+            except ValueError as e:
+                st.error(str(e))
+                return
+
+    if 'monte_carlo_job' in st.session_state:
+        job_id = st.session_state['monte_carlo_job']
+        state = utils.job_panel(job_id)
+        if state is None or state['state'] in jobs.FINISHED_STATES:
+            st.session_state.pop('monte_carlo_job')
+            if state is not None and state['state'] == jobs.DONE:
+                st.session_state['monte_carlo_results'] = jobs.result(job_id)
+            elif state is not None and state['state'] == jobs.FAILED:
+                st.error(f"Моделирование завершилось с ошибкой: {state.get('error')}")
+            elif state is not None:
+                st.info("Моделирование отменено")
+
+    if 'monte_carlo_results' not in st.session_state:
+        return
+    simulation = st.session_state['monte_carlo_results']
+    npv = simulation['npv']
+
+    st.subheader("Результаты моделирования")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Среднее NPV", f"{npv.mean():.2f}")
+    with col2:
+        st.metric("P(NPV < 0)", f"{simulation['prob_loss']:.2%}")
+    with col3:
+        st.metric("VaR 5% (P5 NPV)", f"{simulation['percentiles']['P5']:.2f}")
+
+    st.write("**Процентили NPV:**")
+    st.dataframe(simulation['percentiles'].to_frame('NPV').T)
+
+    # Гистограмма строится по заранее посчитанным частотам, а не по всем испытаниям
+    with profiling.span('monte_carlo.histogram'):
+        counts, edges = np.histogram(npv, bins=100)
+    fig_hist = go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges)))
+    fig_hist.update_layout(title='Распределение NPV', xaxis_title='NPV', yaxis_title='Число испытаний')
+    st.plotly_chart(fig_hist)
+
+    if simulation['irr'] is not None:
+        irr = simulation['irr'][~np.isnan(simulation['irr'])]
+        if len(irr):
+            st.write(f"**Медиана IRR:** {np.median(irr):.2%}, IRR не существует в {1 - len(irr) / len(npv):.2%} испытаний")
+
+    st.write("**Диагностика сходимости:**")
+    convergence = simulation['convergence']
+    fig_conv = go.Figure()
+    fig_conv.add_trace(charts.line_trace(convergence['Испытаний'], convergence['Среднее NPV'], 'Среднее NPV'))
+    fig_conv.update_layout(title='Сходимость среднего NPV', xaxis_title='Испытаний', yaxis_title='NPV')
+    st.plotly_chart(fig_conv)
+    st.dataframe(convergence)
+
 if __name__ == "__main__":
     render()
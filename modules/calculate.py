@@ -1,31 +1,32 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-from scipy import optimize
+from modules.engine import calculate_project
+from modules.sensitivity import build_sensitivity_model
+from modules import validation
+from utils.cache import calculation_cache, project_hash
+from utils import storage, profiling, utils
 
-def calculate_cf(revenue, fixed_costs, var_costs):
-    """Расчет денежного потока"""
-    return revenue - fixed_costs - var_costs
+def compute_results(project_data):
+    """Расчет проекта вместе с моделью чувствительности"""
+    profiling.count('cache.miss')
+    results = calculate_project(project_data)
+    with profiling.span('sensitivity.model'):
+        results['sensitivity'] = build_sensitivity_model(
+            results['df'], project_data['discount_rate'], project_data['impact_duration'], times=results['times'])
+    return results
 
-def calculate_npv(cash_flows, discount_rate, impact_duration):
-    """Расчет NPV с учетом срока влияния"""
-    n = min(len(cash_flows), impact_duration)
-    npv = 0
-    for i in range(n):
-        npv += cash_flows.iloc[i] / (1 + discount_rate) ** (i + 1)
-    return npv
-
-def calculate_irr(cash_flows):
-    """Расчет IRR"""
-    if len(cash_flows) < 2 or np.all(cash_flows == 0):
-        return None
-
-    def npv_func(rate, cash_flows):
-        return np.sum(cash_flows / (1 + rate) ** np.arange(len(cash_flows)))
-    try:
-        return optimize.brentq(lambda r: npv_func(r, cash_flows), -1.0, 1.0)
-    except ValueError:
-        return None
+def get_results(project_data):
+    """
+    Результаты расчета из общего кэша по хэшу входных данных.
+    Результаты разделяются между страницами и сессиями, поэтому изменять их нельзя.
+    """
+    with profiling.span('results'):
+        with profiling.span('results.hash'):
+            key = project_hash(project_data)
+        results = calculation_cache.get_or_compute(key, lambda: compute_results(project_data))
+    profiling.count('results.requests')
+    st.session_state['calculation_results'] = results
+    st.session_state['calculation_key'] = key
+    return results
 
 def render():
     st.header("Расчеты")
@@ -35,126 +36,70 @@ def render():
         return
 
     data = st.session_state['project_data']
-    
-    # Создаем DataFrame для расчетов
-    df = pd.DataFrame(data['yearly_data'])
-    df['Год'] = range(1, len(df) + 1)
-    
-    # Преобразуем столбцы в числовой формат
-    for col in ['Выручка', 'Фиксированные операционные затраты', 'Капитальные затраты']:
-        df[col] = pd.to_numeric(df[col], errors='coerce').astype(float)
-    
-    # Расчет переменных операционных затрат
-    var_costs = pd.DataFrame(data['var_costs'])
-    if 'Количество лет' in var_costs.columns:
-        var_costs['Количество лет'] = pd.to_numeric(var_costs['Количество лет'], errors='coerce').astype(float)
-    else:
-        var_costs['Количество лет'] = pd.to_numeric(var_costs['Количество месяцев'], errors='coerce').astype(float)
-    var_costs['Количество'] = pd.to_numeric(var_costs['Количество'], errors='coerce').astype(float)
-    var_costs['Ставка'] = pd.to_numeric(var_costs['Ставка'], errors='coerce').astype(float)
-    var_costs['Процент индексирования'] = pd.to_numeric(var_costs['Процент индексирования'], errors='coerce').astype(float)
-    
-    coefficients = {k: float(v) for k, v in data['coefficients'].items()}
-    
-    total_var_costs = []
-    for year in range(1, len(df) + 1):
-        year_var_costs = 0
-        for _, row in var_costs.iterrows():
-            if year <= row['Количество лет']:
-                year_var_costs += row['Количество'] * row['Ставка'] * coefficients[row['Коэффициент']]
-            else:
-                year_var_costs += row['Количество'] * row['Ставка'] * coefficients[row['Коэффициент']] * (1 + row['Процент индексирования']) ** (year - 1)
-        total_var_costs.append(year_var_costs)
-    
-    df['Переменные операционные затраты'] = total_var_costs
-    
-    # Расчет CFO, CFI и CF
-    df['CFO'] = calculate_cf(df['Выручка'], df['Фиксированные операционные затраты'], df['Переменные операционные затраты'])
-    df['CFI'] = -df['Капитальные затраты']
-    df['CF'] = df['CFO'] + df['CFI']
-    
-    # Расчет дисконтированного CF и NPV
-    discount_rate = float(data['discount_rate'])
-    impact_duration = int(data['impact_duration'])
-    df['Дисконтированный CF'] = df['CF'] / (1 + discount_rate) ** df['Год']
-    npv = calculate_npv(df['CF'], discount_rate, impact_duration)
-    
-    st.subheader("Результаты расчетов")
-    st.dataframe(df)
-    
+
+    # Расчет выполняется движком без обращения к Streamlit, повторные расчеты берутся из кэша
+    results = get_results(data)
+    render_results(results, data)
+
+    # История расчетов проекта, сохраненного в базе данных
+    if 'project_id' in st.session_state:
+        with profiling.span('calculate.history'):
+            render_history(st.session_state['project_id'], results)
+
+def render_results(results, data):
+    with profiling.span('calculate.table'):
+        st.subheader("Результаты расчетов")
+        st.dataframe(results['df'])
+
+    with profiling.span('calculate.diagnostics'):
+        render_diagnostics(results, data)
+
+def get_report(results, data):
+    """Отчет проверки расчета; на перезапусках страницы берется из сессии по ключу расчета"""
+    key = st.session_state.get('calculation_key')
+    cached = st.session_state.get('validation_report')
+    if key is not None and cached is not None and cached[0] == key:
+        return cached[1]
+    with profiling.span('validation'):
+        report = validation.validate_project(results, data)
+    st.session_state['validation_report'] = (key, report)
+    return report
+
+def render_diagnostics(results, data):
     st.subheader("Итоговые показатели")
-    st.write(f"**NPV:** {npv:.2f}")
-    
-    # Расчет IRR
-    irr = calculate_irr(df['CF'])
-    if irr is not None:
-        st.write(f"**IRR:** {irr:.2%}")
+    st.write(f"**NPV:** {results['npv']:.2f}")
+    if results['irr'] is not None:
+        st.write(f"**IRR:** {results['irr']:.2%}")
     else:
         st.error("Не удалось рассчитать IRR")
-    
-    # Проверка данных
-    st.subheader("Проверка данных")
-    
-    # Проверка и вывод промежуточных результатов
-    st.write("**Промежуточные результаты:**")
-    st.write(f"**Выручка:**")
-    st.write(df['Выручка'])
-    st.write(f"**Фиксированные операционные затраты:**")
-    st.write(df['Фиксированные операционные затраты'])
-    st.write(f"**Переменные операционные затраты:**")
-    st.write(df['Переменные операционные затраты'])
-    st.write(f"**Капитальные затраты:**")
-    st.write(df['Капитальные затраты'])
-    st.write(f"**CF:**")
-    st.write(df['CF'])
-    st.write(f"**Срок влияния:** {impact_duration} лет")
-    st.write(f"**Ставка дисконтирования:** {discount_rate:.2%}")
-    st.write(f"**Дисконтированный CF:**")
-    st.write(df['Дисконтированный CF'])
-    
-    # Проверка на наличие отрицательных или нулевых значений
-    if (df['Выручка'] <= 0).any() or (df['Фиксированные операционные затраты'] <= 0).any() or \
-       (df['Переменные операционные затраты'] <= 0).any() or (df['Капитальные затраты'] < 0).any():
-        st.warning("Внимание: обнаружены отрицательные или нулевые значения в ключевых столбцах")
 
-    # Проверка согласованности расчетов
-    calculated_cf = df['Выручка'] - df['Фиксированные операционные затраты'] - \
-                    df['Переменные операционные затраты'] - df['Капитальные затраты']
-    if not np.allclose(calculated_cf, df['CF']):
-        st.warning("Внимание: рассчитанный CF не соответствует значениям в столбце CF")
-    
-    # Проверка корректности расчета NPV
-    calculated_npv = df['Дисконтированный CF'][:impact_duration].sum()
-    if not np.isclose(calculated_npv, npv):
-        st.warning(f"Внимание: Рассчитанный NPV ({calculated_npv:.2f}) не соответствует значению NPV ({npv:.2f})")
-    
-    # Дополнительная проверка расчета NPV
-    npv_3_years = df['Дисконтированный CF'][:impact_duration].sum()
-    npv_5_years = df['Дисконтированный CF'].sum()
+    st.subheader("Проверка данных")
+    report = get_report(results, data)
+    failed = report['checks'][~report['checks']['Пройдена']]
+    if failed.empty:
+        st.success("Все проверки пройдены, расчеты выполнены успешно!")
+    else:
+        st.warning("Не пройдены проверки: " + "; ".join(failed['Проверка']))
+    # Подробный отчет строится только по запросу, листание страниц перезапускает один фрагмент
+    if st.toggle("Подробный отчет проверки", key='validation_details'):
+        render_report(report)
 
-    st.write(f"**NPV за {impact_duration} года (срок влияния):** {npv_3_years:.2f}")
-    st.write(f"**NPV за все 5 лет:** {npv_5_years:.2f}")
+@st.fragment
+def render_report(report):
+    st.dataframe(report['checks'], hide_index=True)
+    st.write(f"**NPV за срок влияния:** {report['npv_impact']:.2f}, **за весь срок:** {report['npv_total']:.2f}")
+    st.write("**Расчет NPV по периодам срока влияния:**")
+    utils.paginated_table(report['npv_by_period'], 'validation_npv')
+    if not report['issues'].empty:
+        st.write(f"**Ячейки с замечаниями:** {len(report['issues'])}")
+        utils.paginated_table(report['issues'], 'validation_issues')
 
-    if np.isclose(npv, npv_3_years):
-        st.success("NPV рассчитан корректно на основе срока влияния")
-    elif np.isclose(npv, npv_5_years):
-        st.warning("NPV рассчитан на основе всех 5 лет, а не срока влияния")
-    else:
-        st.error("NPV не соответствует ни расчету за срок влияния, ни расчету за все 5 лет")
-    
-    # Добавление подробного вывода расчета NPV по годам
-    st.write("**Расчет NPV по годам:**")
-    for year in range(1, impact_duration + 1):
-        st.write(f"**Год {year}:** {df['Дисконтированный CF'].iloc[year-1]:.2f}")
-    st.write(f"**Сумма (NPV):** {df['Дисконтированный CF'][:impact_duration].sum():.2f}")
-    
-    # Сохранение результатов расчетов
-    st.session_state['calculation_results'] = {
-        'df': df,
-        'npv': npv
-    }
-    
-    st.success("Расчеты выполнены успешно!")
+def render_history(project_id, results):
+    if st.button("Сохранить расчет в базу"):
+        storage.save_calculation(project_id, results)
+        st.success("Расчет сохранен в базе данных!")
+    st.subheader("История расчетов")
+    st.dataframe(storage.list_calculations(project_id))
 
 if __name__ == "__main__":
     render()
@@ -0,0 +1,272 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+# Число шагов бюджета в динамическом программировании: капитальные затраты
+# округляются вверх до шага, поэтому найденный набор всегда укладывается в бюджет
+DP_RESOLUTION = 100000
+# Число проектов по обе стороны от критического в ядре задачи (см. _knapsack)
+CORE_SIZE = 500
+TIME_LIMIT = 10.0
+MIP_REL_GAP = 1e-3
+
+def annual_capex(capex, times=None):
+    """
+    Капитальные затраты проектов по годам: матрица проекты x годы.
+    capex - матрица проекты x периоды, times - показатели степени дисконтирования
+    периодов в годах (конец периода); без times периоды считаются годами.
+    """
+    capex = np.nan_to_num(np.atleast_2d(np.asarray(capex, dtype=float)))
+    if times is None:
+        return capex
+    times = np.broadcast_to(np.asarray(times, dtype=float), capex.shape)
+    years = np.where(np.isnan(times), 1, np.ceil(np.nan_to_num(times) - 1e-9)).astype(int)
+    years = np.maximum(years, 1) - 1
+    n_years = int(years.max()) + 1 if years.size else 0
+    result = np.zeros((capex.shape[0], n_years))
+    np.add.at(result, (np.arange(capex.shape[0])[:, None].repeat(capex.shape[1], axis=1), years), capex)
+    return result
+
+def _groups(exclusive, n):
+    """Номера групп взаимоисключающих проектов (-1 - без группы)"""
+    if exclusive is None:
+        return np.full(n, -1)
+    labels = pd.Series(exclusive).reset_index(drop=True)
+    labels = labels.where(labels.notna() & (labels.astype(str).str.strip() != ''))
+    codes, _ = pd.factorize(labels)
+    return codes
+
+def _mask(values, n):
+    if values is None:
+        return np.zeros(n, dtype=bool)
+    values = np.asarray(values)
+    if values.dtype == bool:
+        return values.copy()
+    mask = np.zeros(n, dtype=bool)
+    mask[values.astype(int)] = True
+    return mask
+
+def _lp_bound(npv, capex, budget, groups):
+    """
+    Верхняя граница суммарного NPV - решение линейной релаксации (доли проектов от 0 до 1).
+    Для одного ограничения без групп - жадная дробная релаксация Данцига в явном виде.
+    """
+    if capex.shape[1] == 1 and not np.any(groups >= 0):
+        capex = capex[:, 0]
+        free = capex <= 0
+        value = npv[free].sum()
+        order = np.argsort(-(npv[~free] / capex[~free]), kind='stable')
+        weights = capex[~free][order]
+        values = npv[~free][order]
+        filled = np.cumsum(weights)
+        full = filled <= budget[0]
+        value += values[full].sum()
+        rest = np.nonzero(~full)[0]
+        if len(rest):
+            k = rest[0]
+            used = filled[k - 1] if k else 0.0
+            value += values[k] * (budget[0] - used) / weights[k]
+        return value
+    from scipy.optimize import linprog
+    a_ub, b_ub = _constraints(capex, budget, groups)
+    result = linprog(-npv, A_ub=a_ub, b_ub=b_ub, bounds=(0, 1), method='highs')
+    return -result.fun if result.status == 0 else None
+
+def _constraints(capex, budget, groups):
+    """Матрица ограничений: затраты по годам и не более одного проекта из каждой группы"""
+    from scipy.sparse import csr_matrix, vstack
+    n = len(capex)
+    rows = [csr_matrix(capex.T)]
+    bounds = [budget]
+    grouped = groups >= 0
+    if grouped.any():
+        codes = groups[grouped]
+        n_groups = codes.max() + 1
+        rows.append(csr_matrix((np.ones(len(codes)), (codes, np.nonzero(grouped)[0])), shape=(n_groups, n)))
+        bounds.append(np.ones(n_groups))
+    return vstack(rows).tocsr(), np.concatenate(bounds)
+
+def _greedy(npv, capex, budget, groups):
+    """
+    Жадный допустимый выбор: проекты по убыванию NPV на долю бюджета,
+    проект берется, если помещается во все годы и его группа еще не занята.
+    """
+    scale = np.where(budget > 0, budget, 1.0)
+    with np.errstate(divide='ignore'):
+        density = npv / np.maximum((capex / scale).sum(axis=1), 0)
+    left = budget.astype(float).copy()
+    used = set()
+    selected = np.zeros(len(npv), dtype=bool)
+    for i in np.argsort(-density, kind='stable'):
+        if groups[i] >= 0 and groups[i] in used:
+            continue
+        if np.all(capex[i] <= left):
+            selected[i] = True
+            left -= capex[i]
+            if groups[i] >= 0:
+                used.add(groups[i])
+    return selected
+
+def _knapsack_dp(npv, capex, budget, groups, resolution):
+    """
+    Выбор проектов с одним ограничением бюджета динамическим программированием
+    по шагам бюджета; из каждой группы взаимоисключающих проектов - не более одного.
+    """
+    unit = budget / resolution if budget > 0 else 1.0
+    weights = np.ceil(capex / unit - 1e-9).astype(np.int64)
+    candidates = np.nonzero(weights <= resolution)[0]
+    best = np.zeros(resolution + 1)
+    history = []
+    items = [[i] for i in candidates if groups[i] < 0]
+    grouped = pd.Series(candidates[groups[candidates] >= 0]).groupby(groups[candidates][groups[candidates] >= 0])
+    items += [list(members) for _, members in grouped]
+    for members in items:
+        new = best.copy()
+        choice = np.full(resolution + 1, -1, dtype=np.int32) if len(members) > 1 else None
+        for k, i in enumerate(members):
+            w = weights[i]
+            shifted = np.full(resolution + 1, -np.inf)
+            shifted[w:] = best[:resolution + 1 - w] + npv[i]
+            better = shifted > new
+            new = np.where(better, shifted, new)
+            if choice is None:
+                choice = np.packbits(better)
+            else:
+                choice[better] = k
+        history.append((members, choice))
+        best = new
+
+    selected = np.zeros(len(npv), dtype=bool)
+    c = resolution
+    for members, choice in reversed(history):
+        if len(members) == 1:
+            k = 0 if np.unpackbits(choice, count=resolution + 1)[c] else -1
+        else:
+            k = choice[c]
+        if k >= 0:
+            selected[members[k]] = True
+            c -= weights[members[k]]
+    return selected
+
+def _knapsack(npv, capex, budget, groups, resolution, core_size):
+    """
+    Задача о рюкзаке с одним ограничением по методу ядра: проекты без групп
+    упорядочиваются по NPV на единицу затрат, проекты с отношением выше ядра
+    вокруг критического (первого не помещающегося при жадном выборе) включаются
+    сразу, ниже ядра - исключаются; ядро и проекты из групп взаимоисключающих
+    решаются динамическим программированием. Остаток бюджета после округления
+    затрат дозаполняется жадно.
+    """
+    selected = np.zeros(len(npv), dtype=bool)
+    ungrouped = np.nonzero(groups < 0)[0]
+    with np.errstate(divide='ignore'):
+        ratio = np.where(capex[ungrouped] > 0, npv[ungrouped] / capex[ungrouped], np.inf)
+    order = ungrouped[np.argsort(-ratio, kind='stable')]
+    critical = int(np.searchsorted(np.cumsum(capex[order]), budget, side='right'))
+    start = max(critical - core_size, 0)
+    selected[order[:start]] = True
+    core = np.concatenate([order[start:critical + core_size], np.nonzero(groups >= 0)[0]])
+    remaining = budget - capex[order[:start]].sum()
+    chosen = _knapsack_dp(npv[core], capex[core], remaining, groups[core], resolution)
+    selected[core[chosen]] = True
+
+    left = budget - capex[selected].sum()
+    for i in order[start:]:
+        if not selected[i] and capex[i] <= left:
+            selected[i] = True
+            left -= capex[i]
+    return selected
+
+def _milp(npv, capex, budget, groups, time_limit, mip_rel_gap):
+    """
+    Выбор проектов с ограничениями по годам методом ветвей и границ с LP-релаксацией
+    (scipy.optimize.milp, HiGHS). Если за time_limit допустимое решение не найдено
+    или оно хуже жадного, возвращается жадное.
+    """
+    from scipy.optimize import milp, LinearConstraint, Bounds
+    a_ub, b_ub = _constraints(capex, budget, groups)
+    result = milp(-npv, constraints=[LinearConstraint(a_ub, -np.inf, b_ub)], integrality=np.ones(len(npv)),
+                  bounds=Bounds(0, 1), options={'time_limit': time_limit, 'mip_rel_gap': mip_rel_gap})
+    greedy = _greedy(npv, capex, budget, groups)
+    bound = -result.mip_dual_bound if getattr(result, 'mip_dual_bound', None) is not None else None
+    if bound is None or not np.isfinite(bound):
+        bound = _lp_bound(npv, capex, budget, groups)
+    if result.x is None or npv[result.x > 0.5].sum() < npv[greedy].sum():
+        return greedy, bound, f"{result.message}; использовано жадное решение"
+    return result.x > 0.5, bound, result.message
+
+def optimize_budget(npv, capex, budget, mandatory=None, exclusive=None, method='auto', resolution=DP_RESOLUTION,
+                    core_size=CORE_SIZE, time_limit=TIME_LIMIT, mip_rel_gap=MIP_REL_GAP):
+    """
+    Выбор набора проектов с максимальным суммарным NPV в пределах бюджета
+    капитальных затрат.
+
+    npv - массив NPV проектов; capex - капитальные затраты проектов (массив)
+    или по годам (матрица проекты x годы, см. annual_capex); budget - общий
+    бюджет или бюджеты по годам. mandatory - обязательные проекты (маска или номера),
+    exclusive - метки групп взаимоисключающих проектов (из группы выбирается не
+    более одного; пустая метка - без группы).
+    method: 'dp' - динамическое программирование для одного ограничения,
+    'milp' - ветви и границы для ограничений по годам, 'auto' - по числу ограничений.
+    Возвращает словарь: выбранные проекты, суммарный NPV, затраты по годам,
+    верхняя граница (LP-релаксация), относительный разрыв до нее, время решения и статус.
+    """
+    started = time.perf_counter()
+    npv = np.nan_to_num(np.asarray(npv, dtype=float), nan=-np.inf)
+    n = len(npv)
+    capex = np.nan_to_num(np.asarray(capex, dtype=float)).reshape(n, -1)
+    budget = np.broadcast_to(np.asarray(budget, dtype=float), (capex.shape[1],)).copy()
+    mandatory = _mask(mandatory, n)
+    groups = _groups(exclusive, n)
+
+    # Обязательные проекты включаются сразу, их группы закрываются для остальных
+    remaining = budget - capex[mandatory].sum(axis=0)
+    if np.any(remaining < -1e-9 * np.maximum(np.abs(budget), 1)):
+        status = "Обязательные проекты не укладываются в бюджет"
+        return _report(npv, capex, budget, mandatory, None, method, started, status)
+    closed = np.isin(groups, groups[mandatory & (groups >= 0)])
+    # Проекты с неположительным NPV не увеличивают суммарный NPV
+    candidates = ~mandatory & ~closed & (npv > 0)
+    index = np.nonzero(candidates)[0]
+
+    single = capex.shape[1] == 1
+    if method == 'auto':
+        method = 'dp' if single else 'milp'
+    if method not in ('dp', 'milp'):
+        raise ValueError(f"Неизвестный метод: {method}")
+    if method == 'dp' and not single:
+        raise ValueError("Динамическое программирование применимо только к одному ограничению бюджета")
+    if not len(index):
+        # Выбирать не из чего: решатели не вызываются (milp не принимает пустую задачу)
+        chosen, bound, status = np.zeros(0, dtype=bool), 0.0, "Нет проектов для выбора сверх обязательных"
+    elif method == 'dp':
+        chosen = _knapsack(npv[index], capex[index, 0], max(remaining[0], 0.0), groups[index], resolution, core_size)
+        bound = _lp_bound(npv[index], capex[index], np.maximum(remaining, 0.0), groups[index])
+        status = "Решено динамическим программированием"
+    elif method == 'milp':
+        chosen, bound, status = _milp(npv[index], capex[index], np.maximum(remaining, 0.0), groups[index],
+                                      time_limit, mip_rel_gap)
+
+    selected = mandatory.copy()
+    selected[index[chosen]] = True
+    if bound is not None:
+        bound += npv[mandatory].sum()
+    return _report(npv, capex, budget, selected, bound, method, started, status)
+
+def _report(npv, capex, budget, selected, bound, method, started, status):
+    total = float(npv[selected].sum()) if selected.any() else 0.0
+    gap = None
+    if bound is not None:
+        gap = max(bound - total, 0.0) / max(abs(bound), 1e-9)
+    return {
+        'selected': selected,
+        'npv': total,
+        'capex': capex[selected].sum(axis=0),
+        'budget': budget,
+        'bound': bound,
+        'gap': gap,
+        'seconds': time.perf_counter() - started,
+        'method': method,
+        'status': status
+    }
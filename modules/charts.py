@@ -0,0 +1,143 @@
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from modules.engine import prepare_var_costs, var_cost_matrix
+from modules.timegrid import project_grid
+from utils.cache import CalculationCache
+from utils import profiling
+
+# Выше WEBGL_THRESHOLD точек линия рисуется через WebGL (Scattergl),
+# выше MAX_POINTS - прореживается на сервере алгоритмом LTTB
+WEBGL_THRESHOLD = int(os.environ.get('ECONOMIC_WEBGL_THRESHOLD', 1000))
+MAX_POINTS = int(os.environ.get('ECONOMIC_CHART_POINTS', 2000))
+HEATMAP_TOP_N = 20
+OTHER_LABEL = 'Прочие'
+
+# Готовые графики по хэшу расчета: при переключении страниц они не строятся заново
+figure_cache = CalculationCache(max_entries=int(os.environ.get('ECONOMIC_FIGURE_CACHE_ENTRIES', 128)))
+
+def lttb(y, n_out, x=None):
+    """
+    Прореживание ряда алгоритмом Largest-Triangle-Three-Buckets.
+    Возвращает номера сохраняемых точек (первая и последняя сохраняются всегда);
+    без x точки считаются равноотстоящими.
+    """
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=float) if x is None else np.asarray(x, dtype=float)
+    # Границы корзин для внутренних точек
+    edges = (np.arange(n_out - 1) * (n - 2) / (n_out - 2)).astype(int) + 1
+    edges[-1] = n - 1
+    indices = np.empty(n_out, dtype=int)
+    indices[0], indices[-1] = 0, n - 1
+    selected = 0
+    for k in range(n_out - 2):
+        start, stop = edges[k], edges[k + 1]
+        # Третья вершина треугольника - среднее следующей корзины
+        next_stop = edges[k + 2] if k + 2 < len(edges) else n
+        next_x = x[stop:next_stop].mean()
+        next_y = y[stop:next_stop].mean()
+        area = np.abs((x[selected] - next_x) * (y[start:stop] - y[selected])
+                      - (x[selected] - x[start:stop]) * (next_y - y[selected]))
+        selected = start + int(np.argmax(area))
+        indices[k + 1] = selected
+    return indices
+
+def line_trace(x, y, name, mode='lines+markers', max_points=MAX_POINTS, webgl_threshold=WEBGL_THRESHOLD):
+    """
+    Линия графика: длинные ряды прореживаются до max_points точек,
+    начиная с webgl_threshold точек используется Scattergl без маркеров.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    if len(y) > max_points:
+        numeric_x = x if np.issubdtype(x.dtype, np.number) else None
+        keep = lttb(y, max_points, numeric_x)
+        x, y = x[keep], y[keep]
+        profiling.count('charts.downsampled_points', len(keep))
+    if len(y) >= webgl_threshold:
+        return go.Scattergl(x=x, y=y, mode='lines', name=name)
+    return go.Scatter(x=x, y=y, mode=mode, name=name)
+
+def _period_column(df):
+    # Для кварталов и месяцев графики строятся по периодам сетки
+    return 'Период' if 'Период' in df.columns else 'Год'
+
+def cash_flow_figure(df):
+    period = _period_column(df)
+    fig = go.Figure()
+    fig.add_trace(line_trace(df[period], df['CF'], 'CF'))
+    fig.add_trace(line_trace(df[period], df['Дисконтированный CF'], 'Дисконтированный CF'))
+    fig.update_layout(title='Денежные потоки по годам', xaxis_title=period, yaxis_title='Значение')
+    return fig
+
+def cost_structure_figure(df):
+    costs_data = {
+        'Категория': ['Фиксированные операционные', 'Переменные операционные', 'Капитальные'],
+        'Сумма': [
+            df['Фиксированные операционные затраты'].sum(),
+            df['Переменные операционные затраты'].sum(),
+            df['Капитальные затраты'].sum()
+        ]
+    }
+    return px.pie(costs_data, values='Сумма', names='Категория', title='Структура затрат')
+
+def cumulative_npv_figure(df):
+    period = _period_column(df)
+    fig = go.Figure(line_trace(df[period], df['Дисконтированный CF'].cumsum(), 'Накопленный NPV', mode='lines'))
+    fig.update_layout(title='Накопленный NPV по годам', xaxis_title=period, yaxis_title='Накопленный NPV')
+    return fig
+
+def cost_heatmap_matrix(project_data, top_n=HEATMAP_TOP_N):
+    """
+    Переменные затраты по категориям специалистов и периодам.
+    Строки с одинаковой категорией суммируются; категории сверх top_n
+    с наибольшими затратами за весь срок объединяются в строку "Прочие".
+    """
+    n_periods = len(pd.DataFrame(project_data['yearly_data']))
+    grid = project_grid(project_data, n_periods)
+    var_costs = prepare_var_costs(project_data['var_costs'], n_periods / grid.periods_per_year)
+    costs = var_cost_matrix(var_costs, project_data['coefficients'], n_periods, grid)
+    matrix = pd.DataFrame(costs.T, index=var_costs.index.astype(str), columns=grid.labels())
+    matrix = matrix.groupby(level=0, sort=False).sum()
+    order = matrix.sum(axis=1).sort_values(ascending=False).index
+    matrix = matrix.loc[order]
+    if len(matrix) > top_n:
+        other = matrix.iloc[top_n - 1:].sum().rename(OTHER_LABEL)
+        matrix = pd.concat([matrix.iloc[:top_n - 1], other.to_frame().T])
+    return matrix
+
+def cost_heatmap_figure(project_data, top_n=HEATMAP_TOP_N):
+    matrix = cost_heatmap_matrix(project_data, top_n)
+    fig = go.Figure(go.Heatmap(z=matrix.to_numpy(), x=[str(c) for c in matrix.columns], y=list(matrix.index),
+                               colorscale='Viridis', colorbar=dict(title='Затраты')))
+    fig.update_layout(title='Тепловая карта переменных операционных затрат',
+                      xaxis_title='Период', yaxis_title='Категория специалистов',
+                      yaxis=dict(autorange='reversed'), height=max(400, 25 * len(matrix) + 150))
+    return fig
+
+def cached_figure(key, name, build, *args):
+    """
+    График из кэша по хэшу расчета key и имени; при отсутствии строится build(*args).
+    Графики общие для всех сессий, поэтому изменять их нельзя.
+    """
+    def compute():
+        profiling.count('charts.cache_miss')
+        with profiling.span(f'charts.{name}'):
+            return build(*args)
+    return figure_cache.get_or_compute(f"{key}:{name}", compute)
+
+def surface_figure(table, title, contour=True):
+    """Контурный график или тепловая карта двумерной таблицы данных (строки - ось Y, столбцы - ось X)"""
+    trace = go.Contour(contours=dict(showlabels=True)) if contour else go.Heatmap()
+    trace.update(z=table.to_numpy(), x=table.columns.to_numpy(), y=table.index.to_numpy(),
+                 colorscale='RdYlGn', colorbar=dict(title=title))
+    fig = go.Figure(trace)
+    fig.update_layout(title=f'{title}: таблица данных', xaxis_title=table.columns.name, yaxis_title=table.index.name)
+    return fig
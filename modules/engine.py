@@ -0,0 +1,156 @@
+import pandas as pd
+import numpy as np
+from modules.irr import calculate_irr
+from modules.timegrid import TimeGrid, project_grid
+from utils import profiling
+
+YEARLY_COLUMNS = ['Выручка', 'Фиксированные операционные затраты', 'Капитальные затраты']
+VAR_COST_NUMERIC_COLUMNS = ['Количество', 'Ставка', 'Процент индексирования']
+# Составляющие денежного потока и их знак в CF
+CASH_FLOW_COMPONENTS = ['Выручка', 'Фиксированные операционные затраты', 'Переменные операционные затраты', 'Капитальные затраты']
+COMPONENT_SIGNS = np.array([1.0, -1.0, -1.0, -1.0])
+
+def calculate_cf(revenue, fixed_costs, var_costs):
+    """Расчет денежного потока"""
+    return revenue - fixed_costs - var_costs
+
+def calculate_npv(cash_flows, discount_rate, impact_duration, grid=None):
+    """Расчет NPV с учетом срока влияния (в периодах сетки, по умолчанию в годах)"""
+    n = min(len(cash_flows), impact_duration)
+    cf = np.asarray(cash_flows, dtype=float)[:n]
+    if grid is None:
+        return float(np.sum(cf / (1 + discount_rate) ** np.arange(1, n + 1)))
+    return float(cf @ grid.discount_factors(discount_rate)[:n])
+
+def prepare_yearly_data(yearly_data):
+    """Формирует DataFrame данных по годам с числовыми столбцами"""
+    df = pd.DataFrame(yearly_data)
+    df['Год'] = range(1, len(df) + 1)
+    for col in YEARLY_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors='coerce').astype(float)
+    return df
+
+def numeric_column(values):
+    """
+    Столбец таблицы (Series, список или словарь формата DataFrame.to_dict())
+    как массив float; нечисловые значения - NaN, как pd.to_numeric(errors='coerce').
+    """
+    if isinstance(values, dict):
+        values = list(values.values())
+    try:
+        # Числа, None и числовые строки преобразуются без pandas
+        return np.asarray(values, dtype=float)
+    except (TypeError, ValueError):
+        return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype=float)
+
+def _column(table, col):
+    values = table[col]
+    return list(values.values()) if isinstance(values, dict) else values
+
+def line_duration(var_costs, n_years):
+    """
+    Срок действия ставки строк затрат в годах из 'Количество лет' или
+    'Количество месяцев' (переводится в годы); если столбца нет (как в шаблоне
+    Excel), ставка действует весь срок проекта. var_costs - DataFrame или словарь столбцов.
+    """
+    if 'Количество лет' in var_costs:
+        return numeric_column(_column(var_costs, 'Количество лет'))
+    if 'Количество месяцев' in var_costs:
+        return numeric_column(_column(var_costs, 'Количество месяцев')) / 12
+    n_lines = len(var_costs) if isinstance(var_costs, pd.DataFrame) else len(_column(var_costs, 'Коэффициент'))
+    return np.full(n_lines, float(n_years))
+
+def prepare_var_costs(var_costs, n_years):
+    """
+    Формирует DataFrame переменных затрат с числовыми столбцами.
+    Срок действия ставки - см. line_duration; отсутствующий процент
+    индексирования считается нулевым.
+    """
+    var_costs = pd.DataFrame(var_costs)
+    var_costs['Количество лет'] = line_duration(var_costs, n_years)
+    if 'Процент индексирования' not in var_costs.columns:
+        var_costs['Процент индексирования'] = 0.0
+    for col in VAR_COST_NUMERIC_COLUMNS:
+        var_costs[col] = pd.to_numeric(var_costs[col], errors='coerce').astype(float)
+    return var_costs
+
+def var_cost_matrix(var_costs, coefficients, n_years, grid=None):
+    """
+    Матрица переменных затрат размером периоды x строки затрат.
+    В пределах 'Количество лет' затраты не индексируются, после - умножаются
+    на (1 + Процент индексирования) ** (год - 1). При сетке с кварталами или
+    месяцами ставка задается за период, а индексация применяется раз в год.
+    var_costs - результат prepare_var_costs или словарь исходных столбцов
+    (тогда срок и индексация берутся по правилам prepare_var_costs).
+    """
+    coefficients = {k: float(v) for k, v in coefficients.items()}
+    keys = _column(var_costs, 'Коэффициент')
+    if isinstance(keys, pd.Series):
+        factors = keys.map(coefficients).to_numpy(dtype=float)
+    else:
+        factors = np.array([coefficients.get(k, np.nan) if isinstance(k, str) else np.nan for k in keys], dtype=float)
+    base = (numeric_column(_column(var_costs, 'Количество'))
+            * numeric_column(_column(var_costs, 'Ставка'))
+            * factors)
+    duration = line_duration(var_costs, n_years / (grid.periods_per_year if grid is not None else 1))
+    if 'Процент индексирования' in var_costs:
+        indexation = numeric_column(_column(var_costs, 'Процент индексирования'))
+    else:
+        indexation = np.zeros(len(base))
+    return indexation_factors(duration, indexation, n_years, grid) * base
+
+def indexation_factors(duration, indexation, n_years, grid=None):
+    """Множители индексации переменных затрат: периоды x строки затрат"""
+    if grid is None:
+        grid = TimeGrid(n_years)
+    # Конец периода в годах от начала проекта и номер года периода
+    period_end = (np.arange(1, n_years + 1, dtype=float) / grid.periods_per_year)[:, None]
+    years = grid.years.astype(float)[:, None]
+    return np.where(period_end <= duration, 1.0, (1 + indexation) ** (years - 1))
+
+def calculate_var_costs(var_costs, coefficients, n_years, grid=None):
+    """Переменные операционные затраты по периодам"""
+    return var_cost_matrix(var_costs, coefficients, n_years, grid).sum(axis=1)
+
+def calculate_project(project_data):
+    """
+    Расчет проекта без обращения к Streamlit.
+    Строки данных по годам - периоды сетки проекта (годы, кварталы или месяцы,
+    см. modules.timegrid); срок влияния задается в периодах сетки.
+    Возвращает словарь с DataFrame результатов по периодам, NPV, IRR (годовая ставка)
+    и показателями степени дисконтирования периодов в годах.
+    """
+    with profiling.span('engine.yearly_data'):
+        df = prepare_yearly_data(project_data['yearly_data'])
+    n_periods = len(df)
+    grid = project_grid(project_data, n_periods)
+    if not grid.is_annual:
+        df['Год'] = grid.years
+        df['Период'] = grid.labels()
+
+    with profiling.span('engine.var_costs'):
+        var_costs = prepare_var_costs(project_data['var_costs'], n_periods / grid.periods_per_year)
+        df['Переменные операционные затраты'] = calculate_var_costs(
+            var_costs, project_data['coefficients'], n_periods, grid)
+    profiling.count('engine.var_cost_lines', len(var_costs))
+
+    # Расчет CFO, CFI и CF
+    df['CFO'] = calculate_cf(df['Выручка'], df['Фиксированные операционные затраты'], df['Переменные операционные затраты'])
+    df['CFI'] = -df['Капитальные затраты']
+    df['CF'] = df['CFO'] + df['CFI']
+
+    # Расчет дисконтированного CF и NPV
+    discount_rate = float(project_data['discount_rate'])
+    impact_duration = int(project_data['impact_duration'])
+    with profiling.span('engine.npv'):
+        df['Дисконтированный CF'] = df['CF'] * grid.discount_factors(discount_rate)
+        npv = calculate_npv(df['CF'], discount_rate, impact_duration, grid)
+    with profiling.span('engine.irr'):
+        irr = calculate_irr(df['CF'], None if grid.is_annual else grid.irr_times)
+
+    return {
+        'df': df,
+        'npv': npv,
+        'irr': irr,
+        'times': grid.times
+    }
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+from modules.engine import CASH_FLOW_COMPONENTS, COMPONENT_SIGNS
+from modules.irr import solve_irr
+from modules.portfolio import discount_factors
+
+RATE = 'Ставка дисконтирования'
+
+def component_stack(components):
+    """
+    Составляющие денежного потока в виде массива проекты x периоды x составляющие.
+    components - DataFrame результатов одного проекта (столбцы CASH_FLOW_COMPONENTS)
+    или словарь матриц проекты x периоды (например, matrices пакетной загрузки).
+    Отсутствующие периоды считаются нулевыми.
+    """
+    if isinstance(components, pd.DataFrame):
+        stack = components[CASH_FLOW_COMPONENTS].to_numpy(dtype=float)[None, :, :]
+    else:
+        stack = np.stack([np.asarray(components[col], dtype=float) for col in CASH_FLOW_COMPONENTS], axis=-1)
+    return np.nan_to_num(stack)
+
+def _times(times, n_periods):
+    """Показатели степени дисконтирования: общий ряд или матрица проекты x периоды"""
+    if times is None:
+        return np.arange(1, n_periods + 1, dtype=float)
+    return np.nan_to_num(np.asarray(times, dtype=float)[..., :n_periods])
+
+def _finite(values):
+    return np.where(np.isfinite(values), values, np.nan)
+
+def _solve_multipliers(present_values, target):
+    """
+    NPV линеен по множителю составляющей: NPV(m) = NPV - PV + m * PV,
+    откуда m = (цель - (NPV - PV)) / PV для каждой составляющей.
+    """
+    npv = present_values.sum(axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return _finite((np.asarray(target, dtype=float).reshape(-1, 1) - (npv - present_values)) / present_values)
+
+def npv_multipliers(stack, discount_rates, impact_durations, target_npv=0.0, times=None):
+    """
+    Множители составляющих (выручка, затраты), при которых NPV равен target_npv,
+    по отдельности для каждой составляющей: матрица проекты x составляющие.
+    NaN - составляющая нулевая за срок влияния и цель ею не достигается.
+    """
+    n_projects, n_periods, _ = stack.shape
+    rates = np.broadcast_to(np.asarray(discount_rates, dtype=float), (n_projects,))
+    impact = np.broadcast_to(np.asarray(impact_durations, dtype=float), (n_projects,))
+    factors = discount_factors(rates, n_periods, _times(times, n_periods))
+    factors = np.where(np.arange(n_periods) < impact[:, None], factors, 0.0)
+    present_values = np.einsum('pt,ptc->pc', factors, stack) * COMPONENT_SIGNS
+    return _solve_multipliers(present_values, target_npv)
+
+def irr_multipliers(stack, target_irr, irr_times=None):
+    """
+    Множители составляющих, при которых IRR равен target_irr.
+    Ставка target_irr - корень уравнения IRR, когда NPV всего потока при этой ставке
+    равен нулю, а это условие линейно по множителю (если корней несколько, расчетный
+    IRR может оказаться другим корнем). irr_times - показатели степени для IRR
+    (по умолчанию 0, 1, 2, ...).
+    """
+    n_projects, n_periods, _ = stack.shape
+    if irr_times is None:
+        irr_times = np.arange(n_periods, dtype=float)
+    rates = np.broadcast_to(np.asarray(target_irr, dtype=float), (n_projects,))
+    irr_times = np.nan_to_num(np.broadcast_to(np.asarray(irr_times, dtype=float), (n_projects, n_periods)))
+    with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+        factors = (1 + rates[:, None]) ** -irr_times
+    present_values = np.einsum('pt,ptc->pc', factors, stack) * COMPONENT_SIGNS
+    return _solve_multipliers(present_values, 0.0)
+
+def break_even_rate(stack, discount_rates, impact_durations, target_npv=0.0, times=None):
+    """
+    Ставка дисконтирования, при которой NPV за срок влияния равен target_npv.
+    Корень ищется общим векторизованным решателем IRR для потока, дополненного
+    величиной -target_npv в момент 0; при нескольких корнях берется ближайший
+    к текущей ставке. NaN - такой ставки нет.
+    """
+    n_projects, n_periods, _ = stack.shape
+    impact = np.broadcast_to(np.asarray(impact_durations, dtype=float), (n_projects,))
+    cf = stack @ COMPONENT_SIGNS
+    cf = np.where(np.arange(n_periods) < impact[:, None], cf, 0.0)
+    target = np.broadcast_to(np.asarray(target_npv, dtype=float), (n_projects,))
+    cf = np.column_stack([-target, cf])
+    times = _times(times, n_periods)
+    times = np.concatenate([np.zeros(times.shape[:-1] + (1,)), times], axis=-1)
+    return solve_irr(cf, times=times, near=discount_rates)
+
+def break_even_table(components, discount_rates, impact_durations, target_npv=0.0, times=None,
+                     target_irr=None, irr_times=None, index=None):
+    """
+    Таблица поиска цели по проектам: множители выручки и затрат и ставка
+    дисконтирования, при которых NPV равен target_npv (по умолчанию точка
+    безубыточности). При заданном target_irr добавляются множители, при которых
+    IRR равен цели (столбцы с суффиксом ' (IRR)').
+    """
+    stack = component_stack(components)
+    table = pd.DataFrame(npv_multipliers(stack, discount_rates, impact_durations, target_npv, times),
+                         columns=CASH_FLOW_COMPONENTS, index=index)
+    table[RATE] = break_even_rate(stack, discount_rates, impact_durations, target_npv, times)
+    if target_irr is not None:
+        irr_table = irr_multipliers(stack, target_irr, irr_times)
+        for k, col in enumerate(CASH_FLOW_COMPONENTS):
+            table[f"{col} (IRR)"] = irr_table[:, k]
+    return table
@@ -0,0 +1,161 @@
+import numpy as np
+import pandas as pd
+
+from modules.engine import YEARLY_COLUMNS, prepare_yearly_data, prepare_var_costs, indexation_factors
+from modules.irr import calculate_irr
+from modules.timegrid import project_grid
+
+LINE_COLUMNS = ['Количество', 'Ставка', 'Количество лет', 'Процент индексирования']
+
+def to_number(value):
+    """Числовое значение ячейки, нечисловые значения - NaN (как pd.to_numeric(errors='coerce'))"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+class IncrementalProject:
+    """
+    Расчет проекта с пересчетом только затронутых правкой величин.
+
+    Хранит матрицу переменных затрат периоды x строки, суммы по периодам, CF
+    и коэффициенты дисконтирования. Правка строки затрат пересчитывает один
+    столбец матрицы и суммы по периодам, правка значения периода - CF этого
+    периода; NPV корректируется на дисконтированное приращение CF.
+    Результаты совпадают с engine.calculate_project с точностью до округления.
+    """
+
+    def __init__(self, project_data):
+        df = prepare_yearly_data(project_data['yearly_data'])
+        self.n_periods = len(df)
+        self.grid = project_grid(project_data, self.n_periods)
+        if not self.grid.is_annual:
+            df['Год'] = self.grid.years
+            df['Период'] = self.grid.labels()
+        self._df = df
+        self.yearly = {col: df[col].to_numpy(dtype=float).copy() for col in YEARLY_COLUMNS}
+
+        var_costs = prepare_var_costs(project_data['var_costs'], self.n_periods / self.grid.periods_per_year)
+        self.lines = var_costs.index
+        self.coefficients = {k: float(v) for k, v in project_data['coefficients'].items()}
+        self.line_coefficient = var_costs['Коэффициент'].to_numpy(dtype=object).copy()
+        self.line_values = {col: var_costs[col].to_numpy(dtype=float).copy() for col in LINE_COLUMNS}
+        self.costs = self._line_costs(np.arange(len(self.lines)))
+        self.var_total = self.costs.sum(axis=1)
+
+        self.discount_rate = float(project_data['discount_rate'])
+        self.impact_duration = int(project_data['impact_duration'])
+        self.factors = self.grid.discount_factors(self.discount_rate)
+        self.cf = self._period_cf(slice(None))
+        self.npv = self._full_npv()
+        self.updates = 0
+
+    def _line_costs(self, lines):
+        """Затраты выбранных строк по периодам: периоды x строки"""
+        base = (self.line_values['Количество'][lines] * self.line_values['Ставка'][lines]
+                * np.array([self.coefficients.get(k, np.nan) for k in self.line_coefficient[lines]], dtype=float))
+        return indexation_factors(self.line_values['Количество лет'][lines],
+                                  self.line_values['Процент индексирования'][lines],
+                                  self.n_periods, self.grid) * base
+
+    def _period_cf(self, periods):
+        cfo = self.yearly['Выручка'][periods] - self.yearly['Фиксированные операционные затраты'][periods] \
+            - self.var_total[periods]
+        return cfo + -self.yearly['Капитальные затраты'][periods]
+
+    def _full_npv(self):
+        n = min(self.n_periods, self.impact_duration)
+        return float(self.cf[:n] @ self.factors[:n])
+
+    def _update_cf(self, periods):
+        """Пересчет CF периодов и поправка NPV на дисконтированное приращение"""
+        old = np.array(self.cf[periods])
+        new = self._period_cf(periods)
+        self.cf[periods] = new
+        delta = np.atleast_1d(new - old)
+        if not np.all(np.isfinite(delta)):
+            self.npv = self._full_npv()
+            return
+        n = min(self.n_periods, self.impact_duration)
+        positions = np.arange(self.n_periods)[periods]
+        inside = np.atleast_1d(positions) < n
+        self.npv += float(delta[inside] @ self.factors[np.atleast_1d(positions)[inside]])
+
+    def set_yearly(self, period, column, value):
+        """Новое значение столбца данных по годам для периода (номер строки с 0)"""
+        self.yearly[column][period] = to_number(value)
+        self._update_cf(period)
+        self.updates += 1
+
+    def _update_lines(self, lines):
+        lines = np.atleast_1d(lines)
+        new = self._line_costs(lines)
+        delta = new - self.costs[:, lines]
+        self.costs[:, lines] = new
+        if np.all(np.isfinite(delta)):
+            self.var_total += delta.sum(axis=1)
+        else:
+            self.var_total = self.costs.sum(axis=1)
+        self._update_cf(slice(None))
+        self.updates += 1
+
+    def set_var_cost(self, line, column, value):
+        """Новое значение ячейки строки переменных затрат (номер строки с 0)"""
+        if column == 'Коэффициент':
+            self.line_coefficient[line] = value
+        elif column == 'Количество месяцев':
+            self.line_values['Количество лет'][line] = to_number(value) / 12
+        elif column in self.line_values:
+            self.line_values[column][line] = to_number(value)
+        else:
+            return
+        self._update_lines(line)
+
+    def set_coefficient(self, name, value):
+        """Новое значение коэффициента; пересчитываются только строки с этим коэффициентом"""
+        if self.coefficients.get(name) == float(value):
+            return
+        self.coefficients[name] = float(value)
+        lines = np.nonzero(self.line_coefficient == name)[0]
+        if len(lines):
+            self._update_lines(lines)
+
+    def set_discount_rate(self, rate):
+        if float(rate) != self.discount_rate:
+            self.discount_rate = float(rate)
+            self.factors = self.grid.discount_factors(self.discount_rate)
+            self.npv = self._full_npv()
+
+    def set_impact_duration(self, impact_duration):
+        if int(impact_duration) != self.impact_duration:
+            self.impact_duration = int(impact_duration)
+            self.npv = self._full_npv()
+
+    def apply_edits(self, yearly_edits=None, var_cost_edits=None):
+        """Правки в формате edited_rows st.data_editor: {номер строки: {столбец: значение}}"""
+        for row, values in (yearly_edits or {}).items():
+            for column, value in values.items():
+                if column in self.yearly:
+                    self.set_yearly(int(row), column, value)
+        for row, values in (var_cost_edits or {}).items():
+            for column, value in values.items():
+                self.set_var_cost(int(row), column, value)
+
+    def irr(self):
+        return calculate_irr(self.cf, None if self.grid.is_annual else self.grid.irr_times)
+
+    def results(self):
+        """Результаты в формате engine.calculate_project"""
+        df = self._df.copy()
+        for col in YEARLY_COLUMNS:
+            df[col] = self.yearly[col]
+        df['Переменные операционные затраты'] = self.var_total
+        df['CFO'] = df['Выручка'] - df['Фиксированные операционные затраты'] - df['Переменные операционные затраты']
+        df['CFI'] = -df['Капитальные затраты']
+        df['CF'] = self.cf
+        df['Дисконтированный CF'] = self.cf * self.factors
+        return {'df': df, 'npv': self.npv, 'irr': self.irr(), 'times': self.grid.times}
+
+    def line_totals(self):
+        """Суммарные затраты по строкам за весь срок"""
+        return pd.Series(self.costs.sum(axis=0), index=self.lines)
@@ -1,62 +1,253 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from utils import utils
+import os
+import hashlib
+from utils import utils, storage, profiling, jobs
+from modules.timegrid import FREQUENCIES, PERIOD_UNITS
+from modules.incremental import IncrementalProject
+from modules.project_model import compact_project
+from modules import capital_budget
 
-def generate_test_data(project_duration):
-    # Генерация тестовых данных по годам
+def generate_test_data(project_duration, seed=None):
+    # Генерация тестовых данных по годам; при заданном seed данные воспроизводимы
+    rng = np.random.default_rng(seed)
     yearly_data = pd.DataFrame({
-        'Выручка': np.random.randint(1000000, 5000000, project_duration),
-        'Фиксированные операционные затраты': np.random.randint(500000, 2000000, project_duration),
-        'Капитальные затраты': np.random.randint(100000, 1000000, project_duration)
+        'Выручка': rng.integers(1000000, 5000000, project_duration),
+        'Фиксированные операционные затраты': rng.integers(500000, 2000000, project_duration),
+        'Капитальные затраты': rng.integers(100000, 1000000, project_duration)
     }, index=range(1, project_duration + 1))
     
     # Генерация тестовых данных для переменных операционных затрат
     specialists = ['Методолог', 'Консультант', 'Архитектор', 'Подрядчик', 'Руководитель проекта', 'Стажер', 'Секретарь']
     var_costs = pd.DataFrame({
         'Коэффициент': ['K1', 'K2', 'K3', 'K4', 'K5', 'K1', 'K2'],
-        'Количество': np.random.randint(1, 10, 7),
-        'Ставка': np.random.randint(50000, 200000, 7),
-        'Количество лет': np.random.randint(1, 5, 7),
-        'Процент индексирования': np.random.uniform(0.01, 0.1, 7)
+        'Количество': rng.integers(1, 10, 7),
+        'Ставка': rng.integers(50000, 200000, 7),
+        'Количество лет': rng.integers(1, 5, 7),
+        'Процент индексирования': rng.uniform(0.01, 0.1, 7)
     }, index=specialists)
     
     return yearly_data, var_costs
 
 def load_data_from_excel():
     uploaded_file = st.file_uploader("Загрузить данные из Excel", type=["xlsx"])
-    if uploaded_file is not None:
+    # Файл остается в поле загрузки между перезапусками; данные проекта заменяются только
+    # новым файлом, иначе каждый перезапуск затирал бы проект, загруженный или сохраненный в базе
+    if uploaded_file is not None and uploaded_file.file_id != st.session_state.get('excel_file_id'):
         project_data = utils.load_from_excel(uploaded_file)
-        st.session_state['project_data'] = project_data
+        st.session_state['project_data'] = compact_project(project_data)
+        st.session_state['excel_file_id'] = uploaded_file.file_id
+        st.session_state.pop('project_id', None)
         st.success("Данные успешно загружены из Excel!")
 
+def load_data_from_database():
+    projects = storage.list_projects()
+    if projects.empty:
+        return
+    names = dict(zip(projects['id'], projects['Название']))
+    project_id = st.selectbox("Сохраненные проекты", list(names), format_func=lambda i: f"{names[i]} (№{i})")
+    if st.button("Загрузить из базы"):
+        st.session_state['project_data'] = compact_project(storage.load_project(project_id))
+        st.session_state['project_id'] = project_id
+        st.success(f"Проект '{names[project_id]}' загружен из базы данных!")
+
+def save_data_to_database():
+    if 'project_data' not in st.session_state:
+        return
+    name = st.text_input("Название проекта", value="Новый проект")
+    if st.button("Сохранить в базу"):
+        st.session_state['project_id'] = storage.save_project(name, st.session_state['project_data'])
+        st.success(f"Проект '{name}' сохранен в базе данных!")
+
+def load_portfolio_from_zip():
+    uploaded_archive = st.file_uploader("Пакетная загрузка проектов (zip-архив с книгами Excel)", type=["zip"])
+    if uploaded_archive is None:
+        return
+    # Загрузка выполняется фоновой задачей; ключ по содержимому архива, поэтому
+    # перезапуски страницы с тем же файлом не запускают загрузку заново
+    data = uploaded_archive.getbuffer()
+    key = 'bulk-' + hashlib.sha256(data).hexdigest()
+    archive_path = os.path.join(jobs.JOBS_DIR, 'uploads', f"{key}.zip")
+    state = jobs.status(key)
+    if state is not None and state['state'] in jobs.FINISHED_STATES and os.path.exists(archive_path):
+        # Архив задачи, отмененной до запуска, удаляется здесь, остальные - самой задачей
+        os.remove(archive_path)
+    if state is not None and state['state'] in (jobs.FAILED, jobs.CANCELLED):
+        if state['state'] == jobs.FAILED:
+            st.error(f"Загрузка завершилась с ошибкой: {state.get('error')}")
+        else:
+            st.info("Загрузка отменена")
+        if not st.button("Загрузить заново"):
+            return
+        state = None
+    if state is None:
+        # Архив сохраняется только для новой задачи и удаляется после ее завершения
+        os.makedirs(os.path.dirname(archive_path), exist_ok=True)
+        with open(archive_path, 'wb') as f:
+            f.write(data)
+    job_id = jobs.submit(jobs.bulk_import_task, archive_path, remove_archive=True, key=key, title="Пакетная загрузка")
+    state = utils.job_panel(job_id)
+    if state is None or state['state'] != jobs.DONE:
+        return
+    result = jobs.result(job_id)
+
+    stats = result['stats']
+    st.write(f"Загружено книг: {stats['imported']} из {stats['files']} за {stats['seconds']:.2f} с "
+             f"({stats['files_per_second']:.1f} книг/с)")
+    if not result['errors'].empty:
+        st.warning(f"Не удалось загрузить книг: {stats['failed']}")
+        st.dataframe(result['errors'])
+    if 'portfolio' in result:
+        st.dataframe(result['portfolio'])
+    if 'validation' in result:
+        failed = result['validation'][~result['validation']['Проверки пройдены']]
+        if not failed.empty:
+            st.warning(f"Проекты с замечаниями проверки данных: {len(failed)}")
+            st.dataframe(failed)
+    if 'break_even' in result:
+        st.write("**Точка безубыточности:** множители составляющих и ставка дисконтирования, при которых NPV = 0")
+        st.dataframe(result['break_even'])
+    if 'portfolio' in result:
+        render_budget_optimizer(result)
+
+def render_budget_optimizer(result):
+    """Подбор проектов портфеля с максимальным NPV в пределах бюджета капитальных затрат"""
+    st.subheader("Оптимизация портфеля по бюджету")
+    names = result['names']
+    matrices = result['matrices']
+    npv = result['portfolio']['NPV'].to_numpy()
+    capex = capital_budget.annual_capex(matrices['Капитальные затраты'], matrices['times'])
+    years = [f"Год {k + 1}" for k in range(capex.shape[1])]
+
+    if st.radio("Ограничение бюджета", ["Общий бюджет", "По годам"], horizontal=True) == "Общий бюджет":
+        budget = st.number_input("Бюджет капитальных затрат", min_value=0.0, value=float(capex.sum() / 2), step=100000.0)
+        capex = capex.sum(axis=1, keepdims=True)
+        years = ["Всего"]
+    else:
+        budget = st.data_editor(pd.DataFrame([capex.sum(axis=0) / 2], columns=years, index=["Бюджет"]),
+                                key="budget_by_year").to_numpy()[0]
+
+    st.write("Обязательные проекты и группы взаимоисключающих проектов (из группы выбирается не более одного):")
+    constraints = st.data_editor(pd.DataFrame({'Обязательный': False, 'Группа': ''}, index=names),
+                                 key="budget_constraints")
+    if st.button("Подобрать портфель"):
+        with profiling.span('input.budget_optimizer'):
+            st.session_state['budget_selection'] = capital_budget.optimize_budget(
+                npv, capex, budget, mandatory=constraints['Обязательный'].to_numpy(dtype=bool),
+                exclusive=constraints['Группа'].to_numpy())
+
+    selection = st.session_state.get('budget_selection')
+    if selection is None or len(selection['selected']) != len(names):
+        return
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Суммарный NPV", f"{selection['npv']:.2f}")
+    with col2:
+        st.metric("Разрыв оптимальности", "-" if selection['gap'] is None else f"{selection['gap']:.4%}")
+    with col3:
+        st.metric("Время решения", f"{selection['seconds']:.2f} с")
+    st.caption(selection['status'])
+    st.dataframe(pd.DataFrame({'Затраты': selection['capex'], 'Бюджет': selection['budget']},
+                              index=years if len(years) == len(selection['budget']) else None).T)
+    st.dataframe(result['portfolio'][selection['selected']])
+
+def _changed_cells(applied, edits, base):
+    """Ячейки, изменившиеся с прошлого прогона; для отмененных правок - исходные значения"""
+    changed = {}
+    for row, values in edits.items():
+        for column, value in values.items():
+            if column not in applied.get(row, {}) or applied[row][column] != value:
+                changed.setdefault(row, {})[column] = value
+    for row, values in applied.items():
+        for column in values:
+            if column not in edits.get(row, {}) and column in base.columns:
+                changed.setdefault(row, {})[column] = base.iloc[int(row)][column]
+    return changed
+
+def update_preview(yearly_data, var_costs, edited_df, edited_var_costs_df, params):
+    """
+    Предварительный расчет по правкам таблиц ввода без полного пересчета.
+    Правки st.data_editor (edited_rows) применяются к IncrementalProject только
+    по изменившимся с прошлого прогона ячейкам; при добавлении или удалении
+    строк модель строится заново по отредактированным таблицам.
+    """
+    yearly_state = st.session_state.get('yearly_editor') or {}
+    var_costs_state = st.session_state.get('var_costs_editor') or {}
+    structural = any(state.get(k) for state in (yearly_state, var_costs_state) for k in ('added_rows', 'deleted_rows'))
+    key = (id(yearly_data), id(var_costs), params['frequency'], params['start_date'])
+    preview = st.session_state.get('input_preview')
+
+    if structural:
+        profiling.count('input.preview_rebuild')
+        st.session_state.pop('input_preview', None)
+        return IncrementalProject(dict(params, yearly_data=edited_df, var_costs=edited_var_costs_df))
+
+    if preview is None or preview['key'] != key:
+        profiling.count('input.preview_rebuild')
+        preview = {
+            'key': key,
+            'model': IncrementalProject(dict(params, yearly_data=yearly_data, var_costs=var_costs)),
+            'yearly_edits': {},
+            'var_cost_edits': {}
+        }
+        st.session_state['input_preview'] = preview
+
+    model = preview['model']
+    model.set_discount_rate(params['discount_rate'])
+    model.set_impact_duration(params['impact_duration'])
+    for name, value in params['coefficients'].items():
+        model.set_coefficient(name, value)
+
+    yearly_edits = yearly_state.get('edited_rows') or {}
+    var_cost_edits = var_costs_state.get('edited_rows') or {}
+    updates = model.updates
+    model.apply_edits(_changed_cells(preview['yearly_edits'], yearly_edits, yearly_data),
+                      _changed_cells(preview['var_cost_edits'], var_cost_edits, var_costs))
+    profiling.count('input.preview_updates', model.updates - updates)
+    preview['yearly_edits'] = {row: dict(values) for row, values in yearly_edits.items()}
+    preview['var_cost_edits'] = {row: dict(values) for row, values in var_cost_edits.items()}
+    return model
+
 def render():
     st.header("Ввод данных")
 
     # Добавляем кнопку загрузки данных из Excel
     load_data_from_excel()
+    load_data_from_database()
+    with st.expander("Пакетная загрузка"):
+        load_portfolio_from_zip()
 
     # Ввод основных параметров проекта
-    col1, col2, col3 = st.columns(3)
+    col1, col2, col3, col4 = st.columns(4)
     with col1:
         project_duration = st.slider("Срок проекта (лет)", 1, 15, 5)
     with col2:
-        if project_duration == 1:
-            impact_duration = st.slider("Срок влияния (месяцев)", 1, 12, 3)
-        else:
-            impact_duration = st.slider("Срок влияния (лет)", 1, 5, 3)
+        frequency = st.selectbox("Периодичность", list(FREQUENCIES))
+    n_periods = project_duration * FREQUENCIES[frequency]
     with col3:
+        # Срок влияния задается в периодах выбранной сетки
+        if frequency == 'Год':
+            impact_duration = st.slider("Срок влияния (лет)", 1, 5, 3)
+        else:
+            impact_duration = st.slider(f"Срок влияния ({PERIOD_UNITS[frequency]})", 1, n_periods,
+                                        min(3 * FREQUENCIES[frequency], n_periods))
+    with col4:
         discount_rate = st.number_input("Ставка дисконтирования", min_value=0.0, max_value=1.0, value=0.1, step=0.01)
+    start_date = None
+    if st.checkbox("Указать дату начала проекта (дисконтирование по фактическим датам)"):
+        start_date = st.date_input("Дата начала проекта")
 
-    # Генерация тестовых данных
-    if 'test_data' not in st.session_state:
-        st.session_state['test_data'] = generate_test_data(project_duration)
+    # Генерация тестовых данных под число периодов
+    if 'test_data' not in st.session_state or len(st.session_state['test_data'][0]) != n_periods:
+        st.session_state['test_data'] = generate_test_data(n_periods)
 
     yearly_data, var_costs = st.session_state['test_data']
 
-    # Отображение и редактирование данных по годам
-    st.subheader("Данные по годам")
-    edited_df = st.data_editor(yearly_data, num_rows="dynamic")
+    # Отображение и редактирование данных по периодам
+    st.subheader("Данные по годам" if frequency == 'Год' else f"Данные по периодам ({frequency.lower()})")
+    with profiling.span('input.yearly_editor'):
+        edited_df = st.data_editor(yearly_data, num_rows="dynamic", key="yearly_editor")
 
     # Ввод коэффициентов К1-К5
     st.subheader("Коэффициенты")
@@ -74,22 +265,37 @@ def render():
 
     # Отображение и редактирование переменных операционных затрат
     st.subheader("Переменные операционные затраты")
-    if project_duration == 1:
-        var_costs.rename(columns={'Количество лет': 'Количество месяцев'}, inplace=True)
-        var_costs['Количество месяцев'] = np.random.randint(1, 13, 7)
-    edited_var_costs_df = st.data_editor(var_costs, num_rows="dynamic")
+    with profiling.span('input.var_costs_editor'):
+        edited_var_costs_df = st.data_editor(var_costs, num_rows="dynamic", key="var_costs_editor")
+
+    params = {
+        'project_duration': project_duration,
+        'impact_duration': impact_duration,
+        'discount_rate': discount_rate,
+        'frequency': frequency,
+        'start_date': start_date.isoformat() if start_date else None,
+        'coefficients': {'K1': k1, 'K2': k2, 'K3': k3, 'K4': k4, 'K5': k5}
+    }
+
+    # Предварительный итог пересчитывается только по измененным ячейкам
+    with profiling.span('input.preview'):
+        preview = update_preview(yearly_data, var_costs, edited_df, edited_var_costs_df, params)
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("NPV (предварительно)", f"{preview.npv:.2f}")
+    with col2:
+        st.metric("Переменные операционные затраты", f"{preview.var_total.sum():.2f}")
 
-    # Сохранение введенных данных в session_state
+    # Сохранение введенных данных в session_state: таблицы хранятся типизированными
+    # DataFrame, а не вложенными словарями
     if st.button("Сохранить данные"):
-        st.session_state['project_data'] = {
-            'project_duration': project_duration,
-            'impact_duration': impact_duration,
-            'discount_rate': discount_rate,
-            'yearly_data': edited_df.to_dict(),
-            'coefficients': {'K1': k1, 'K2': k2, 'K3': k3, 'K4': k4, 'K5': k5},
-            'var_costs': edited_var_costs_df.to_dict()
-        }
+        with profiling.span('input.save'):
+            st.session_state['project_data'] = compact_project(
+                dict(params, yearly_data=edited_df, var_costs=edited_var_costs_df))
+        st.session_state.pop('project_id', None)
         st.success("Данные успешно сохранены!")
 
+    save_data_to_database()
+
 if __name__ == "__main__":
     render()
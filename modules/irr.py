@@ -0,0 +1,155 @@
+import numpy as np
+from modules.portfolio import cash_flow_matrix
+
+GRID_SIZE = 64
+MIN_RATE = -0.99
+BASE_MAX_RATE = 1.0
+MAX_RATE = 1000.0
+CHUNK_ROWS = 4096
+
+def _prepare(cash_flows, times):
+    """Матрица денежных потоков без NaN и показатели степени дисконтирования"""
+    cf = np.nan_to_num(cash_flow_matrix(cash_flows))
+    if times is None:
+        times = np.arange(cf.shape[1], dtype=float)
+    else:
+        times = np.asarray(times, dtype=float)
+        if times.ndim == 2:
+            times = np.nan_to_num(times)
+    return cf, times
+
+def _rows(times, rows):
+    return times if times.ndim == 1 else times[rows]
+
+def _npv_grid(cf, times, rates):
+    """Значения NPV для каждой строки cf на общей сетке ставок: строки x ставки"""
+    growth = 1 + rates
+    with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+        if times.ndim == 1:
+            return cf @ (growth[:, None] ** -times).T
+        values = np.empty((cf.shape[0], len(rates)))
+        for start in range(0, cf.shape[0], CHUNK_ROWS):
+            chunk = slice(start, start + CHUNK_ROWS)
+            disc = growth[None, :, None] ** -times[chunk, None, :]
+            values[chunk] = (cf[chunk, None, :] * disc).sum(axis=2)
+        return values
+
+def _npv_and_derivative(cf, times, rates):
+    """NPV и его производная по ставке для пар (строка, ставка)"""
+    growth = (1 + rates)[:, None]
+    with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+        disc = growth ** -times
+        value = (cf * disc).sum(axis=1)
+        derivative = (-times * cf * disc / growth).sum(axis=1)
+    return value, derivative
+
+def _sign_changes(cf):
+    """Число смен знака в потоке - верхняя граница числа корней (правило Декарта)"""
+    signs = np.sign(cf)
+    positions = np.where(signs != 0, np.arange(cf.shape[1]), 0)
+    filled = np.take_along_axis(signs, np.maximum.accumulate(positions, axis=1), axis=1)
+    return (filled[:, 1:] * filled[:, :-1] < 0).sum(axis=1)
+
+def _find_brackets(cf, times, rates):
+    """Интервалы сетки со сменой знака NPV и точные нули на узлах сетки"""
+    values = _npv_grid(cf, times, rates)
+    finite = np.isfinite(values)
+    signs = np.sign(values)
+    change = (signs[:, :-1] * signs[:, 1:] < 0) & finite[:, :-1] & finite[:, 1:]
+    rows, cols = np.nonzero(change)
+    zero_rows, zero_cols = np.nonzero(values == 0)
+    return rows, rates[cols], rates[cols + 1], zero_rows, rates[zero_cols]
+
+def _refine(cf, times, rows, lo, hi, tol, max_iter):
+    """
+    Уточнение корней внутри интервалов: шаг Ньютона, если он остается в интервале,
+    иначе деление пополам. Все интервалы обрабатываются одновременно.
+    """
+    lo = lo.copy()
+    hi = hi.copy()
+    f_lo, _ = _npv_and_derivative(cf[rows], _rows(times, rows), lo)
+    x = (lo + hi) / 2
+    active = np.arange(len(rows))
+    for _ in range(max_iter):
+        if len(active) == 0:
+            break
+        r = rows[active]
+        f, df = _npv_and_derivative(cf[r], _rows(times, r), x[active])
+
+        left = np.sign(f) == np.sign(f_lo[active])
+        lo[active] = np.where(left, x[active], lo[active])
+        f_lo[active] = np.where(left, f, f_lo[active])
+        hi[active] = np.where(left, hi[active], x[active])
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton = x[active] - f / df
+        inside = np.isfinite(newton) & (newton > lo[active]) & (newton < hi[active])
+        x_new = np.where(inside, newton, (lo[active] + hi[active]) / 2)
+
+        done = (f == 0) | (np.abs(x_new - x[active]) <= tol * (1 + np.abs(x[active])))
+        x[active] = np.where(f == 0, x[active], x_new)
+        active = active[~done]
+    return x
+
+def _solve(cash_flows, times, max_rate, grid_size, tol, max_iter):
+    """Номера строк и корни, отсортированные по строке и значению корня"""
+    cf, times = _prepare(cash_flows, times)
+    n_projects = cf.shape[0]
+    possible = _sign_changes(cf)
+
+    base_rates = np.linspace(MIN_RATE, BASE_MAX_RATE, grid_size)
+    rows, lo, hi, zero_rows, zero_rates = _find_brackets(cf, times, base_rates)
+    found = np.bincount(rows, minlength=n_projects) + np.bincount(zero_rows, minlength=n_projects)
+
+    extend = np.nonzero(found < possible)[0]
+    if len(extend) and max_rate > BASE_MAX_RATE:
+        wide_rates = np.geomspace(1 + BASE_MAX_RATE, 1 + max_rate, grid_size) - 1
+        e_rows, e_lo, e_hi, e_zero_rows, e_zero_rates = _find_brackets(cf[extend], _rows(times, extend), wide_rates)
+        # Ставка BASE_MAX_RATE уже проверена на базовой сетке
+        e_keep = e_zero_rates > BASE_MAX_RATE
+        rows = np.concatenate([rows, extend[e_rows]])
+        lo = np.concatenate([lo, e_lo])
+        hi = np.concatenate([hi, e_hi])
+        zero_rows = np.concatenate([zero_rows, extend[e_zero_rows[e_keep]]])
+        zero_rates = np.concatenate([zero_rates, e_zero_rates[e_keep]])
+
+    roots = _refine(cf, times, rows, lo, hi, tol, max_iter)
+    all_rows = np.concatenate([rows, zero_rows])
+    all_roots = np.concatenate([roots, zero_rates])
+    order = np.lexsort((all_roots, all_rows))
+    return n_projects, all_rows[order], all_roots[order]
+
+def solve_all_irr(cash_flows, times=None, max_rate=MAX_RATE, grid_size=GRID_SIZE, tol=1e-12, max_iter=100):
+    """
+    Все IRR для пакета денежных потоков.
+
+    cash_flows - матрица проекты x периоды (или список рядов разной длины),
+    times - показатели степени дисконтирования (по умолчанию 0, 1, 2, ...),
+    общие для всех проектов или матрица по проектам (для XIRR).
+    Сначала корни ищутся на сетке ставок от -99% до 100%; сетка расширяется
+    до max_rate только для проектов, у которых по правилу Декарта могут
+    остаться ненайденные корни. Возвращает список отсортированных массивов корней.
+    """
+    n_projects, rows, roots = _solve(cash_flows, times, max_rate, grid_size, tol, max_iter)
+    bounds = np.searchsorted(rows, np.arange(n_projects + 1))
+    return [roots[bounds[i]:bounds[i + 1]] for i in range(n_projects)]
+
+def solve_irr(cash_flows, times=None, max_rate=MAX_RATE, grid_size=GRID_SIZE, tol=1e-12, max_iter=100, near=0.0):
+    """
+    IRR для пакета денежных потоков: массив по проектам, NaN если IRR не существует.
+    При нескольких корнях возвращается ближайший к near (число или массив по проектам).
+    """
+    n_projects, rows, roots = _solve(cash_flows, times, max_rate, grid_size, tol, max_iter)
+    near = np.broadcast_to(np.asarray(near, dtype=float), (n_projects,))
+    order = np.lexsort((np.abs(roots - near[rows]), rows))
+    first_rows, first = np.unique(rows[order], return_index=True)
+    irr = np.full(n_projects, np.nan)
+    irr[first_rows] = roots[order][first]
+    return irr
+
+def calculate_irr(cash_flows, times=None):
+    """Расчет IRR; times - показатели степени дисконтирования (по умолчанию 0, 1, 2, ...)"""
+    if len(cash_flows) < 2 or np.all(cash_flows == 0):
+        return None
+    irr = solve_irr([np.asarray(cash_flows, dtype=float)], times=times)[0]
+    return None if np.isnan(irr) else float(irr)
@@ -0,0 +1,129 @@
+import pandas as pd
+import numpy as np
+from scipy import special
+from modules.portfolio import npv_components
+from modules.irr import solve_irr
+from modules.engine import CASH_FLOW_COMPONENTS as COMPONENTS, COMPONENT_SIGNS
+
+PARAMETERS = COMPONENTS + ['Ставка дисконтирования']
+
+DISTRIBUTIONS = {
+    'Фиксированное': ('value',),
+    'Нормальное': ('mean', 'std'),
+    'Равномерное': ('low', 'high'),
+    'Треугольное': ('left', 'mode', 'right'),
+    'Логнормальное': ('mean', 'sigma'),
+}
+
+PERCENTILES = [1, 5, 10, 25, 50, 75, 90, 95, 99]
+CHUNK_SIZE = 100_000
+
+def default_specs(discount_rate):
+    """Распределения по умолчанию: множители составляющих около 1 и исходная ставка"""
+    specs = {param: {'dist': 'Нормальное', 'mean': 1.0, 'std': 0.1} for param in COMPONENTS}
+    specs['Ставка дисконтирования'] = {'dist': 'Нормальное', 'mean': float(discount_rate), 'std': 0.01}
+    return specs
+
+def from_normal(spec, z):
+    """Преобразование стандартных нормальных величин в заданное распределение"""
+    dist = spec['dist']
+    if dist == 'Фиксированное':
+        return np.full_like(z, float(spec['value']))
+    if dist == 'Нормальное':
+        return spec['mean'] + spec['std'] * z
+    if dist == 'Логнормальное':
+        # Параметризация через математическое ожидание
+        return spec['mean'] * np.exp(spec['sigma'] * z - spec['sigma'] ** 2 / 2)
+
+    u = special.ndtr(z)
+    if dist == 'Равномерное':
+        return spec['low'] + (spec['high'] - spec['low']) * u
+    if dist == 'Треугольное':
+        left, mode, right = spec['left'], spec['mode'], spec['right']
+        width = right - left
+        split = (mode - left) / width if width > 0 else 0.5
+        return np.where(u < split,
+                        left + np.sqrt(u * width * (mode - left)),
+                        right - np.sqrt((1 - u) * width * (right - mode)))
+    raise ValueError(f"Неизвестное распределение: {dist}")
+
+def correlation_factor(correlation):
+    """Множитель Холецкого для матрицы корреляций параметров"""
+    if correlation is None:
+        return None
+    correlation = np.asarray(correlation, dtype=float)
+    if correlation.shape != (len(PARAMETERS), len(PARAMETERS)):
+        raise ValueError(f"Матрица корреляций должна иметь размер {len(PARAMETERS)}x{len(PARAMETERS)}")
+    if not np.allclose(correlation, correlation.T) or not np.allclose(np.diag(correlation), 1.0):
+        raise ValueError("Матрица корреляций должна быть симметричной с единицами на диагонали")
+    try:
+        return np.linalg.cholesky(correlation)
+    except np.linalg.LinAlgError:
+        raise ValueError("Матрица корреляций не является положительно определенной")
+
+def sample_parameters(specs, n, rng, factor=None):
+    """
+    Выборка параметров размером n x 5 (множители составляющих и ставка).
+    Корреляции задаются гауссовой копулой через множитель Холецкого.
+    """
+    z = rng.standard_normal((n, len(PARAMETERS)))
+    if factor is not None:
+        z = z @ factor.T
+    return np.column_stack([from_normal(specs[param], z[:, i]) for i, param in enumerate(PARAMETERS)])
+
+def simulate(df, impact_duration, specs, n_draws, correlation=None, chunk_size=CHUNK_SIZE, seed=None, with_irr=False,
+             times=None, progress=None):
+    """
+    Моделирование Монте-Карло NPV (и при необходимости IRR) проекта.
+
+    df - результаты расчета по годам, specs - распределения параметров
+    (см. default_specs), times - показатели степени дисконтирования периодов
+    для сетки кварталов, месяцев или дат (см. modules.timegrid), progress -
+    функция, получающая число выполненных испытаний после каждого блока. Выборки обрабатываются блоками по chunk_size,
+    поэтому потребление памяти не зависит от числа испытаний, кроме
+    итоговых массивов NPV/IRR. Возвращает словарь с массивами NPV и IRR,
+    вероятностью NPV < 0, процентилями и диагностикой сходимости.
+    """
+    rng = np.random.default_rng(seed)
+    factor = correlation_factor(correlation)
+    components = df[COMPONENTS].to_numpy(dtype=float)
+    irr_times = None if times is None else np.asarray(times) - times[0]
+
+    npv = np.empty(n_draws)
+    irr = np.empty(n_draws) if with_irr else None
+    convergence = []
+    total = 0.0
+    total_sq = 0.0
+    losses = 0
+    for start in range(0, n_draws, chunk_size):
+        stop = min(start + chunk_size, n_draws)
+        draws = sample_parameters(specs, stop - start, rng, factor)
+        multipliers = draws[:, :4] * COMPONENT_SIGNS
+
+        present_values = npv_components(components, draws[:, 4], impact_duration, times)
+        chunk_npv = (present_values * multipliers).sum(axis=1)
+        npv[start:stop] = chunk_npv
+        if with_irr:
+            irr[start:stop] = solve_irr(multipliers @ components.T, times=irr_times)
+
+        total += chunk_npv.sum()
+        total_sq += (chunk_npv ** 2).sum()
+        losses += int((chunk_npv < 0).sum())
+        mean = total / stop
+        std = np.sqrt(max(total_sq / stop - mean ** 2, 0.0))
+        convergence.append({
+            'Испытаний': stop,
+            'Среднее NPV': mean,
+            'Стандартная ошибка': std / np.sqrt(stop),
+            'P(NPV<0)': losses / stop
+        })
+        if progress is not None:
+            progress(stop)
+
+    return {
+        'npv': npv,
+        'irr': irr,
+        'prob_loss': losses / n_draws if n_draws else np.nan,
+        'percentiles': pd.Series(np.percentile(npv, PERCENTILES), index=[f"P{p}" for p in PERCENTILES]),
+        'convergence': pd.DataFrame(convergence)
+    }
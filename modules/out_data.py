@@ -1,21 +1,23 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
-from scipy import optimize
+from modules.calculate import get_results
+from modules.timegrid import FREQUENCIES, DEFAULT_FREQUENCY
+from utils import profiling
 
 def render():
     st.header("Результаты расчетов")
 
-    if 'calculation_results' not in st.session_state:
-        st.warning("Пожалуйста, сначала выполните расчеты на странице 'Расчеты'")
+    if 'project_data' not in st.session_state:
+        st.warning("Пожалуйста, сначала введите данные на странице 'Ввод данных' и сохраните их.")
         return
 
-    results = st.session_state['calculation_results']
+    results = get_results(st.session_state['project_data'])
     df = results['df']
     npv = results['npv']
 
-    st.subheader("Таблица результатов по годам")
-    st.dataframe(df)
+    with profiling.span('out_data.table'):
+        st.subheader("Таблица результатов по годам")
+        st.dataframe(df)
 
     st.subheader("Итоговые показатели")
     st.write(f"**NPV:** {npv:.2f}")
@@ -45,9 +47,11 @@ def render():
         st.metric("Общий денежный поток", f"{total_cf:.2f}")
 
     # Расчет дополнительных показателей
-    payback_period = calculate_payback_period(df)
-    irr = calculate_irr(df['CF'])
-    profitability_index = calculate_profitability_index(npv, total_capex)
+    with profiling.span('out_data.indicators'):
+        frequency = st.session_state['project_data'].get('frequency') or DEFAULT_FREQUENCY
+        payback_period = calculate_payback_period(df, FREQUENCIES[frequency])
+        irr = results['irr']
+        profitability_index = calculate_profitability_index(npv, total_capex)
 
     st.subheader("Дополнительные показатели эффективности")
     col1, col2, col3 = st.columns(3)
@@ -71,24 +75,16 @@ def render():
     with col3:
         st.metric("Индекс прибыльности", f"{profitability_index:.2f}")
 
-def calculate_payback_period(df):
+def calculate_payback_period(df, periods_per_year=1):
     cumulative_cf = df['CF'].cumsum()
     if (cumulative_cf > 0).any():
+        if periods_per_year != 1:
+            # Для кварталов и месяцев срок переводится из периодов в годы
+            return (int((cumulative_cf > 0).to_numpy().argmax()) + 1) / periods_per_year
         return cumulative_cf[cumulative_cf > 0].index[0]
     else:
         return float('inf')
 
-def calculate_irr(cash_flows):
-    if len(cash_flows) < 2 or np.all(cash_flows == 0):
-        return None
-
-    def npv_func(rate, cash_flows):
-        return np.sum(cash_flows / (1 + rate) ** np.arange(len(cash_flows)))
-    try:
-        return optimize.brentq(lambda r: npv_func(r, cash_flows), -1.0, 1.0)
-    except ValueError:
-        return None
-
 def calculate_profitability_index(npv, total_capex):
     return (npv + total_capex) / total_capex
 
@@ -0,0 +1,97 @@
+import pandas as pd
+import numpy as np
+
+def cash_flow_matrix(cash_flows):
+    """
+    Собирает денежные потоки проектов разной длительности в матрицу
+    проекты x периоды. Недостающие периоды заполняются NaN.
+    """
+    if isinstance(cash_flows, pd.DataFrame):
+        return cash_flows.to_numpy(dtype=float)
+    if isinstance(cash_flows, np.ndarray) and cash_flows.ndim == 2:
+        return cash_flows.astype(float, copy=False)
+
+    rows = [np.asarray(cf, dtype=float).ravel() for cf in cash_flows]
+    n_periods = max((len(row) for row in rows), default=0)
+    matrix = np.full((len(rows), n_periods), np.nan)
+    for i, row in enumerate(rows):
+        matrix[i, :len(row)] = row
+    return matrix
+
+def discount_factors(discount_rates, n_periods, times=None):
+    """
+    Матрица коэффициентов дисконтирования 1 / (1 + r) ** год, год = 1..n_periods.
+    times - показатели степени в годах для сетки кварталов, месяцев или дат (см. modules.timegrid),
+    общие для всех ставок или матрица по проектам.
+    """
+    rates = np.atleast_1d(np.asarray(discount_rates, dtype=float))
+    if times is None:
+        years = np.arange(1, n_periods + 1, dtype=float)
+    else:
+        years = np.asarray(times, dtype=float)[..., :n_periods]
+    return (1 + rates[:, None]) ** -years
+
+def npv_components(components, discount_rates, impact_duration, times=None):
+    """
+    Приведенная стоимость составляющих денежного потока за срок влияния.
+
+    components - матрица периоды x составляющие (например, выручка и затраты),
+    discount_rates - массив ставок (сценарии или проекты).
+    Возвращает матрицу ставки x составляющие; NPV при любых множителях
+    составляющих получается скалярным произведением строки на множители.
+    """
+    components = np.asarray(components, dtype=float)
+    n = min(components.shape[0], int(impact_duration))
+    return discount_factors(discount_rates, n, times) @ components[:n]
+
+def evaluate_portfolio(cash_flows, discount_rates, impact_durations, total_capex=None, times=None):
+    """
+    Расчет показателей для портфеля проектов за один матричный проход.
+
+    cash_flows - матрица проекты x периоды (или список рядов разной длины),
+    discount_rates и impact_durations - скаляры или массивы по проектам,
+    total_capex - суммарные капитальные затраты по проектам для индекса прибыльности,
+    times - показатели степени дисконтирования (ряд или матрица проекты x периоды)
+    для проектов с кварталами, месяцами или датами; impact_durations - в периодах.
+    Возвращает словарь массивов: NPV, дисконтированный CF, срок окупаемости
+    (номер года, inf если проект не окупается) и индекс прибыльности.
+    """
+    cf = cash_flow_matrix(cash_flows)
+    n_projects, n_periods = cf.shape
+    rates = np.broadcast_to(np.asarray(discount_rates, dtype=float), (n_projects,))
+    impact = np.broadcast_to(np.asarray(impact_durations, dtype=float), (n_projects,))
+
+    years = np.arange(1, n_periods + 1)
+    valid = ~np.isnan(cf)
+    discounted_cf = cf * discount_factors(rates, n_periods, times)
+
+    # NPV считается только за срок влияния, как в calculate_npv
+    in_impact = valid & (years <= impact[:, None])
+    npv = np.where(in_impact, discounted_cf, 0.0).sum(axis=1)
+
+    # Срок окупаемости - первый год с положительным накопленным CF
+    cumulative_cf = np.where(valid, cf, 0.0).cumsum(axis=1)
+    positive = (cumulative_cf > 0) & valid
+    payback_period = np.where(positive.any(axis=1), years[positive.argmax(axis=1)], np.inf)
+
+    if total_capex is None:
+        profitability_index = np.full(n_projects, np.nan)
+    else:
+        capex = np.broadcast_to(np.asarray(total_capex, dtype=float), (n_projects,))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            profitability_index = (npv + capex) / capex
+
+    return {
+        'npv': npv,
+        'discounted_cf': discounted_cf,
+        'payback_period': payback_period,
+        'profitability_index': profitability_index
+    }
+
+def portfolio_table(evaluation, index=None):
+    """Сводная таблица показателей портфеля"""
+    return pd.DataFrame({
+        'NPV': evaluation['npv'],
+        'Срок окупаемости': evaluation['payback_period'],
+        'Индекс прибыльности': evaluation['profitability_index']
+    }, index=index)
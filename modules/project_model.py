@@ -0,0 +1,143 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from modules.engine import YEARLY_COLUMNS
+
+VAR_COST_COLUMNS = ['Количество', 'Ставка', 'Количество лет', 'Количество месяцев', 'Процент индексирования']
+CATEGORY_COLUMNS = ['Коэффициент']
+COERCED_COLUMNS = ['Таблица', 'Строка', 'Столбец', 'Значение']
+# Результаты расчета берутся из общего кэша и не относятся к памяти одной сессии
+SHARED_SESSION_KEYS = ('calculation_results',)
+
+def compact_frame(data, numeric_columns, category_columns=()):
+    """
+    Таблица в виде DataFrame с типизированными столбцами: числовые - float64,
+    коэффициенты - категории (коды вместо строки в каждой ячейке).
+    Нечисловые значения числовых столбцов становятся NaN, как в расчетном ядре.
+    Уже компактная таблица возвращается без копирования.
+    """
+    frame = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+    changes = {}
+    for col in frame.columns:
+        if col in numeric_columns and frame[col].dtype != np.float64:
+            changes[col] = pd.to_numeric(frame[col], errors='coerce').astype(np.float64)
+        elif col in category_columns and not isinstance(frame[col].dtype, pd.CategoricalDtype):
+            changes[col] = frame[col].astype('category')
+    return frame.assign(**changes) if changes else frame
+
+def _blank(values):
+    """Маска пустых ячеек: None, NaN и строки из пробелов"""
+    return values.isna() | values.astype(str).str.strip().eq('')
+
+def coerced_values(project_data):
+    """
+    Непустые нечисловые ячейки числовых столбцов входных таблиц, которые
+    compact_frame заменяет на NaN: таблица со столбцами 'Таблица', 'Строка',
+    'Столбец' и 'Значение' (исходное значение ячейки).
+    """
+    frames = []
+    tables = [
+        ('Данные по периодам', project_data['yearly_data'], YEARLY_COLUMNS),
+        ('Переменные затраты', project_data['var_costs'], VAR_COST_COLUMNS)
+    ]
+    for table, data, columns in tables:
+        frame = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+        columns = [col for col in columns if col in frame.columns and not pd.api.types.is_numeric_dtype(frame[col])]
+        if not columns:
+            continue
+        raw = frame[columns]
+        numeric = raw.apply(pd.to_numeric, errors='coerce')
+        rows, cols = np.nonzero((numeric.isna() & ~raw.apply(_blank)).to_numpy())
+        frames.append(pd.DataFrame({
+            'Таблица': table,
+            'Строка': raw.index[rows].astype(str),
+            'Столбец': np.asarray(columns)[cols],
+            'Значение': raw.to_numpy()[rows, cols].astype(str)
+        }))
+    frames = [frame for frame in frames if len(frame)]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=COERCED_COLUMNS)
+
+def compact_project(project_data):
+    """
+    Данные проекта с таблицами 'yearly_data' и 'var_costs' в виде компактных DataFrame
+    вместо вложенных словарей DataFrame.to_dict(). Остальные поля не меняются;
+    расчетное ядро, хэш кэша и сохранение принимают оба представления.
+    Нечисловые ячейки, замененные на NaN, запоминаются в поле 'coerced'
+    (см. coerced_values), чтобы проверка данных могла их показать.
+    """
+    compact = dict(project_data,
+                   yearly_data=compact_frame(project_data['yearly_data'], YEARLY_COLUMNS),
+                   var_costs=compact_frame(project_data['var_costs'], VAR_COST_COLUMNS, CATEGORY_COLUMNS))
+    coerced = coerced_values(project_data)
+    if len(coerced):
+        recorded = project_data.get('coerced')
+        compact['coerced'] = coerced if recorded is None else pd.concat([recorded, coerced], ignore_index=True)
+    return compact
+
+def scenario(project_data, yearly_data=None, var_costs=None, **params):
+    """
+    Сценарий проекта с копированием при записи.
+    yearly_data и var_costs - словари {столбец: новые значения или функция от таблицы},
+    params - новые значения параметров проекта. Неизмененные столбцы и параметры
+    разделяются с исходным проектом; исходный проект не меняется.
+    """
+    base = compact_project(project_data)
+    view = dict(base, **params)
+    if yearly_data:
+        view['yearly_data'] = compact_frame(base['yearly_data'].assign(**yearly_data), YEARLY_COLUMNS)
+    if var_costs:
+        view['var_costs'] = compact_frame(base['var_costs'].assign(**var_costs), VAR_COST_COLUMNS, CATEGORY_COLUMNS)
+    return view
+
+def memory_footprint(value, seen=None):
+    """
+    Оценка занимаемой памяти в байтах с учетом вложенных объектов.
+    Объекты, на которые есть несколько ссылок, учитываются один раз.
+    """
+    if seen is None:
+        seen = {}
+    if id(value) in seen:
+        return 0
+    # Ссылка на объект сохраняется, чтобы id временных массивов не использовался повторно
+    seen[id(value)] = value
+    if isinstance(value, pd.DataFrame):
+        return (int(value.index.memory_usage(deep=True))
+                + sum(_column_footprint(value[col], seen) for col in value.columns))
+    if isinstance(value, pd.Series):
+        return int(value.index.memory_usage(deep=True)) + _column_footprint(value, seen)
+    if isinstance(value, pd.Index):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        # Представления учитываются по исходному массиву: общие данные - один раз
+        root = value
+        while isinstance(root.base, np.ndarray):
+            root = root.base
+        if root is not value:
+            return 0 if id(root) in seen else memory_footprint(root, seen)
+        return value.nbytes
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        return size + sum(memory_footprint(k, seen) + memory_footprint(v, seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return size + sum(memory_footprint(v, seen) for v in value)
+    if hasattr(value, '__dict__') and not isinstance(value, type):
+        return size + memory_footprint(vars(value), seen)
+    return size
+
+def _column_footprint(series, seen):
+    if series.dtype.kind in 'biufcmM':
+        return memory_footprint(series.to_numpy(), seen)
+    return int(series.memory_usage(deep=True, index=False))
+
+def session_footprint(session_state):
+    """
+    Память session_state по ключам (байты), по убыванию.
+    Столбец 'Общий' отмечает данные, разделяемые с другими сессиями.
+    """
+    seen = {}
+    rows = [(str(key), memory_footprint(value, seen), key in SHARED_SESSION_KEYS)
+            for key, value in session_state.items()]
+    table = pd.DataFrame(rows, columns=['Ключ', 'Байт', 'Общий'])
+    return table.sort_values('Байт', ascending=False, ignore_index=True)
@@ -0,0 +1,129 @@
+import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
+from modules import scenarios
+from modules.engine import CASH_FLOW_COMPONENTS
+from modules.project_model import compact_project
+from utils import profiling, storage
+
+PROJECT = 'Проект'
+
+def get_scenarios():
+    """
+    Сценарии текущего проекта; для проекта из базы данных они загружаются из нее при смене проекта.
+    Сценарии несохраненного проекта сбрасываются, когда его данные заменяются (загрузка Excel, сохранение).
+    """
+    project_id = st.session_state.get('project_id')
+    # Для несохраненного проекта владелец сценариев - сам объект project_data (сравнивается по тождеству)
+    owner = project_id if project_id is not None else st.session_state.get('project_data')
+    if 'scenarios' not in st.session_state or st.session_state.get('scenarios_project') is not owner:
+        st.session_state['scenarios'] = storage.load_scenarios(project_id) if project_id is not None else {}
+        st.session_state['scenarios_project'] = owner
+    return st.session_state['scenarios']
+
+def store_scenario(name, delta):
+    """Добавляет сценарий в сессию и, для проекта из базы данных, сохраняет его в базе"""
+    get_scenarios()[name] = scenarios.validate_delta(delta)
+    if 'project_id' in st.session_state:
+        storage.save_scenario(st.session_state['project_id'], name, delta)
+
+def remove_scenario(name):
+    get_scenarios().pop(name, None)
+    if 'project_id' in st.session_state:
+        storage.delete_scenario(st.session_state['project_id'], name)
+
+def render():
+    st.header("Сценарии")
+
+    if 'project_data' not in st.session_state:
+        st.warning("Пожалуйста, сначала введите данные на странице 'Ввод данных' и сохраните их.")
+        return
+
+    project_data = st.session_state['project_data']
+    stored = get_scenarios()
+    with st.expander("Новый сценарий", expanded=not stored):
+        with profiling.span('scenarios.editor'):
+            render_editor(project_data)
+
+    if not stored:
+        st.info("Добавьте сценарии, чтобы сравнить их с базовым вариантом проекта.")
+        return
+    render_list(stored)
+    # Все сценарии оцениваются одним пакетом поверх общего предрасчета проекта
+    try:
+        with profiling.span('scenarios.evaluate'):
+            table = scenarios.evaluate_scenarios({PROJECT: project_data}, {PROJECT: stored})
+    except ValueError as e:
+        st.error(f"Не удалось рассчитать сценарии: {e}. Удалите сценарии, не подходящие к данным проекта.")
+        return
+    profiling.count('scenarios.evaluated', len(table))
+    render_comparison(scenarios.compare(table).xs(PROJECT, level='Проект'))
+
+def render_editor(project_data):
+    stored = get_scenarios()
+    st.write("Типовые сценарии:")
+    cols = st.columns(len(scenarios.PRESETS))
+    for col, (name, delta) in zip(cols, scenarios.PRESETS.items()):
+        with col:
+            if st.button(f"Добавить: {name}", key=f"scenario_preset_{name}"):
+                store_scenario(name, delta)
+
+    name = st.text_input("Название сценария", value=f"Сценарий {len(stored) + 1}")
+    st.write("Изменение составляющих денежного потока, %:")
+    cols = st.columns(len(CASH_FLOW_COMPONENTS) + 1)
+    changes = {}
+    for col, param in zip(cols, CASH_FLOW_COMPONENTS):
+        with col:
+            changes[param] = st.number_input(param, value=0.0, step=5.0, key=f"scenario_change_{param}")
+    with cols[-1]:
+        rate_shift = st.number_input("Ставка дисконтирования, п.п.", value=0.0, step=0.5, key="scenario_rate_shift")
+
+    base = compact_project(project_data)
+    st.write("Коэффициенты сценария:")
+    coefficients = st.data_editor(pd.DataFrame([base['coefficients']]), key="scenario_coefficients").iloc[0]
+    yearly_data = var_costs = None
+    if st.checkbox("Изменить ячейки данных", key="scenario_cells"):
+        st.write("Данные по периодам:")
+        yearly_data = st.data_editor(base['yearly_data'], key="scenario_yearly")
+        st.write("Переменные затраты:")
+        var_costs = st.data_editor(base['var_costs'], key="scenario_var_costs")
+
+    if st.button("Сохранить сценарий"):
+        name = name.strip()
+        if not name or name == scenarios.BASE:
+            st.error("Укажите название сценария, отличное от базового")
+            return
+        # Сохраняются только отличия от базового проекта
+        delta = scenarios.diff_delta(project_data, yearly_data, var_costs, coefficients.to_dict())
+        multipliers = {param: 1 + change / 100 for param, change in changes.items() if change}
+        if multipliers:
+            delta['multipliers'] = multipliers
+        if rate_shift:
+            delta['rate_shift'] = rate_shift / 100
+        store_scenario(name, delta)
+        st.success(f"Сценарий '{name}' сохранен")
+
+def render_list(stored):
+    st.subheader("Сценарии проекта")
+    st.dataframe(pd.DataFrame({'Отличия от базового': [scenarios.describe(delta) for delta in stored.values()]},
+                              index=pd.Index(list(stored), name='Сценарий')))
+    selected = st.multiselect("Удалить сценарии", list(stored))
+    if selected and st.button("Удалить выбранные"):
+        for name in selected:
+            remove_scenario(name)
+        st.rerun()
+
+def render_comparison(table):
+    st.subheader("Сравнение сценариев")
+    st.dataframe(table.style.format({
+        'NPV': '{:,.2f}', 'Изменение NPV': '{:+,.2f}', 'IRR': '{:.2%}', 'Изменение IRR': '{:+.2%}',
+        'Срок окупаемости': '{:.2f}', 'Индекс прибыльности': '{:.2f}'
+    }, na_rep='-'))
+
+    fig = go.Figure(go.Bar(x=table.index.tolist(), y=table['NPV'],
+                           marker_color=['#1f77b4' if name == scenarios.BASE else '#ff7f0e' for name in table.index]))
+    fig.update_layout(title='NPV по сценариям', xaxis_title='Сценарий', yaxis_title='NPV')
+    st.plotly_chart(fig)
+
+if __name__ == "__main__":
+    render()
@@ -0,0 +1,338 @@
+import numpy as np
+import pandas as pd
+
+from modules.engine import (YEARLY_COLUMNS, CASH_FLOW_COMPONENTS, prepare_yearly_data, prepare_var_costs,
+                            indexation_factors)
+from modules.incremental import LINE_COLUMNS, to_number
+from modules.irr import solve_irr
+from modules.portfolio import cash_flow_matrix, evaluate_portfolio
+from modules.project_model import scenario
+from modules.timegrid import project_grid
+
+BASE = 'Базовый'
+DELTA_KEYS = ('yearly_data', 'var_costs', 'coefficients', 'rate_shift', 'multipliers')
+LINE_CELL_COLUMNS = LINE_COLUMNS + ['Количество месяцев', 'Коэффициент']
+# Типовые сценарии: изменение выручки и затрат на 10%
+PRESETS = {
+    'Оптимистичный': {'multipliers': {'Выручка': 1.1, 'Фиксированные операционные затраты': 0.9,
+                                      'Переменные операционные затраты': 0.9, 'Капитальные затраты': 0.9}},
+    'Пессимистичный': {'multipliers': {'Выручка': 0.9, 'Фиксированные операционные затраты': 1.1,
+                                       'Переменные операционные затраты': 1.1, 'Капитальные затраты': 1.1}},
+}
+RESULT_COLUMNS = ['NPV', 'IRR', 'Срок окупаемости', 'Индекс прибыльности']
+
+def validate_delta(delta):
+    """
+    Проверка сценария - разреженного набора отличий от базового проекта:
+    'yearly_data' и 'var_costs' - измененные ячейки {столбец: {период или строка: значение}},
+    'coefficients' - новые значения коэффициентов, 'rate_shift' - сдвиг ставки
+    дисконтирования, 'multipliers' - множители составляющих денежного потока.
+    """
+    unknown = [key for key in delta if key not in DELTA_KEYS]
+    if unknown:
+        raise ValueError(f"Неизвестные поля сценария: {', '.join(unknown)}")
+    checks = [('yearly_data', YEARLY_COLUMNS), ('var_costs', LINE_CELL_COLUMNS), ('multipliers', CASH_FLOW_COMPONENTS)]
+    for key, allowed in checks:
+        wrong = [col for col in delta.get(key) or {} if col not in allowed]
+        if wrong:
+            raise ValueError(f"Недопустимые столбцы в '{key}': {', '.join(wrong)}")
+    return delta
+
+def apply_delta(project_data, delta):
+    """
+    Полные данные проекта для сценария (копирование при записи, см. project_model.scenario).
+    Множитель переменных затрат применяется к ставкам специалистов.
+    """
+    validate_delta(delta)
+    base = scenario(project_data)
+    multipliers = delta.get('multipliers') or {}
+    var_changes = dict(delta.get('var_costs') or {})
+    var_costs = base['var_costs']
+    if var_changes:
+        # Срок ставки приводится к годам, как в расчетном ядре
+        n_periods = len(base['yearly_data'])
+        var_costs = prepare_var_costs(var_costs, n_periods / project_grid(base, n_periods).periods_per_year)
+        if 'Количество месяцев' in var_changes:
+            months = var_changes.pop('Количество месяцев')
+            var_changes['Количество лет'] = dict(var_changes.get('Количество лет') or {},
+                                                 **{label: to_number(value) / 12 for label, value in months.items()})
+
+    def cells(frame, changes, scale=None):
+        updates = {}
+        labels = frame.index.astype(str).to_numpy()
+        for col, values in changes.items():
+            column = frame[col].astype(object if col == 'Коэффициент' else float)
+            for label, value in values.items():
+                column = column.mask(labels == str(label), value)
+            updates[col] = column
+        for col, factor in (scale or {}).items():
+            updates[col] = updates.get(col, frame[col]) * factor
+        return updates
+
+    yearly_scale = {col: multipliers[col] for col in YEARLY_COLUMNS if col in multipliers}
+    var_scale = ({'Ставка': multipliers['Переменные операционные затраты']}
+                 if 'Переменные операционные затраты' in multipliers else None)
+    view = dict(base, var_costs=var_costs)
+    return scenario(
+        view,
+        yearly_data=cells(base['yearly_data'], delta.get('yearly_data') or {}, yearly_scale),
+        var_costs=cells(var_costs, var_changes, var_scale),
+        coefficients=dict(base['coefficients'], **{k: float(v) for k, v in (delta.get('coefficients') or {}).items()}),
+        discount_rate=float(base['discount_rate']) + float(delta.get('rate_shift') or 0.0)
+    )
+
+def diff_delta(project_data, yearly_data=None, var_costs=None, coefficients=None):
+    """
+    Разреженные отличия отредактированных таблиц от базового проекта:
+    сохраняются только измененные ячейки и коэффициенты.
+    """
+    base = scenario(project_data)
+    delta = {}
+
+    def changed(old, new, columns):
+        cells = {}
+        for col in columns:
+            if col not in new:
+                continue
+            old_values = old[col].reindex(new.index) if col in old else pd.Series(np.nan, index=new.index)
+            if col == 'Коэффициент':
+                mask = old_values.astype(str) != new[col].astype(str)
+            else:
+                a = pd.to_numeric(old_values, errors='coerce').to_numpy(dtype=float)
+                b = pd.to_numeric(new[col], errors='coerce').to_numpy(dtype=float)
+                mask = ~((a == b) | (np.isnan(a) & np.isnan(b)))
+            if np.any(mask):
+                cells[col] = {str(label): value for label, value in new[col][np.asarray(mask)].items()}
+        return cells
+
+    if yearly_data is not None:
+        cells = changed(base['yearly_data'], pd.DataFrame(yearly_data), YEARLY_COLUMNS)
+        if cells:
+            delta['yearly_data'] = cells
+    if var_costs is not None:
+        cells = changed(base['var_costs'], pd.DataFrame(var_costs), LINE_CELL_COLUMNS)
+        if cells:
+            delta['var_costs'] = cells
+    if coefficients is not None:
+        overrides = {k: float(v) for k, v in coefficients.items() if float(base['coefficients'].get(k, np.nan)) != float(v)}
+        if overrides:
+            delta['coefficients'] = overrides
+    return delta
+
+class ScenarioBase:
+    """
+    Предрасчет проекта для пакетной оценки сценариев.
+
+    Затраты строк специалистов без коэффициента суммируются по группам
+    коэффициентов (периоды x коэффициенты), поэтому переменные затраты любого
+    сценария - произведение этой матрицы на вектор коэффициентов сценария.
+    Сценарий пересчитывает только измененные им строки затрат и ячейки по
+    периодам; данные проекта для сценариев не копируются.
+    """
+
+    def __init__(self, project_data):
+        df = prepare_yearly_data(project_data['yearly_data'])
+        self.n_periods = len(df)
+        self.grid = project_grid(project_data, self.n_periods)
+        self.periods = {str(label): i for i, label in enumerate(df.index)}
+        self.yearly = np.column_stack([df[col].to_numpy(dtype=float) for col in YEARLY_COLUMNS])
+
+        var_costs = prepare_var_costs(project_data['var_costs'], self.n_periods / self.grid.periods_per_year)
+        self.lines = {str(label): i for i, label in enumerate(var_costs.index)}
+        self.line_values = {col: var_costs[col].to_numpy(dtype=float) for col in LINE_COLUMNS}
+        # Коэффициенты сопоставляются по строковым именам, неизвестные дают NaN, как в расчетном ядре
+        self.line_coefficient = var_costs['Коэффициент'].astype(str).to_numpy(dtype=object)
+        self.coefficients = {str(k): float(v) for k, v in project_data['coefficients'].items()}
+        self.keys = list(dict.fromkeys(list(self.coefficients) + list(self.line_coefficient)))
+        self.groups, self.counts = self._group_units(self.line_values, self.line_coefficient)
+
+        self.discount_rate = float(project_data['discount_rate'])
+        self.impact_duration = int(project_data['impact_duration'])
+
+    def _unit_costs(self, values, lines):
+        """Затраты строк без коэффициента: периоды x строки"""
+        base = values['Количество'][lines] * values['Ставка'][lines]
+        return indexation_factors(values['Количество лет'][lines], values['Процент индексирования'][lines],
+                                  self.n_periods, self.grid) * base
+
+    def _group_units(self, values, line_coefficient, keys=None):
+        """Суммы затрат строк по коэффициентам (периоды x коэффициенты) и число строк коэффициентов"""
+        keys = self.keys if keys is None else keys
+        position = {key: k for k, key in enumerate(keys)}
+        groups = np.zeros((self.n_periods, len(keys)))
+        units = self._unit_costs(values, slice(None))
+        codes = np.array([position[key] for key in line_coefficient], dtype=int)
+        np.add.at(groups.T, codes, units.T)
+        return groups, np.bincount(codes, minlength=len(keys))
+
+    @staticmethod
+    def _var_total(groups, counts, coefficients):
+        """
+        Переменные затраты по периодам: коэффициенты без строк не участвуют,
+        чтобы неизвестный коэффициент (NaN) не давал NaN при нулевых затратах.
+        """
+        used = counts > 0
+        return coefficients[..., used] @ groups[:, used].T
+
+    def _coefficient_vector(self, keys, overrides):
+        coefficients = dict(self.coefficients, **{str(k): float(v) for k, v in (overrides or {}).items()})
+        return np.array([coefficients.get(key, np.nan) for key in keys])
+
+    def _scenario_groups(self, changes, keys):
+        """Суммы по группам коэффициентов и число строк групп с учетом измененных строк"""
+        lines = {}
+        for col, values in changes.items():
+            for label, value in values.items():
+                if str(label) not in self.lines:
+                    raise ValueError(f"В переменных затратах нет строки '{label}'")
+                lines.setdefault(self.lines[str(label)], {})[col] = value
+        index = np.array(sorted(lines))
+        values = {col: self.line_values[col][index].copy() for col in LINE_COLUMNS}
+        coefficient = self.line_coefficient[index].copy()
+        for k, line in enumerate(index):
+            for col, value in lines[line].items():
+                if col == 'Коэффициент':
+                    coefficient[k] = str(value)
+                elif col == 'Количество месяцев':
+                    values['Количество лет'][k] = to_number(value) / 12
+                else:
+                    values[col][k] = to_number(value)
+        position = {key: k for k, key in enumerate(keys)}
+        old = self._unit_costs(self.line_values, index)
+        if not np.all(np.isfinite(old)):
+            # Вычесть нечисловые затраты нельзя - суммы групп строятся заново
+            all_values = {col: self.line_values[col].copy() for col in LINE_COLUMNS}
+            all_coefficient = self.line_coefficient.copy()
+            for col in LINE_COLUMNS:
+                all_values[col][index] = values[col]
+            all_coefficient[index] = coefficient
+            return self._group_units(all_values, all_coefficient, keys)
+        extra = len(keys) - len(self.keys)
+        groups = np.pad(self.groups, ((0, 0), (0, extra)))
+        counts = np.pad(self.counts, (0, extra))
+        old_codes = [position[key] for key in self.line_coefficient[index]]
+        new_codes = [position[key] for key in coefficient]
+        np.subtract.at(groups.T, old_codes, old.T)
+        np.add.at(groups.T, new_codes, self._unit_costs(values, slice(None)).T)
+        np.subtract.at(counts, old_codes, 1)
+        np.add.at(counts, new_codes, 1)
+        return groups, counts
+
+    def _yearly(self, changes):
+        yearly = self.yearly.copy()
+        for col, values in changes.items():
+            for label, value in values.items():
+                if str(label) not in self.periods:
+                    raise ValueError(f"В данных по годам нет периода '{label}'")
+                yearly[self.periods[str(label)], YEARLY_COLUMNS.index(col)] = to_number(value)
+        return yearly
+
+    @staticmethod
+    def _cash_flow(yearly, var_total, multipliers):
+        """CF по периодам с множителями составляющих (для одного сценария или строк сценариев)"""
+        m = [multipliers[..., k, None] for k in range(len(CASH_FLOW_COMPONENTS))]
+        cfo = yearly[:, 0] * m[0] - yearly[:, 1] * m[1] - var_total * m[2]
+        return cfo + -(yearly[:, 2] * m[3])
+
+    def evaluate(self, deltas):
+        """
+        Денежные потоки сценариев: матрица CF сценарии x периоды, капитальные
+        затраты и ставки дисконтирования по сценариям.
+        """
+        for delta in deltas:
+            validate_delta(delta)
+        keys = list(dict.fromkeys(self.keys + [
+            str(value) for delta in deltas
+            for value in ((delta.get('var_costs') or {}).get('Коэффициент') or {}).values()]))
+        coefficients = np.array([self._coefficient_vector(keys, delta.get('coefficients')) for delta in deltas])
+        multipliers = np.array([[float((delta.get('multipliers') or {}).get(col, 1.0)) for col in CASH_FLOW_COMPONENTS]
+                                for delta in deltas]).reshape(len(deltas), len(CASH_FLOW_COMPONENTS))
+
+        # Сценарии без измененных строк делят общую матрицу групп: одно матричное умножение
+        extra = len(keys) - len(self.keys)
+        var_total = self._var_total(np.pad(self.groups, ((0, 0), (0, extra))), np.pad(self.counts, (0, extra)),
+                                    coefficients)
+        cf = self._cash_flow(self.yearly, var_total, multipliers)
+        capex = np.nansum(self.yearly[:, 2]) * multipliers[:, 3]
+        for s, delta in enumerate(deltas):
+            if not delta.get('var_costs') and not delta.get('yearly_data'):
+                continue
+            if delta.get('var_costs'):
+                var_total[s] = self._var_total(*self._scenario_groups(delta['var_costs'], keys), coefficients[s])
+            yearly = self._yearly(delta['yearly_data']) if delta.get('yearly_data') else self.yearly
+            cf[s] = self._cash_flow(yearly, var_total[s], multipliers[s])
+            capex[s] = np.nansum(yearly[:, 2]) * multipliers[s, 3]
+        rates = self.discount_rate + np.array([float(delta.get('rate_shift') or 0.0) for delta in deltas])
+        return cf, capex, rates
+
+def evaluate_scenarios(projects, scenarios, include_base=True):
+    """
+    Пакетная оценка сценариев портфеля за один векторный проход.
+
+    projects - {проект: project_data}, scenarios - {проект: {сценарий: отличия}}
+    (см. validate_delta); общий набор сценариев передается одним и тем же словарем
+    для каждого проекта.
+    Предрасчет каждого проекта выполняется один раз, сценарии применяют только
+    свои отличия. Возвращает таблицу NPV, IRR, срока окупаемости (в годах) и
+    индекса прибыльности по проектам и сценариям; для сценариев с нечисловыми
+    значениями в данных показатели - NaN.
+    """
+    rows = []
+    complete = []
+    cf_rows, capex, rates, impact, times, irr_times, periods_per_year = [], [], [], [], [], [], []
+    for name, project_data in projects.items():
+        named = ({BASE: {}} if include_base else {}) | dict(scenarios.get(name) or {})
+        if not named:
+            continue
+        base = ScenarioBase(project_data)
+        cf, capex_total, scenario_rates = base.evaluate(list(named.values()))
+        rows += [(name, scenario_name) for scenario_name in named]
+        cf_rows += list(cf)
+        complete += list(np.all(np.isfinite(cf), axis=1))
+        capex += list(capex_total)
+        rates += list(scenario_rates)
+        impact += [base.impact_duration] * len(named)
+        times += [base.grid.times] * len(named)
+        irr_times += [base.grid.irr_times] * len(named)
+        periods_per_year += [base.grid.periods_per_year] * len(named)
+
+    index = pd.MultiIndex.from_tuples(rows, names=['Проект', 'Сценарий'])
+    if not rows:
+        return pd.DataFrame(columns=RESULT_COLUMNS, index=index)
+    cf = cash_flow_matrix(cf_rows)
+    evaluation = evaluate_portfolio(cf, rates, impact, capex, times=cash_flow_matrix(times))
+    # IRR не определен для рядов короче двух периодов и нулевых рядов, как в calculate_irr
+    irr = solve_irr(cf, times=cash_flow_matrix(irr_times))
+    defined = (np.sum(~np.isnan(cf), axis=1) >= 2) & np.any(np.nan_to_num(cf) != 0, axis=1)
+    table = pd.DataFrame({
+        'NPV': evaluation['npv'],
+        'IRR': np.where(defined, irr, np.nan),
+        'Срок окупаемости': evaluation['payback_period'] / np.array(periods_per_year),
+        'Индекс прибыльности': evaluation['profitability_index']
+    }, index=index)
+    # Сценарии с нечисловыми значениями в данных не оцениваются (NaN отличается от дополнения рядов)
+    table[~np.array(complete)] = np.nan
+    return table
+
+def compare(table, base=BASE):
+    """Таблица сравнения сценариев проекта с базовым: показатели и изменения NPV и IRR"""
+    table = table.copy()
+    base_rows = table.xs(base, level='Сценарий') if base in table.index.get_level_values('Сценарий') else None
+    if base_rows is not None:
+        projects = table.index.get_level_values('Проект')
+        table['Изменение NPV'] = table['NPV'].to_numpy() - base_rows['NPV'].reindex(projects).to_numpy()
+        table['Изменение IRR'] = table['IRR'].to_numpy() - base_rows['IRR'].reindex(projects).to_numpy()
+    return table
+
+def describe(delta):
+    """Краткое описание отличий сценария для списка сценариев"""
+    parts = [f"{col}: {(float(m) - 1) * 100:+.1f}%" for col, m in (delta.get('multipliers') or {}).items()
+             if float(m) != 1]
+    if delta.get('rate_shift'):
+        parts.append(f"ставка: {float(delta['rate_shift']) * 100:+.2f} п.п.")
+    if delta.get('coefficients'):
+        parts.append("коэффициенты: " + ", ".join(f"{k}={float(v):g}" for k, v in delta['coefficients'].items()))
+    cells = sum(len(values) for key in ('yearly_data', 'var_costs') for values in (delta.get(key) or {}).values())
+    if cells:
+        parts.append(f"измененных ячеек: {cells}")
+    return "; ".join(parts) or "без изменений"
@@ -0,0 +1,63 @@
+import numpy as np
+from modules.engine import CASH_FLOW_COMPONENTS, COMPONENT_SIGNS
+from modules.portfolio import npv_components
+
+RATE_STEP = 0.001
+MAX_RATE_SHIFT = 0.10
+
+def build_sensitivity_model(df, discount_rate, impact_duration, max_shift=MAX_RATE_SHIFT, step=RATE_STEP, times=None):
+    """
+    Предрасчет модели чувствительности NPV.
+
+    NPV линеен по множителю каждой составляющей денежного потока, поэтому
+    достаточно один раз посчитать приведенную стоимость составляющих на сетке
+    ставок discount_rate +- max_shift с шагом step (шаг слайдера 0.1 п.п.).
+    После этого NPV любого сценария - скалярное произведение.
+    times - показатели степени дисконтирования периодов (см. modules.timegrid).
+    """
+    components = df[CASH_FLOW_COMPONENTS].to_numpy(dtype=float)
+    n_steps = int(round(max_shift / step))
+    rates = float(discount_rate) + np.arange(-n_steps, n_steps + 1) * step
+    return {
+        'discount_rate': float(discount_rate),
+        'impact_duration': int(impact_duration),
+        'step': step,
+        'n_steps': n_steps,
+        'components': components,
+        'times': times,
+        'table': npv_components(components, rates, impact_duration, times)
+    }
+
+def present_values(model, rate):
+    """Приведенная стоимость составляющих при ставке rate (из таблицы, если ставка на сетке)"""
+    position = (rate - model['discount_rate']) / model['step']
+    index = int(round(position))
+    if abs(position - index) < 1e-6 and abs(index) <= model['n_steps']:
+        return model['table'][index + model['n_steps']]
+    return npv_components(model['components'], [rate], model['impact_duration'], model.get('times'))[0]
+
+def multipliers(changes):
+    """Множители составляющих из изменений в процентах {составляющая: %}"""
+    return np.array([1 + changes.get(param, 0) / 100 for param in CASH_FLOW_COMPONENTS]) * COMPONENT_SIGNS
+
+def scenario_npv(model, changes, rate):
+    """NPV сценария: изменения составляющих в процентах и ставка дисконтирования"""
+    return float(present_values(model, rate) @ multipliers(changes))
+
+def tornado(model, changes, rate_change, rate, original_npv):
+    """
+    Данные диаграммы торнадо: (параметр, изменение NPV вниз, изменение NPV вверх).
+    Для составляющих денежный поток сценария масштабируется на -+|изменение|,
+    для ставки - ставка сдвигается на -+|изменение| п.п.
+    """
+    weights = multipliers(changes)
+    new_npv = present_values(model, rate) @ weights
+    tornado_data = []
+    for param, change in changes.items():
+        delta = abs(change) / 100
+        tornado_data.append((param, new_npv * (1 - delta) - original_npv, new_npv * (1 + delta) - original_npv))
+    delta = abs(rate_change) / 100
+    low_npv = present_values(model, rate - delta) @ weights
+    high_npv = present_values(model, rate + delta) @ weights
+    tornado_data.append(('Ставка дисконтирования', low_npv - original_npv, high_npv - original_npv))
+    return tornado_data
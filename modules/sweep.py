@@ -0,0 +1,213 @@
+import os
+import time
+from concurrent.futures import as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from modules.engine import CASH_FLOW_COMPONENTS as COMPONENTS, COMPONENT_SIGNS
+from modules.irr import solve_irr
+from modules.portfolio import npv_components
+
+RATE = 'Ставка дисконтирования'
+PARAMETERS = COMPONENTS + [RATE]
+METRICS = {'npv': 'NPV', 'irr': 'IRR'}
+
+# IRR считается блоками по CHUNK_SIZE точек сетки; начиная с PARALLEL_THRESHOLD
+# точек блоки распределяются по пулу процессов (если в нем больше одного процесса)
+CHUNK_SIZE = 4096
+PARALLEL_THRESHOLD = int(os.environ.get('ECONOMIC_SWEEP_PARALLEL', 50_000))
+
+def axis_values(start, stop, n_points):
+    """Равномерная ось сетки от start до stop из n_points значений"""
+    return np.linspace(float(start), float(stop), int(n_points))
+
+def default_axes(discount_rate, n_points=21):
+    """Оси по умолчанию: множители составляющих 0.5..1.5, ставка +-5 п.п."""
+    axes = {param: axis_values(0.5, 1.5, n_points) for param in COMPONENTS}
+    axes[RATE] = axis_values(discount_rate - 0.05, discount_rate + 0.05, n_points)
+    return axes
+
+def _along(values, axis, ndim):
+    """Одномерный массив, развернутый вдоль оси axis для транслирования"""
+    shape = [1] * ndim
+    shape[axis] = len(values)
+    return np.asarray(values).reshape(shape)
+
+def npv_grid(components, discount_rate, impact_duration, axes, times=None, dtype=np.float64):
+    """
+    NPV на полной сетке параметров.
+    NPV линеен по множителям составляющих, поэтому приведенная стоимость
+    составляющих считается один раз для каждой ставки оси, а NPV всей сетки -
+    сумма четырех транслируемых произведений без перебора точек.
+    """
+    names = list(axes)
+    ndim = len(names)
+    shape = tuple(len(axes[name]) for name in names)
+    rates = axes[RATE] if RATE in axes else [float(discount_rate)]
+    present_values = npv_components(components, rates, impact_duration, times) * COMPONENT_SIGNS
+
+    npv = np.zeros(shape, dtype=dtype)
+    for k, param in enumerate(COMPONENTS):
+        term = present_values[:, k]
+        term = _along(term, names.index(RATE), ndim) if RATE in axes else term[0]
+        if param in axes:
+            term = term * _along(axes[param], names.index(param), ndim)
+        npv += term
+    return npv
+
+def _irr_block(weighted, values, shape, irr_times, start, stop):
+    """
+    IRR точек сетки множителей с номерами start..stop.
+    weighted - составляющие периоды x 4 со знаками, values - значения осей
+    множителей (None - составляющая не меняется).
+    """
+    positions = np.unravel_index(np.arange(start, stop), shape) if shape else ()
+    multipliers = np.ones((stop - start, len(COMPONENTS)))
+    axis = 0
+    for k, axis_points in enumerate(values):
+        if axis_points is not None:
+            multipliers[:, k] = np.asarray(axis_points)[positions[axis]]
+            axis += 1
+    cf = multipliers @ weighted.T
+    # IRR не определен для рядов короче двух периодов и нулевых рядов, как в calculate_irr
+    if cf.shape[1] < 2:
+        return np.full(stop - start, np.nan)
+    irr = solve_irr(cf, times=irr_times)
+    return np.where(np.any(cf != 0, axis=1), irr, np.nan)
+
+def _irr_chunk(spec, start, stop):
+    """
+    Блок IRR в рабочем процессе: составляющие читаются, а результат пишется
+    в разделяемую память без передачи массивов через pickle.
+    """
+    base = shared_memory.SharedMemory(name=spec['base'])
+    out = shared_memory.SharedMemory(name=spec['out'])
+    try:
+        weighted = np.ndarray(spec['base_shape'], dtype=np.float64, buffer=base.buf)
+        result = np.ndarray((spec['size'],), dtype=spec['dtype'], buffer=out.buf)
+        result[start:stop] = _irr_block(weighted, spec['values'], spec['shape'], spec['irr_times'], start, stop)
+        # Представления буферов освобождаются до закрытия разделяемой памяти
+        del weighted, result
+    finally:
+        base.close()
+        out.close()
+    return stop - start
+
+def _shared_array(shape, dtype):
+    size = int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize
+    memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    return memory, np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+
+def irr_grid(components, axes, irr_times=None, dtype=np.float64, chunk_size=CHUNK_SIZE, parallel=None, progress=None):
+    """
+    IRR на сетке множителей составляющих (от ставки дисконтирования IRR не зависит,
+    поэтому ось ставки в расчет не входит). Возвращает массив по осям составляющих
+    в порядке axes.
+    parallel - распределять блоки по общему пулу процессов utils.jobs: составляющие
+    передаются рабочим процессам через разделяемую память, каждый процесс пишет
+    свой блок IRR в общий выходной массив. По умолчанию пул используется для
+    больших сеток, если в нем больше одного процесса. progress - функция
+    (посчитано точек, всего точек).
+    """
+    names = [name for name in axes if name in COMPONENTS]
+    shape = tuple(len(axes[name]) for name in names)
+    size = int(np.prod(shape, dtype=np.int64))
+    weighted = np.nan_to_num(np.asarray(components, dtype=float)) * COMPONENT_SIGNS
+    values = [np.asarray(axes[param], dtype=float) if param in axes else None for param in COMPONENTS]
+    bounds = [(start, min(start + chunk_size, size)) for start in range(0, size, chunk_size)]
+
+    from utils import jobs
+    if parallel is None:
+        parallel = size >= PARALLEL_THRESHOLD and jobs.MAX_WORKERS > 1
+    if not parallel:
+        irr = np.empty(size, dtype=dtype)
+        for start, stop in bounds:
+            irr[start:stop] = _irr_block(weighted, values, shape, irr_times, start, stop)
+            if progress is not None:
+                progress(stop, size)
+        return irr.reshape(shape)
+
+    base, shared_base = _shared_array(weighted.shape, np.float64)
+    out, shared_out = _shared_array((size,), dtype)
+    try:
+        shared_base[:] = weighted
+        spec = {'base': base.name, 'base_shape': weighted.shape, 'out': out.name, 'size': size,
+                'dtype': np.dtype(dtype).str, 'values': values, 'shape': shape, 'irr_times': irr_times}
+        executor = jobs.get_executor()
+        futures = [executor.submit(_irr_chunk, spec, start, stop) for start, stop in bounds]
+        done = 0
+        for future in as_completed(futures):
+            done += future.result()
+            if progress is not None:
+                progress(done, size)
+        irr = shared_out.reshape(shape).copy()
+    finally:
+        del shared_base, shared_out
+        base.close()
+        base.unlink()
+        out.close()
+        out.unlink()
+    return irr
+
+def sweep(df, discount_rate, impact_duration, axes, times=None, with_irr=False, dtype=np.float64,
+          chunk_size=CHUNK_SIZE, parallel=None, progress=None):
+    """
+    Расчет NPV (и при необходимости IRR) на полной N-мерной сетке параметров,
+    например 101 x 101 x 21 точек.
+
+    df - результаты расчета по периодам, axes - словарь {параметр: значения оси}
+    в порядке осей результата: для составляющих - множители к исходным значениям,
+    для ставки дисконтирования - сами ставки. Параметры без оси остаются исходными.
+    times - показатели степени дисконтирования периодов (см. modules.timegrid).
+    Возвращает словарь: имена и значения осей, массивы NPV и IRR формы сетки
+    (IRR - транслированное представление без копий вдоль оси ставки) и время расчета.
+    """
+    started = time.perf_counter()
+    unknown = [name for name in axes if name not in PARAMETERS]
+    if unknown:
+        raise ValueError(f"Неизвестные параметры сетки: {', '.join(unknown)}")
+    axes = {name: np.asarray(values, dtype=float) for name, values in axes.items()}
+    components = df[COMPONENTS].to_numpy(dtype=float)
+    names = list(axes)
+    shape = tuple(len(axes[name]) for name in names)
+
+    npv = npv_grid(components, discount_rate, impact_duration, axes, times, dtype)
+    irr = None
+    if with_irr:
+        irr_times = None if times is None else np.asarray(times) - times[0]
+        irr = irr_grid(components, axes, irr_times, dtype, chunk_size, parallel, progress)
+        if RATE in axes:
+            irr = np.broadcast_to(np.expand_dims(irr, names.index(RATE)), shape)
+    return {
+        'axes': names,
+        'values': [axes[name] for name in names],
+        'npv': npv,
+        'irr': irr,
+        'seconds': time.perf_counter() - started
+    }
+
+def base_position(result, name, discount_rate):
+    """Номер точки оси, ближайшей к исходному значению параметра"""
+    values = result['values'][result['axes'].index(name)]
+    return int(np.argmin(np.abs(values - (discount_rate if name == RATE else 1.0))))
+
+def data_table(result, rows, columns, metric='npv', fixed=None):
+    """
+    Двумерная таблица данных из результата sweep: строки - значения оси rows,
+    столбцы - значения оси columns. fixed - номера точек остальных осей
+    {параметр: номер}; по умолчанию берется первая точка.
+    """
+    if rows == columns:
+        raise ValueError("Для строк и столбцов таблицы нужны разные параметры")
+    values = result[metric]
+    if values is None:
+        raise ValueError(f"{METRICS[metric]} на сетке не рассчитан")
+    fixed = fixed or {}
+    index = tuple(slice(None) if name in (rows, columns) else fixed.get(name, 0) for name in result['axes'])
+    table = values[index]
+    if result['axes'].index(rows) > result['axes'].index(columns):
+        table = table.T
+    return pd.DataFrame(table, index=pd.Index(result['values'][result['axes'].index(rows)], name=rows),
+                        columns=pd.Index(result['values'][result['axes'].index(columns)], name=columns))
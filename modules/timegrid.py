@@ -0,0 +1,149 @@
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from modules.irr import solve_irr
+
+# Число периодов в году для поддерживаемой периодичности
+FREQUENCIES = {'Год': 1, 'Квартал': 4, 'Месяц': 12}
+DEFAULT_FREQUENCY = 'Год'
+PERIOD_UNITS = {'Год': 'лет', 'Квартал': 'кварталов', 'Месяц': 'месяцев'}
+DAYS_IN_YEAR = 365.0
+
+def _to_date(value):
+    if value is None:
+        return None
+    return pd.Timestamp(value).date()
+
+def year_fractions(dates, start_date=None):
+    """Доли года от start_date (по умолчанию самая ранняя дата) до каждой даты, база 365 дней"""
+    dates = pd.to_datetime(pd.Series(dates)).to_numpy(dtype='datetime64[D]')
+    start = dates.min() if start_date is None else np.datetime64(_to_date(start_date), 'D')
+    return (dates - start).astype(float) / DAYS_IN_YEAR
+
+@lru_cache(maxsize=256)
+def _grid_times(frequency, n_periods, dates):
+    if dates is not None:
+        times = year_fractions(dates[1:], dates[0])
+    else:
+        times = np.arange(1, n_periods + 1, dtype=float) / FREQUENCIES[frequency]
+    times.flags.writeable = False
+    return times
+
+@lru_cache(maxsize=1024)
+def _grid_factors(frequency, n_periods, dates, rate):
+    factors = (1 + rate) ** -_grid_times(frequency, n_periods, dates)
+    factors.flags.writeable = False
+    return factors
+
+class TimeGrid:
+    """
+    Сетка периодов расчета: годы, кварталы или месяцы либо фактические даты потоков.
+
+    times - показатели степени дисконтирования в годах для конца каждого периода,
+    поэтому годовая ставка применяется одинаково при любой периодичности; для годовой
+    сетки это 1, 2, ..., n, как в calculate_npv. Коэффициенты дисконтирования
+    кэшируются по сетке и ставке и переиспользуются между расчетами.
+    """
+
+    def __init__(self, n_periods, frequency=DEFAULT_FREQUENCY, dates=None, start_date=None):
+        if frequency not in FREQUENCIES:
+            raise ValueError(f"Неизвестная периодичность: {frequency}")
+        self.frequency = frequency
+        self.periods_per_year = FREQUENCIES[frequency]
+        self.n_periods = int(n_periods)
+        self.start_date = _to_date(start_date)
+        self.dates = None
+        if dates is not None:
+            self.dates = tuple(_to_date(d) for d in dates)
+            if len(self.dates) != self.n_periods:
+                raise ValueError("Число дат не совпадает с числом периодов")
+        elif self.start_date is not None:
+            offset = pd.DateOffset(months=12 // self.periods_per_year)
+            self.dates = tuple((pd.Timestamp(self.start_date) + offset * k).date()
+                               for k in range(1, self.n_periods + 1))
+
+    @property
+    def _dates_key(self):
+        if self.dates is None:
+            return None
+        # Без даты начала отсчет идет от первой даты потока, как в XNPV
+        return (self.start_date or self.dates[0],) + self.dates
+
+    @property
+    def times(self):
+        return _grid_times(self.frequency, self.n_periods, self._dates_key)
+
+    @property
+    def irr_times(self):
+        """Показатели степени для IRR: от первого периода, в годах (годовая ставка)"""
+        return self.times - self.times[0] if self.n_periods else self.times
+
+    @property
+    def years(self):
+        """Номер года каждого периода, начиная с 1"""
+        return np.arange(self.n_periods) // self.periods_per_year + 1
+
+    @property
+    def is_annual(self):
+        return self.periods_per_year == 1 and self.dates is None
+
+    def discount_factors(self, rate):
+        """Коэффициенты дисконтирования периодов для годовой ставки rate (только чтение)"""
+        return _grid_factors(self.frequency, self.n_periods, self._dates_key, float(rate))
+
+    def discount_matrix(self, rates):
+        """Коэффициенты дисконтирования для набора ставок: ставки x периоды"""
+        rates = np.atleast_1d(np.asarray(rates, dtype=float))
+        return (1 + rates[:, None]) ** -self.times
+
+    def labels(self):
+        """Подписи периодов для таблиц и графиков"""
+        if self.dates is not None:
+            return [d.isoformat() for d in self.dates]
+        if self.periods_per_year == 1:
+            return list(range(1, self.n_periods + 1))
+        suffix = 'К' if self.frequency == 'Квартал' else 'М'
+        return [f"{year}-{suffix}{k % self.periods_per_year + 1}" for k, year in enumerate(self.years)]
+
+def project_grid(project_data, n_periods):
+    """
+    Сетка периодов проекта. Периодичность берется из 'frequency' (по умолчанию годы),
+    даты - из столбца 'Дата' данных по годам или строятся от 'start_date'.
+    """
+    frequency = project_data.get('frequency') or DEFAULT_FREQUENCY
+    yearly_data = project_data.get('yearly_data')
+    dates = None
+    if yearly_data is not None and 'Дата' in yearly_data:
+        dates = pd.Series(yearly_data['Дата']).tolist()
+    start_date = project_data.get('start_date')
+    if isinstance(start_date, float) and np.isnan(start_date):
+        start_date = None
+    return TimeGrid(n_periods, frequency, dates=dates, start_date=start_date)
+
+def xnpv(rate, cash_flows, dates, start_date=None):
+    """
+    NPV денежных потоков с фактическими датами (аналог XNPV в Excel):
+    поток на дату d дисконтируется на (d - start_date) / 365 лет,
+    start_date по умолчанию - первая дата.
+    """
+    cf = np.asarray(cash_flows, dtype=float)
+    return float(np.sum(cf * (1 + rate) ** -year_fractions(dates, start_date)))
+
+def xirr(cash_flows, dates):
+    """
+    IRR денежных потоков с фактическими датами (аналог XIRR в Excel).
+    cash_flows - ряд (возвращается число или None) или матрица проекты x потоки
+    с общими датами либо матрицей дат по проектам (возвращается массив, NaN если IRR нет).
+    """
+    cf = np.asarray(cash_flows, dtype=float)
+    dates = np.asarray(dates)
+    if dates.ndim == 2:
+        times = np.vstack([year_fractions(row) for row in dates])
+    else:
+        times = year_fractions(dates)
+    if cf.ndim == 1:
+        irr = solve_irr(cf[None, :], times=times)[0]
+        return None if np.isnan(irr) else float(irr)
+    return solve_irr(cf, times=times)
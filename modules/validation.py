@@ -0,0 +1,184 @@
+import numpy as np
+import pandas as pd
+
+from modules.engine import CASH_FLOW_COMPONENTS, COMPONENT_SIGNS, YEARLY_COLUMNS
+from modules.portfolio import discount_factors
+from modules.project_model import coerced_values
+
+ISSUE_COLUMNS = ['Таблица', 'Строка', 'Столбец', 'Значение', 'Проблема']
+CHECK_COLUMNS = ['Проверка', 'Пройдена', 'Подробности']
+# Допуски сравнения - как у np.isclose
+RTOL = 1e-5
+ATOL = 1e-8
+
+NEGATIVE = "Отрицательное или нулевое значение"
+NEGATIVE_CAPEX = "Отрицательное значение"
+EMPTY = "Пустое значение"
+COERCED = "Нечисловое значение (заменено на NaN)"
+UNKNOWN_COEFFICIENT = "Неизвестный коэффициент"
+
+def _close(a, b):
+    """Поэлементное np.isclose; NaN с обеих сторон считается совпадением (пропуски проверяются отдельно)"""
+    return np.isclose(a, b, rtol=RTOL, atol=ATOL, equal_nan=True)
+
+def check_arrays(components, cf, npv, impact_durations, discount_rates=None, times=None, discounted=None, valid=None,
+                 skip_nan=False):
+    """
+    Проверки согласованности для пакета проектов за один векторизованный проход.
+
+    components - массив проекты x периоды x составляющие (CASH_FLOW_COMPONENTS),
+    cf и discounted - матрицы проекты x периоды, npv - NPV проектов,
+    valid - маска периодов проектов (False - дополнение до общей длины).
+    Без discounted дисконтированный CF считается по ставкам и times.
+    skip_nan - пропуски CF не входят в NPV (как в portfolio.evaluate_portfolio).
+    Возвращает словарь масок и величин формы проекты (x периоды).
+    """
+    components = np.asarray(components, dtype=float)
+    cf = np.asarray(cf, dtype=float)
+    n_projects, n_periods = cf.shape
+    valid = np.ones(cf.shape, dtype=bool) if valid is None else np.asarray(valid, dtype=bool)
+    impact = np.broadcast_to(np.asarray(impact_durations, dtype=float), (n_projects,))
+    in_impact = valid & (np.arange(n_periods) < impact[:, None])
+
+    # CF = выручка - фиксированные - переменные - капитальные затраты
+    expected_cf = components @ COMPONENT_SIGNS
+    cf_mismatch = valid & ~_close(expected_cf, cf)
+
+    discounted_mismatch = np.zeros(cf.shape, dtype=bool)
+    if discounted is None:
+        discounted = cf * discount_factors(discount_rates, n_periods, times)
+    elif discount_rates is not None:
+        expected = cf * discount_factors(discount_rates, n_periods, times)
+        discounted_mismatch = valid & ~_close(expected, discounted)
+
+    # NPV - сумма дисконтированного CF за срок влияния (NaN внутри срока дает NaN, как в calculate_npv)
+    summed = np.nan_to_num(discounted) if skip_nan else discounted
+    npv_impact = np.where(in_impact, summed, 0.0).sum(axis=1)
+    npv_total = np.where(valid, summed, 0.0).sum(axis=1)
+    npv = np.broadcast_to(np.asarray(npv, dtype=float), (n_projects,))
+
+    # Выручка и операционные затраты должны быть положительными, капитальные - неотрицательными
+    strict = np.array([col != 'Капитальные затраты' for col in CASH_FLOW_COMPONENTS])
+    with np.errstate(invalid='ignore'):
+        negative = valid[..., None] & np.where(strict, components <= 0, components < 0)
+    empty = valid[..., None] & np.isnan(components)
+
+    return {
+        'cf_mismatch': cf_mismatch,
+        'cf_residual': np.where(cf_mismatch, cf - expected_cf, 0.0),
+        'discounted_mismatch': discounted_mismatch,
+        'npv_impact': npv_impact,
+        'npv_total': npv_total,
+        'npv_mismatch': ~_close(npv_impact, npv),
+        'discounted': discounted,
+        'negative': negative,
+        'empty': empty
+    }
+
+def coerced_cells(project_data):
+    """
+    Ячейки входных таблиц, которые pd.to_numeric(errors='coerce') превращает в NaN:
+    непустые нечисловые значения числовых столбцов (в том числе запомненные
+    compact_project до приведения таблиц), а также строки затрат с коэффициентом,
+    которого нет среди коэффициентов проекта.
+    Возвращает таблицу проблем (столбцы ISSUE_COLUMNS).
+    """
+    values = [project_data.get('coerced'), coerced_values(project_data)]
+    frames = [frame.assign(**{'Проблема': COERCED}) for frame in values if frame is not None]
+
+    var_costs = pd.DataFrame(project_data['var_costs'])
+    if 'Коэффициент' in var_costs.columns:
+        keys = var_costs['Коэффициент'].astype(object)
+        unknown = ~keys.isin(list(project_data['coefficients']))
+        frames.append(pd.DataFrame({
+            'Таблица': 'Переменные затраты',
+            'Строка': var_costs.index[unknown].astype(str),
+            'Столбец': 'Коэффициент',
+            'Значение': keys[unknown].astype(str).to_numpy(),
+            'Проблема': UNKNOWN_COEFFICIENT
+        }))
+    frames = [frame for frame in frames if len(frame)]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=ISSUE_COLUMNS)
+
+def _value_issues(df, checks, labels):
+    """Отрицательные, нулевые и пустые значения составляющих с их периодами"""
+    components = df[CASH_FLOW_COMPONENTS].to_numpy(dtype=float)
+    negative_problem = np.where(np.asarray(CASH_FLOW_COMPONENTS) == 'Капитальные затраты', NEGATIVE_CAPEX, NEGATIVE)
+    problem = np.where(checks['empty'][0], EMPTY, np.where(checks['negative'][0], negative_problem, ''))
+    rows, cols = np.nonzero(problem != '')
+    return pd.DataFrame({
+        'Таблица': 'Результаты',
+        'Строка': labels[rows],
+        'Столбец': np.asarray(CASH_FLOW_COMPONENTS)[cols],
+        'Значение': components[rows, cols],
+        'Проблема': problem[rows, cols]
+    }, columns=ISSUE_COLUMNS)
+
+def validate_project(results, project_data):
+    """
+    Отчет проверки расчета проекта без обращения к Streamlit.
+    Возвращает словарь: ok - все проверки пройдены, checks - таблица проверок,
+    issues - ячейки с проблемами (периоды результата и ячейки входных таблиц),
+    npv_by_period - дисконтированный CF и накопленный NPV за срок влияния,
+    npv_impact и npv_total - NPV за срок влияния и за весь срок.
+    """
+    df = results['df']
+    npv = results['npv']
+    impact_duration = int(project_data['impact_duration'])
+    checks = check_arrays(df[CASH_FLOW_COMPONENTS].to_numpy(dtype=float)[None], df['CF'].to_numpy(dtype=float)[None],
+                          npv, impact_duration, float(project_data['discount_rate']), results.get('times'),
+                          df['Дисконтированный CF'].to_numpy(dtype=float)[None])
+    labels = (df['Период'] if 'Период' in df.columns else df['Год']).astype(str).to_numpy()
+
+    coerced = coerced_cells(project_data)
+    values = _value_issues(df, checks, labels)
+    issues = pd.concat([frame for frame in (coerced, values) if len(frame)] or [values], ignore_index=True)
+
+    n_cf = int(checks['cf_mismatch'].sum())
+    n_discounted = int(checks['discounted_mismatch'].sum())
+    npv_impact = float(checks['npv_impact'][0])
+    npv_total = float(checks['npv_total'][0])
+    n_negative = int((values['Проблема'] != EMPTY).sum())
+    n_empty = int((values['Проблема'] == EMPTY).sum())
+    check_table = pd.DataFrame([
+        ("CF = выручка - затраты", n_cf == 0,
+         f"Расхождений: {n_cf}, наибольшее {np.abs(checks['cf_residual']).max():.2f}" if n_cf else "Совпадает"),
+        ("Дисконтированный CF = CF x коэффициент дисконтирования", n_discounted == 0,
+         f"Расхождений: {n_discounted}" if n_discounted else "Совпадает"),
+        ("NPV = сумма дисконтированного CF за срок влияния", not checks['npv_mismatch'][0],
+         f"NPV {npv:.2f}, за срок влияния ({impact_duration} пер.) {npv_impact:.2f}, за весь срок {npv_total:.2f}"),
+        ("Нет отрицательных и нулевых значений", n_negative == 0, f"Ячеек: {n_negative}"),
+        ("Нет пустых значений", n_empty == 0, f"Ячеек: {n_empty}"),
+        ("Нет нечисловых значений во входных данных", coerced.empty, f"Ячеек: {len(coerced)}")
+    ], columns=CHECK_COLUMNS)
+
+    discounted = df['Дисконтированный CF'].to_numpy(dtype=float)[:impact_duration]
+    return {
+        'ok': bool(check_table['Пройдена'].all()),
+        'checks': check_table,
+        'issues': issues,
+        'npv_by_period': pd.DataFrame({'Период': labels[:impact_duration], 'Дисконтированный CF': discounted,
+                                       'Накопленный NPV': np.cumsum(discounted)}),
+        'npv_impact': npv_impact,
+        'npv_total': npv_total
+    }
+
+def batch_report(matrices, discount_rates, impact_durations, npv, coerced=None, index=None):
+    """
+    Сводка проверок по проектам пакета без построения отчетов по ячейкам:
+    matrices - матрицы проекты x периоды пакетной загрузки (составляющие, CF, times),
+    npv - NPV проектов, coerced - число нечисловых ячеек входных данных по проектам.
+    """
+    times = np.asarray(matrices['times'], dtype=float)
+    components = np.stack([np.asarray(matrices[col], dtype=float) for col in CASH_FLOW_COMPONENTS], axis=-1)
+    checks = check_arrays(components, matrices['CF'], npv, impact_durations, discount_rates,
+                          np.nan_to_num(times), valid=~np.isnan(times), skip_nan=True)
+    table = pd.DataFrame({
+        'Расхождения CF': checks['cf_mismatch'].sum(axis=1),
+        'Расхождение NPV': checks['npv_mismatch'],
+        'Отрицательные и нулевые': checks['negative'].sum(axis=(1, 2)),
+        'Пустые значения': checks['empty'].sum(axis=(1, 2)),
+        'Нечисловые значения': 0 if coerced is None else np.asarray(coerced, dtype=int)
+    }, index=index)
+    table['Проверки пройдены'] = ~table['Расхождение NPV'] & (table.drop(columns='Расхождение NPV').sum(axis=1) == 0)
+    return table
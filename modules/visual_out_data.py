@@ -1,50 +1,37 @@
 import streamlit as st
-import plotly.graph_objects as go
-import plotly.express as px
 import pandas as pd
+from modules.calculate import get_results
+from modules import charts
 
 def render():
     st.header("Визуализация результатов")
 
-    if 'calculation_results' not in st.session_state:
-        st.warning("Пожалуйста, сначала выполните расчеты на странице 'Расчеты'")
+    if 'project_data' not in st.session_state:
+        st.warning("Пожалуйста, сначала введите данные на странице 'Ввод данных' и сохраните их.")
         return
 
-    results = st.session_state['calculation_results']
+    project_data = st.session_state['project_data']
+    results = get_results(project_data)
     df = results['df']
+    # Графики кэшируются по хэшу расчета и не строятся заново при переключении страниц
+    key = st.session_state['calculation_key']
 
     st.subheader("График изменения CF и дисконтированного CF по годам")
-    fig_cf = go.Figure()
-    fig_cf.add_trace(go.Scatter(x=df['Год'], y=df['CF'], mode='lines+markers', name='CF'))
-    fig_cf.add_trace(go.Scatter(x=df['Год'], y=df['Дисконтированный CF'], mode='lines+markers', name='Дисконтированный CF'))
-    fig_cf.update_layout(title='Денежные потоки по годам', xaxis_title='Год', yaxis_title='Значение')
-    st.plotly_chart(fig_cf)
+    st.plotly_chart(charts.cached_figure(key, 'cash_flow', charts.cash_flow_figure, df))
 
     st.subheader("Структура затрат")
-    costs_data = {
-        'Категория': ['Фиксированные операционные', 'Переменные операционные', 'Капитальные'],
-        'Сумма': [
-            df['Фиксированные операционные затраты'].sum(),
-            df['Переменные операционные затраты'].sum(),
-            df['Капитальные затраты'].sum()
-        ]
-    }
-    fig_costs = px.pie(costs_data, values='Сумма', names='Категория', title='Структура затрат')
-    st.plotly_chart(fig_costs)
+    st.plotly_chart(charts.cached_figure(key, 'cost_structure', charts.cost_structure_figure, df))
 
     st.subheader("График накопленного NPV")
-    df['Накопленный NPV'] = df['Дисконтированный CF'].cumsum()
-    fig_npv = px.line(df, x='Год', y='Накопленный NPV', title='Накопленный NPV по годам')
-    st.plotly_chart(fig_npv)
+    st.plotly_chart(charts.cached_figure(key, 'cumulative_npv', charts.cumulative_npv_figure, df))
 
     st.subheader("Тепловая карта переменных операционных затрат")
-    var_costs = pd.DataFrame(st.session_state['project_data']['var_costs'])
-    var_costs['Общие затраты'] = var_costs['Количество'] * var_costs['Ставка'] * var_costs['Коэффициент'].map(st.session_state['project_data']['coefficients'])
-    fig_heatmap = px.imshow(var_costs['Общие затраты'].values.reshape(1, -1),
-                            labels=dict(x="Категория специалистов", y="", color="Затраты"),
-                            x=var_costs.index,
-                            title="Тепловая карта переменных операционных затрат")
-    st.plotly_chart(fig_heatmap)
+    n_categories = pd.DataFrame(project_data['var_costs']).index.nunique()
+    top_n = n_categories
+    if n_categories > charts.HEATMAP_TOP_N:
+        top_n = st.slider("Число категорий специалистов (остальные - в строке \"Прочие\")",
+                          2, min(n_categories, 100), charts.HEATMAP_TOP_N)
+    st.plotly_chart(charts.cached_figure(key, f'cost_heatmap.{top_n}', charts.cost_heatmap_figure, project_data, top_n))
 
 if __name__ == "__main__":
     render()
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from openpyxl import Workbook
+
+from modules.engine import calculate_project
+from utils import bulk_import, export, synthetic, utils
+
+def _write(path, index, frequency='Год'):
+    project_data = synthetic.generate_project(index, seed=8, frequency=frequency)
+    export.write_results_xlsx(str(path), project_data)
+    return project_data
+
+@pytest.mark.parametrize('frequency', ['Год', 'Месяц'])
+def test_parse_workbook_matches_load_from_excel(tmp_path, frequency):
+    path = tmp_path / 'project.xlsx'
+    project_data = _write(path, 0, frequency)
+    parsed = bulk_import.parse_workbook(str(path))
+    loaded = utils.load_from_excel(str(path))
+    for key in ('project_duration', 'impact_duration', 'discount_rate', 'frequency', 'coefficients'):
+        assert parsed[key] == loaded[key]
+    assert calculate_project(parsed)['npv'] == pytest.approx(calculate_project(project_data)['npv'], rel=1e-12)
+    assert calculate_project(parsed)['npv'] == pytest.approx(calculate_project(loaded)['npv'], rel=1e-12)
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_bulk_import_reports_broken_files(tmp_path, max_workers):
+    projects = {f"p{index}.xlsx": _write(tmp_path / f"p{index}.xlsx", index) for index in range(3)}
+    (tmp_path / 'broken.xlsx').write_bytes(b'not a workbook')
+    incomplete = Workbook()
+    incomplete.active.title = 'Параметры проекта'
+    incomplete.save(tmp_path / 'incomplete.xlsx')
+
+    result = bulk_import.bulk_import(str(tmp_path), max_workers=max_workers)
+    assert result['stats']['files'] == 5
+    assert sorted(result['names']) == sorted(projects)
+    errors = dict(zip(result['errors']['Файл'], result['errors']['Ошибка']))
+    assert set(errors) == {'broken.xlsx', 'incomplete.xlsx'}
+    assert 'нет листов' in errors['incomplete.xlsx']
+
+    for row, name in enumerate(result['names']):
+        expected = calculate_project(projects[name])['df']
+        cf = result['matrices']['CF'][row]
+        np.testing.assert_allclose(cf[~np.isnan(cf)], expected['CF'], rtol=1e-12)
+    assert (result['coerced'] == 0).all()
+
+def test_bulk_import_reads_zip_archives(tmp_path):
+    synthetic.write_workbooks(str(tmp_path / 'portfolio.zip'), 4, seed=3)
+    result = bulk_import.bulk_import(str(tmp_path / 'portfolio.zip'), max_workers=1)
+    assert result['names'] == [f"{synthetic.project_name(index)}.xlsx" for index in range(4)]
+    assert result['errors'].empty
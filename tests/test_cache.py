@@ -0,0 +1,43 @@
+import numpy as np
+
+from modules.project_model import compact_project
+from utils import synthetic
+from utils.cache import project_hash
+
+def test_hash_does_not_depend_on_representation():
+    project_data = synthetic.generate_project(0, seed=3)
+    as_dicts = dict(project_data, yearly_data=project_data['yearly_data'].to_dict(),
+                    var_costs=project_data['var_costs'].to_dict())
+    reordered = dict(reversed(list(project_data.items())))
+    key = project_hash(project_data)
+    assert project_hash(as_dicts) == key
+    assert project_hash(compact_project(project_data)) == key
+    assert project_hash(reordered) == key
+
+def test_hash_is_stable_between_calls():
+    assert project_hash(synthetic.generate_project(4, seed=3)) == project_hash(synthetic.generate_project(4, seed=3))
+
+def test_hash_ignores_number_types():
+    project_data = synthetic.generate_project(0, seed=3)
+    assert project_hash(dict(project_data, project_duration=np.int64(5))) == project_hash(
+        dict(project_data, project_duration=5.0))
+
+def test_hash_changes_with_inputs():
+    project_data = synthetic.generate_project(0, seed=3)
+    key = project_hash(project_data)
+    yearly_data = project_data['yearly_data'].copy()
+    yearly_data.iloc[0, 0] += 1
+    assert project_hash(dict(project_data, yearly_data=yearly_data)) != key
+    assert project_hash(dict(project_data, discount_rate=project_data['discount_rate'] + 0.01)) != key
+    assert project_hash(dict(project_data, coefficients=dict(project_data['coefficients'], K1=2.0))) != key
+
+def test_hash_depends_on_row_order():
+    project_data = synthetic.generate_project(0, seed=3, horizon=12)
+    # Те же пары (период, значение) в другом порядке дают другой CF по периодам
+    reordered = project_data['yearly_data'].iloc[::-1]
+    assert project_hash(dict(project_data, yearly_data=reordered)) != project_hash(project_data)
+    # Ключи периодов не сортируются как строки ('10' < '2'): порядок словаря сохраняется
+    as_dicts = dict(project_data, yearly_data=project_data['yearly_data'].to_dict())
+    assert project_hash(as_dicts) == project_hash(project_data)
+    shuffled = {col: dict(reversed(list(values.items()))) for col, values in as_dicts['yearly_data'].items()}
+    assert project_hash(dict(as_dicts, yearly_data=shuffled)) != project_hash(project_data)
@@ -0,0 +1,91 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from modules.capital_budget import annual_capex, optimize_budget
+
+def brute_force(npv, capex, budget, mandatory, groups):
+    """Лучший допустимый набор перебором всех подмножеств"""
+    best = -np.inf
+    for selected in itertools.product([False, True], repeat=len(npv)):
+        selected = np.array(selected)
+        if not selected[mandatory].all() or np.any(capex[selected].sum(axis=0) > budget + 1e-9):
+            continue
+        labels = groups[selected & (groups >= 0)]
+        if len(labels) != len(set(labels)):
+            continue
+        best = max(best, npv[selected].sum())
+    return best
+
+def random_case(seed, n_years):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(4, 11))
+    npv = rng.integers(-20, 100, n).astype(float)
+    capex = rng.integers(0, 40, (n, n_years)).astype(float)
+    budget = capex.sum(axis=0) * rng.uniform(0.2, 0.7)
+    mandatory = np.zeros(n, dtype=bool)
+    mandatory[rng.choice(n, int(rng.integers(0, 2)), replace=False)] = True
+    groups = np.where(rng.random(n) < 0.4, rng.integers(0, 2, n), -1)
+    return npv, capex, budget, mandatory, groups
+
+def check(result, npv, capex, budget, mandatory, groups):
+    expected = brute_force(npv, capex, budget, mandatory, groups)
+    if result['bound'] is None:
+        # Обязательные проекты не укладываются в бюджет
+        assert expected == -np.inf
+        return None
+    selected = result['selected']
+    assert selected[mandatory].all()
+    assert np.all(capex[selected].sum(axis=0) <= budget + 1e-9)
+    labels = groups[selected & (groups >= 0)]
+    assert len(labels) == len(set(labels))
+    assert result['npv'] == pytest.approx(npv[selected].sum())
+    assert result['bound'] >= result['npv'] - 1e-9
+    return expected
+
+@pytest.mark.parametrize('seed', range(30))
+def test_dp_matches_brute_force(seed):
+    npv, capex, budget, mandatory, groups = random_case(seed, 1)
+    exclusive = [f"Группа {g}" if g >= 0 else '' for g in groups]
+    result = optimize_budget(npv, capex, budget, mandatory=mandatory, exclusive=exclusive, method='dp')
+    expected = check(result, npv, capex, budget, mandatory, groups)
+    if expected is not None:
+        assert result['npv'] == pytest.approx(expected)
+
+@pytest.mark.parametrize('seed', range(30))
+def test_milp_matches_brute_force(seed):
+    npv, capex, budget, mandatory, groups = random_case(seed, 3)
+    exclusive = [f"Группа {g}" if g >= 0 else None for g in groups]
+    result = optimize_budget(npv, capex, budget, mandatory=np.nonzero(mandatory)[0], exclusive=exclusive)
+    expected = check(result, npv, capex, budget, mandatory, groups)
+    if expected is not None:
+        assert result['method'] == 'milp'
+        assert result['npv'] == pytest.approx(expected, rel=1e-3)
+
+@pytest.mark.parametrize('method', ['dp', 'milp'])
+def test_no_candidates(method):
+    capex = [[1.0], [2.0]] if method == 'dp' else [[1.0, 1.0], [2.0, 2.0]]
+    result = optimize_budget([-5, -3], capex, 10, method=method)
+    assert not result['selected'].any()
+    assert result['npv'] == 0.0 and result['gap'] == 0.0
+
+    result = optimize_budget([5, 3], capex, 10, mandatory=[0, 1], method=method)
+    assert result['selected'].all()
+    assert result['npv'] == 8.0 and result['bound'] == 8.0
+
+def test_mandatory_over_budget():
+    result = optimize_budget([5, 3], [8, 4], 10, mandatory=[0, 1])
+    assert result['bound'] is None
+    assert result['status'] == "Обязательные проекты не укладываются в бюджет"
+
+def test_invalid_method():
+    with pytest.raises(ValueError):
+        optimize_budget([5, 3], [[1, 1], [2, 2]], 10, method='dp')
+    with pytest.raises(ValueError):
+        optimize_budget([5, 3], [1, 2], 10, method='simplex')
+
+def test_annual_capex_sums_quarters_into_years():
+    capex = [[1.0, 2.0, 3.0, 4.0, 5.0], [0.0, 0.0, 0.0, 1.0, np.nan]]
+    times = [0.25, 0.5, 0.75, 1.0, 1.25]
+    np.testing.assert_allclose(annual_capex(capex, times), [[10.0, 5.0], [1.0, 0.0]])
@@ -0,0 +1,47 @@
+import numpy as np
+import plotly.graph_objects as go
+import pytest
+
+from modules.charts import OTHER_LABEL, cost_heatmap_matrix, line_trace, lttb
+from modules.engine import calculate_project
+from utils import synthetic
+
+@pytest.mark.parametrize('n, n_out', [(10, 3), (1000, 50), (10001, 2000), (120, 119)])
+def test_lttb_keeps_endpoints_and_point_count(n, n_out):
+    y = np.random.default_rng(n).normal(size=n).cumsum()
+    indices = lttb(y, n_out)
+    assert len(indices) == n_out
+    assert indices[0] == 0 and indices[-1] == n - 1
+    assert np.all(np.diff(indices) > 0)
+
+def test_lttb_keeps_spikes():
+    y = np.zeros(1000)
+    y[[137, 612]] = [50.0, -80.0]
+    indices = lttb(y, 20)
+    assert 137 in indices and 612 in indices
+
+def test_lttb_short_series_is_unchanged():
+    np.testing.assert_array_equal(lttb([1.0, 2.0, 3.0], 10), [0, 1, 2])
+    np.testing.assert_array_equal(lttb(np.arange(10.0), 2), np.arange(10))
+
+def test_lttb_with_uneven_x():
+    x = np.sort(np.random.default_rng(1).uniform(0, 100, 500))
+    indices = lttb(np.sin(x), 40, x)
+    assert len(indices) == 40 and indices[0] == 0 and indices[-1] == 499
+
+def test_line_trace_downsamples_long_series():
+    x = np.arange(5000)
+    trace = line_trace(x, np.sin(x / 100), 'CF', max_points=300, webgl_threshold=200)
+    assert isinstance(trace, go.Scattergl)
+    assert len(trace.y) == 300
+    assert trace.x[0] == 0 and trace.x[-1] == 4999
+
+    trace = line_trace(x[:50], np.sin(x[:50]), 'CF', max_points=300, webgl_threshold=200)
+    assert isinstance(trace, go.Scatter) and len(trace.y) == 50
+
+def test_cost_heatmap_totals_match_engine():
+    project_data = synthetic.generate_project(0, seed=3, frequency='Квартал', n_lines=30)
+    var_costs = calculate_project(project_data)['df']['Переменные операционные затраты'].to_numpy()
+    matrix = cost_heatmap_matrix(project_data, top_n=5)
+    assert len(matrix) == 5 and matrix.index[-1] == OTHER_LABEL
+    np.testing.assert_allclose(matrix.sum(axis=0), var_costs, rtol=1e-12)
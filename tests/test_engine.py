@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import optimize
+
+from modules.engine import calculate_project
+from modules.input_data import generate_test_data
+from modules.project_model import compact_project
+from utils import synthetic, utils
+
+def baseline_irr(cash_flows):
+    """calculate_irr исходной страницы 'Расчеты' (a0dcb51)"""
+    if len(cash_flows) < 2 or np.all(cash_flows == 0):
+        return None
+
+    def npv_func(rate, cash_flows):
+        return np.sum(cash_flows / (1 + rate) ** np.arange(len(cash_flows)))
+    try:
+        return optimize.brentq(lambda r: npv_func(r, cash_flows), -1.0, 1.0)
+    except ValueError:
+        return None
+
+def baseline_loop(data):
+    """Расчет исходной страницы 'Расчеты' (a0dcb51, modules/calculate.py) без вывода в Streamlit"""
+    df = pd.DataFrame(data['yearly_data'])
+    df['Год'] = range(1, len(df) + 1)
+    for col in ['Выручка', 'Фиксированные операционные затраты', 'Капитальные затраты']:
+        df[col] = pd.to_numeric(df[col], errors='coerce').astype(float)
+
+    var_costs = pd.DataFrame(data['var_costs'])
+    if 'Количество лет' in var_costs.columns:
+        var_costs['Количество лет'] = pd.to_numeric(var_costs['Количество лет'], errors='coerce').astype(float)
+    else:
+        var_costs['Количество лет'] = pd.to_numeric(var_costs['Количество месяцев'], errors='coerce').astype(float)
+    var_costs['Количество'] = pd.to_numeric(var_costs['Количество'], errors='coerce').astype(float)
+    var_costs['Ставка'] = pd.to_numeric(var_costs['Ставка'], errors='coerce').astype(float)
+    var_costs['Процент индексирования'] = pd.to_numeric(var_costs['Процент индексирования'], errors='coerce').astype(float)
+
+    coefficients = {k: float(v) for k, v in data['coefficients'].items()}
+
+    total_var_costs = []
+    for year in range(1, len(df) + 1):
+        year_var_costs = 0
+        for _, row in var_costs.iterrows():
+            if year <= row['Количество лет']:
+                year_var_costs += row['Количество'] * row['Ставка'] * coefficients[row['Коэффициент']]
+            else:
+                year_var_costs += row['Количество'] * row['Ставка'] * coefficients[row['Коэффициент']] * (1 + row['Процент индексирования']) ** (year - 1)
+        total_var_costs.append(year_var_costs)
+
+    df['Переменные операционные затраты'] = total_var_costs
+    df['CF'] = (df['Выручка'] - df['Фиксированные операционные затраты'] - df['Переменные операционные затраты']
+                - df['Капитальные затраты'])
+    discount_rate = float(data['discount_rate'])
+    impact_duration = int(data['impact_duration'])
+    df['Дисконтированный CF'] = df['CF'] / (1 + discount_rate) ** df['Год']
+    npv = 0
+    for i in range(min(len(df['CF']), impact_duration)):
+        npv += df['CF'].iloc[i] / (1 + discount_rate) ** (i + 1)
+    return df, npv, baseline_irr(df['CF'])
+
+def assert_matches_baseline(results, baseline):
+    df, npv, irr = baseline
+    for col in ['Переменные операционные затраты', 'CF', 'Дисконтированный CF']:
+        np.testing.assert_allclose(results['df'][col], df[col], rtol=1e-12)
+    assert results['npv'] == pytest.approx(npv, rel=1e-12)
+    if irr is not None:
+        assert results['irr'] == pytest.approx(irr, rel=1e-6, abs=1e-9)
+
+def ui_project(seed):
+    """Проект из тестовых данных страницы 'Ввод данных'"""
+    yearly_data, var_costs = generate_test_data(5, seed=seed)
+    return {'project_duration': 5, 'impact_duration': 3, 'discount_rate': 0.1,
+            'coefficients': {'K1': 1.0, 'K2': 1.2, 'K3': 1.5, 'K4': 1.3, 'K5': 1.1},
+            'yearly_data': yearly_data.to_dict(), 'var_costs': var_costs.to_dict()}
+
+@pytest.mark.parametrize('seed', range(5))
+def test_engine_matches_baseline_on_input_page_data(seed):
+    project_data = ui_project(seed)
+    assert_matches_baseline(calculate_project(project_data), baseline_loop(project_data))
+
+@pytest.mark.parametrize('index', range(5))
+@pytest.mark.parametrize('prepare', [lambda p: p, compact_project, lambda p: dict(
+    p, yearly_data=p['yearly_data'].to_dict(), var_costs=p['var_costs'].to_dict())])
+def test_engine_matches_baseline_on_synthetic_projects(index, prepare):
+    project_data = synthetic.generate_project(index, seed=11, horizon=(3, 10), n_lines=(1, 40))
+    assert_matches_baseline(calculate_project(prepare(project_data)), baseline_loop(project_data))
+
+def test_excel_template_without_duration_column():
+    # В шаблоне Excel нет срока ставки и индексации: исходный цикл на нем падал,
+    # ядро считает, что ставка действует весь срок проекта
+    project_data = utils.load_from_excel('data/test_project_data.xlsx')
+    with pytest.raises(KeyError):
+        baseline_loop(project_data)
+    n_years = len(pd.DataFrame(project_data['yearly_data']))
+    completed = dict(project_data, var_costs=dict(project_data['var_costs'], **{
+        'Количество лет': dict.fromkeys(project_data['var_costs']['Ставка'], n_years),
+        'Процент индексирования': dict.fromkeys(project_data['var_costs']['Ставка'], 0.0)}))
+    assert_matches_baseline(calculate_project(project_data), baseline_loop(completed))
+
+def test_months_are_converted_to_years():
+    # Исходный цикл сравнивал 'Количество месяцев' с номером года; ядро переводит месяцы в годы
+    project_data = ui_project(0)
+    var_costs = pd.DataFrame(project_data['var_costs'])
+    months = var_costs.drop(columns='Количество лет').assign(**{'Количество месяцев': var_costs['Количество лет'] * 12})
+    results = calculate_project(dict(project_data, var_costs=months.to_dict()))
+    assert_matches_baseline(results, baseline_loop(project_data))
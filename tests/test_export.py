@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.engine import calculate_project
+from utils import export, synthetic, utils
+
+@pytest.fixture(scope='module')
+def project():
+    project_data = synthetic.generate_project(0, seed=12, n_lines=40)
+    return project_data, calculate_project(project_data)
+
+def test_streamed_workbook_is_readable_by_load_from_excel(project):
+    project_data, results = project
+    loaded = utils.load_from_excel(export.results_xlsx_file(project_data, results))
+    for key in ('project_duration', 'impact_duration', 'discount_rate', 'frequency', 'coefficients'):
+        assert loaded[key] == project_data[key]
+    assert calculate_project(loaded)['npv'] == pytest.approx(results['npv'], rel=1e-12)
+
+def test_workbook_chunks_do_not_change_content(project, tmp_path):
+    project_data, results = project
+    export.write_results_xlsx(str(tmp_path / 'small.xlsx'), project_data, results, chunk_rows=7)
+    sheets = pd.read_excel(tmp_path / 'small.xlsx', sheet_name=None, index_col=0)
+    pd.testing.assert_frame_equal(sheets['Переменные затраты'], project_data['var_costs'], check_names=False,
+                                  check_dtype=False)
+    np.testing.assert_allclose(sheets['Результаты расчетов']['CF'], results['df']['CF'].to_numpy())
+    assert pd.read_excel(tmp_path / 'small.xlsx', 'Итоговые показатели')['NPV'][0] == pytest.approx(results['npv'])
+
+def test_rows_beyond_excel_limit_continue_on_next_sheet(monkeypatch, tmp_path):
+    monkeypatch.setattr(export, 'EXCEL_MAX_ROWS', 11)
+    columns = {'npv': np.arange(25.0)}
+    export.export_chunks(export.array_chunks(columns, chunk_rows=4), str(tmp_path / 'npv.xlsx'))
+    sheets = pd.read_excel(tmp_path / 'npv.xlsx', sheet_name=None)
+    assert list(sheets) == ['Результаты', 'Результаты (2)', 'Результаты (3)']
+    np.testing.assert_array_equal(pd.concat(sheets.values())['npv'], columns['npv'])
+
+@pytest.mark.parametrize('fmt', ['csv', 'parquet'])
+def test_chunked_export_round_trip(tmp_path, fmt):
+    if fmt == 'parquet':
+        pytest.importorskip('pyarrow')
+    columns = {'npv': np.random.default_rng(0).normal(size=1000), 'irr': np.linspace(0, 1, 1000)}
+    path = export.export_chunks(export.array_chunks(columns, chunk_rows=300), str(tmp_path / f"sim.{fmt}"))
+    frame = pd.read_csv(path) if fmt == 'csv' else pd.read_parquet(path)
+    pd.testing.assert_frame_equal(frame, pd.DataFrame(columns), check_exact=False, rtol=1e-14)
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        export.export_chunks([], str(tmp_path / 'sim.json'))
@@ -0,0 +1,65 @@
+import copy
+
+import numpy as np
+import pytest
+
+from modules.engine import CASH_FLOW_COMPONENTS, calculate_project
+from modules.goal_seek import RATE, break_even_table, component_stack, irr_multipliers
+from modules.irr import calculate_irr
+from modules.timegrid import project_grid
+from utils import synthetic
+
+def scaled(project_data, component, multiplier):
+    """Копия проекта с составляющей, умноженной на multiplier"""
+    project_data = copy.deepcopy(project_data)
+    if component == 'Переменные операционные затраты':
+        project_data['var_costs']['Ставка'] *= multiplier
+    else:
+        project_data['yearly_data'][component] *= multiplier
+    return project_data
+
+@pytest.fixture(params=['Год', 'Квартал'])
+def project(request):
+    project_data = synthetic.generate_project(1, seed=8, horizon=(5, 5), frequency=request.param)
+    # Выручка подбирается так, чтобы CF был инвестиционным: отток в первом периоде, затем притоки
+    cf = calculate_project(project_data)['df']['CF'].to_numpy()
+    target_cf = np.full(len(cf), 3_000_000.0 / project_grid(project_data, len(cf)).periods_per_year)
+    target_cf[0] = -8_000_000.0
+    project_data['yearly_data']['Выручка'] += target_cf - cf
+    project_data['impact_duration'] = len(cf)
+    return project_data, calculate_project(project_data)
+
+def test_npv_multipliers_give_target_npv(project):
+    project_data, result = project
+    for target in (0.0, 1_000_000.0):
+        table = break_even_table(result['df'], project_data['discount_rate'], project_data['impact_duration'],
+                                 target_npv=target, times=result['times'])
+        for component in CASH_FLOW_COMPONENTS:
+            multiplier = table[component].iloc[0]
+            npv = calculate_project(scaled(project_data, component, multiplier))['npv']
+            np.testing.assert_allclose(npv, target, atol=1e-6 * abs(result['npv']))
+
+def test_break_even_rate_gives_zero_npv(project):
+    project_data, result = project
+    table = break_even_table(result['df'], project_data['discount_rate'], project_data['impact_duration'],
+                             times=result['times'])
+    rate = table[RATE].iloc[0]
+    assert np.isfinite(rate)
+    npv = calculate_project(dict(project_data, discount_rate=rate))['npv']
+    np.testing.assert_allclose(npv, 0.0, atol=1e-6 * abs(result['npv']))
+
+def test_irr_multipliers_give_target_irr(project):
+    project_data, result = project
+    irr_times = project_grid(project_data, len(result['df'])).irr_times
+    multipliers = irr_multipliers(component_stack(result['df']), 0.15, irr_times)[0]
+    for component, multiplier in zip(CASH_FLOW_COMPONENTS, multipliers):
+        cf = calculate_project(scaled(project_data, component, multiplier))['df']['CF']
+        np.testing.assert_allclose(cf @ 1.15 ** -irr_times, 0.0, atol=1e-6 * np.abs(cf).sum())
+        assert calculate_irr(cf, irr_times) == pytest.approx(0.15, rel=1e-6)
+
+def test_zero_component_has_no_multiplier():
+    project_data = synthetic.generate_project(1, seed=8, horizon=(5, 5))
+    project_data['yearly_data']['Капитальные затраты'] = 0
+    result = calculate_project(project_data)
+    table = break_even_table(result['df'], project_data['discount_rate'], project_data['impact_duration'])
+    assert np.isnan(table['Капитальные затраты'].iloc[0])
@@ -0,0 +1,68 @@
+import copy
+
+import numpy as np
+import pytest
+
+from modules.engine import calculate_project
+from modules.incremental import IncrementalProject
+from utils import synthetic
+
+def assert_matches_engine(incremental, project_data):
+    expected = calculate_project(project_data)
+    np.testing.assert_allclose(incremental.npv, expected['npv'], rtol=1e-9)
+    np.testing.assert_allclose(incremental.cf, expected['df']['CF'], rtol=1e-9)
+    np.testing.assert_allclose(incremental.var_total, expected['df']['Переменные операционные затраты'], rtol=1e-9)
+    results = incremental.results()
+    np.testing.assert_allclose(results['df']['Дисконтированный CF'], expected['df']['Дисконтированный CF'], rtol=1e-9)
+
+@pytest.fixture(params=['Год', 'Квартал'])
+def project_data(request):
+    return synthetic.generate_project(3, seed=5, horizon=(4, 6), frequency=request.param)
+
+def test_initial_state_matches_engine(project_data):
+    assert_matches_engine(IncrementalProject(project_data), project_data)
+
+def test_yearly_edits(project_data):
+    incremental = IncrementalProject(project_data)
+    edited = copy.deepcopy(project_data)
+    for period, column, value in [(0, 'Выручка', 1_500_000), (2, 'Капитальные затраты', 0),
+                                  (len(edited['yearly_data']) - 1, 'Фиксированные операционные затраты', 10)]:
+        incremental.set_yearly(period, column, value)
+        edited['yearly_data'].iloc[period, edited['yearly_data'].columns.get_loc(column)] = value
+        assert_matches_engine(incremental, edited)
+    assert incremental.updates == 3
+
+def test_var_cost_edits(project_data):
+    incremental = IncrementalProject(project_data)
+    edited = copy.deepcopy(project_data)
+    var_costs = edited['var_costs']
+    for line, column, value in [(0, 'Количество', 3), (1, 'Ставка', 120_000), (2, 'Процент индексирования', 0.2),
+                                (0, 'Количество лет', 1.5), (1, 'Коэффициент', 'K3')]:
+        incremental.set_var_cost(line, column, value)
+        var_costs.iloc[line, var_costs.columns.get_loc(column)] = value
+        assert_matches_engine(incremental, edited)
+
+    incremental.set_var_cost(2, 'Количество месяцев', 18)
+    var_costs.iloc[2, var_costs.columns.get_loc('Количество лет')] = 1.5
+    assert_matches_engine(incremental, edited)
+
+def test_coefficient_and_rate_edits(project_data):
+    incremental = IncrementalProject(project_data)
+    edited = copy.deepcopy(project_data)
+    incremental.set_coefficient('K4', 2.5)
+    edited['coefficients']['K4'] = 2.5
+    assert_matches_engine(incremental, edited)
+
+    incremental.set_discount_rate(0.3)
+    incremental.set_impact_duration(2)
+    edited['discount_rate'] = 0.3
+    edited['impact_duration'] = 2
+    assert_matches_engine(incremental, edited)
+
+def test_apply_edits_in_data_editor_format(project_data):
+    incremental = IncrementalProject(project_data)
+    edited = copy.deepcopy(project_data)
+    incremental.apply_edits({1: {'Выручка': 0}}, {0: {'Ставка': 60_000}})
+    edited['yearly_data'].iloc[1, edited['yearly_data'].columns.get_loc('Выручка')] = 0
+    edited['var_costs'].iloc[0, edited['var_costs'].columns.get_loc('Ставка')] = 60_000
+    assert_matches_engine(incremental, edited)
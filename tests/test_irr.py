@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from modules.irr import calculate_irr, solve_all_irr, solve_irr
+
+def test_single_root():
+    assert calculate_irr(np.array([-100.0, 110.0])) == pytest.approx(0.1)
+
+def test_several_roots():
+    # NPV = -100 + 230 / (1 + r) - 132 / (1 + r)^2 обращается в ноль при 10% и 20%
+    cash_flows = np.array([-100.0, 230.0, -132.0])
+    np.testing.assert_allclose(solve_all_irr([cash_flows])[0], [0.1, 0.2])
+    # Из нескольких корней выбирается ближайший к нулю или к near
+    assert calculate_irr(cash_flows) == pytest.approx(0.1)
+    assert solve_irr([cash_flows], near=0.3)[0] == pytest.approx(0.2)
+
+@pytest.mark.parametrize('cash_flows', [[-100.0, -50.0, -10.0], [100.0, 50.0], [0.0, 0.0, 0.0], [-100.0]])
+def test_no_root(cash_flows):
+    assert calculate_irr(np.array(cash_flows)) is None
+
+def test_root_above_base_grid():
+    # IRR 400% лежит за пределами базовой сетки ставок (до 100%)
+    assert calculate_irr(np.array([-100.0, 500.0])) == pytest.approx(4.0)
+
+def test_batch_matches_single_calls():
+    rng = np.random.default_rng(0)
+    cash_flows = np.column_stack([-rng.uniform(50, 150, 200), rng.uniform(-20, 60, (200, 6))])
+    irr = solve_irr(cash_flows)
+    expected = [calculate_irr(row) for row in cash_flows]
+    np.testing.assert_allclose(irr, [np.nan if value is None else value for value in expected], equal_nan=True)
+    # Ряды разной длины дополняются NaN и не меняют корни
+    rows = [cash_flows[0], np.array([-100.0, 60.0, 60.0])]
+    np.testing.assert_allclose(solve_irr(rows), [irr[0], solve_irr(rows[1][None])[0]])
+
+def test_times_for_quarters():
+    # Квартальный поток с показателями степени в годах: (1 + r) ** 0.25 за квартал
+    cash_flows = np.array([-100.0, 0.0, 0.0, 0.0, 121.0])
+    assert calculate_irr(cash_flows, times=np.arange(5) / 4) == pytest.approx(0.21)
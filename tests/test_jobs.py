@@ -0,0 +1,89 @@
+import threading
+import time
+
+import pytest
+
+from utils import jobs
+
+def add_task(context, a, b):
+    context.progress(1, 2, "Сложение")
+    return a + b
+
+def failing_task(context):
+    raise ValueError("ошибка задачи")
+
+def slow_task(context, seconds):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        context.progress(0.5)
+        time.sleep(0.01)
+    return 'finished'
+
+def wait(job_id, jobs_dir, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        state = jobs.status(job_id, jobs_dir)
+        if state['state'] in jobs.FINISHED_STATES:
+            return state
+        time.sleep(0.05)
+    raise AssertionError(f"Задача {job_id} не завершилась за {timeout} с")
+
+@pytest.fixture
+def jobs_dir(tmp_path):
+    return str(tmp_path)
+
+def test_submit_status_result(jobs_dir):
+    job_id = jobs.submit(add_task, 2, 3, title="Сумма", jobs_dir=jobs_dir)
+    state = wait(job_id, jobs_dir)
+    assert state['state'] == jobs.DONE
+    assert state['title'] == "Сумма"
+    assert state['progress'] == 1.0
+    assert jobs.result(job_id, jobs_dir) == 5
+    assert [s['id'] for s in jobs.list_jobs(jobs_dir)] == [job_id]
+
+def test_failed_job_reports_error(jobs_dir):
+    job_id = jobs.submit(failing_task, jobs_dir=jobs_dir)
+    state = wait(job_id, jobs_dir)
+    assert state['state'] == jobs.FAILED
+    assert state['error'] == "ValueError: ошибка задачи"
+    assert jobs.result(job_id, jobs_dir) is None
+
+def test_cancel_running_job(jobs_dir):
+    job_id = jobs.submit(slow_task, 30, jobs_dir=jobs_dir)
+    deadline = time.monotonic() + 60
+    while jobs.status(job_id, jobs_dir)['state'] == jobs.PENDING and time.monotonic() < deadline:
+        time.sleep(0.05)
+    jobs.cancel(job_id, jobs_dir)
+    assert wait(job_id, jobs_dir)['state'] == jobs.CANCELLED
+    assert jobs.result(job_id, jobs_dir) is None
+
+def test_same_key_is_not_resubmitted(jobs_dir):
+    job_id = jobs.submit(add_task, 1, 1, key='sum', jobs_dir=jobs_dir)
+    submitted = wait(job_id, jobs_dir)['submitted']
+    assert jobs.submit(add_task, 1, 1, key='sum', jobs_dir=jobs_dir) == job_id
+    assert jobs.status(job_id, jobs_dir)['submitted'] == submitted
+
+def test_concurrent_submits_with_same_key_start_one_job(jobs_dir, monkeypatch):
+    calls = []
+    submit = jobs.get_executor().submit
+    def counting_submit(*args, **kwargs):
+        calls.append(args)
+        time.sleep(0.05)
+        return submit(*args, **kwargs)
+    monkeypatch.setattr(jobs.get_executor(), 'submit', counting_submit)
+    threads = [threading.Thread(target=jobs.submit, args=(add_task, 1, 2),
+                                kwargs={'key': 'shared', 'jobs_dir': jobs_dir}) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert wait('shared', jobs_dir)['state'] == jobs.DONE
+    assert jobs.result('shared', jobs_dir) == 3
+
+def test_remove(jobs_dir):
+    job_id = jobs.submit(add_task, 0, 0, jobs_dir=jobs_dir)
+    wait(job_id, jobs_dir)
+    jobs.remove(job_id, jobs_dir)
+    assert jobs.status(job_id, jobs_dir) is None
+    assert jobs.list_jobs(jobs_dir) == []
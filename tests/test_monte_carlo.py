@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from modules import monte_carlo
+from modules.engine import calculate_project
+from utils import synthetic
+
+@pytest.fixture(scope='module')
+def project():
+    project_data = synthetic.generate_project(0, seed=4)
+    return project_data, calculate_project(project_data)
+
+def test_seed_reproducibility(project):
+    project_data, results = project
+    specs = monte_carlo.default_specs(project_data['discount_rate'])
+    first = monte_carlo.simulate(results['df'], project_data['impact_duration'], specs, 5000, seed=42, with_irr=True)
+    second = monte_carlo.simulate(results['df'], project_data['impact_duration'], specs, 5000, seed=42, with_irr=True,
+                                  chunk_size=1200)
+    np.testing.assert_allclose(second['npv'], first['npv'], rtol=1e-12)
+    np.testing.assert_allclose(second['irr'], first['irr'], rtol=1e-9, equal_nan=True)
+    assert second['prob_loss'] == first['prob_loss']
+    other = monte_carlo.simulate(results['df'], project_data['impact_duration'], specs, 5000, seed=43)
+    assert not np.allclose(other['npv'], first['npv'])
+
+def test_fixed_parameters_give_project_npv(project):
+    project_data, results = project
+    specs = {param: {'dist': 'Фиксированное', 'value': 1.0} for param in monte_carlo.COMPONENTS}
+    specs['Ставка дисконтирования'] = {'dist': 'Фиксированное', 'value': project_data['discount_rate']}
+    simulation = monte_carlo.simulate(results['df'], project_data['impact_duration'], specs, 10, seed=0, with_irr=True)
+    np.testing.assert_allclose(simulation['npv'], results['npv'], rtol=1e-12)
+    if results['irr'] is not None:
+        np.testing.assert_allclose(simulation['irr'], results['irr'], rtol=1e-9)
+
+def test_correlation_is_reproduced():
+    correlation = np.eye(len(monte_carlo.PARAMETERS))
+    correlation[0, 1] = correlation[1, 0] = 0.8
+    specs = monte_carlo.default_specs(0.1)
+    draws = monte_carlo.sample_parameters(specs, 200_000, np.random.default_rng(1),
+                                          monte_carlo.correlation_factor(correlation))
+    sample = np.corrcoef(draws, rowvar=False)
+    assert sample[0, 1] == pytest.approx(0.8, abs=0.01)
+    assert sample[0, 2] == pytest.approx(0.0, abs=0.01)
+    assert draws[:, 4].mean() == pytest.approx(0.1, abs=1e-3)
+
+def test_invalid_correlation_is_rejected():
+    correlation = np.eye(len(monte_carlo.PARAMETERS))
+    correlation[0, 1] = correlation[1, 0] = 1.5
+    with pytest.raises(ValueError):
+        monte_carlo.correlation_factor(correlation)
+
+@pytest.mark.parametrize('spec, mean', [
+    ({'dist': 'Равномерное', 'low': 0.8, 'high': 1.2}, 1.0),
+    ({'dist': 'Треугольное', 'left': 0.7, 'mode': 1.0, 'right': 1.6}, 1.1),
+    ({'dist': 'Логнормальное', 'mean': 1.0, 'sigma': 0.2}, 1.0),
+])
+def test_distribution_means(spec, mean):
+    values = monte_carlo.from_normal(spec, np.random.default_rng(2).standard_normal(200_000))
+    assert values.mean() == pytest.approx(mean, abs=5e-3)
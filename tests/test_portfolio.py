@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from modules.engine import calculate_project
+from modules.irr import solve_irr
+from modules.portfolio import cash_flow_matrix, evaluate_portfolio
+from modules.timegrid import project_grid
+from utils import synthetic
+
+@pytest.fixture(scope='module', params=['Год', 'Квартал'])
+def projects(request):
+    projects = [synthetic.generate_project(index, seed=2, horizon=(2, 8), frequency=request.param) for index in range(12)]
+    return projects, [calculate_project(project_data) for project_data in projects]
+
+def test_npv_matches_engine(projects):
+    projects, results = projects
+    evaluation = evaluate_portfolio([r['df']['CF'] for r in results], [p['discount_rate'] for p in projects],
+                                    [p['impact_duration'] for p in projects],
+                                    times=cash_flow_matrix([r['times'] for r in results]))
+    np.testing.assert_allclose(evaluation['npv'], [r['npv'] for r in results], rtol=1e-12)
+    for row, r in zip(evaluation['discounted_cf'], results):
+        np.testing.assert_allclose(row[:len(r['df'])], r['df']['Дисконтированный CF'], rtol=1e-12)
+        assert np.isnan(row[len(r['df']):]).all()
+
+def test_irr_matches_engine(projects):
+    projects, results = projects
+    irr = solve_irr(cash_flow_matrix([r['df']['CF'] for r in results]),
+                    times=cash_flow_matrix([project_grid(p, len(r['df'])).irr_times for p, r in zip(projects, results)]))
+    expected = [np.nan if r['irr'] is None else r['irr'] for r in results]
+    np.testing.assert_allclose(irr, expected, rtol=1e-9, equal_nan=True)
+
+def test_payback_and_profitability_index():
+    cf = [[-100.0, 30.0, 50.0, 40.0], [-100.0, 10.0], [50.0, -10.0, 5.0]]
+    evaluation = evaluate_portfolio(cf, 0.0, 10, total_capex=[100.0, 100.0, 0.0])
+    np.testing.assert_array_equal(evaluation['payback_period'], [4, np.inf, 1])
+    np.testing.assert_allclose(evaluation['npv'], [20.0, -90.0, 45.0])
+    np.testing.assert_allclose(evaluation['profitability_index'][:2], [1.2, 0.1])
+    assert np.isinf(evaluation['profitability_index'][2])
+
+def test_npv_is_limited_to_impact_duration():
+    evaluation = evaluate_portfolio([[10.0, 10.0, 10.0]] * 2, 0.1, [1, 3])
+    np.testing.assert_allclose(evaluation['npv'], [10 / 1.1, 10 / 1.1 + 10 / 1.1 ** 2 + 10 / 1.1 ** 3])
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from modules import scenarios
+from modules.engine import calculate_project
+from utils import synthetic
+
+def _deltas(project_data):
+    lines = project_data['var_costs'].index
+    return dict(scenarios.PRESETS, **{
+        'Ячейки': {'yearly_data': {'Выручка': {'2': 1e6}},
+                   'var_costs': {'Ставка': {lines[0]: 5000.0}, 'Коэффициент': {lines[1]: 'K3'}}},
+        'Коэффициенты и ставка': {'coefficients': {'K1': 2.0}, 'rate_shift': 0.02},
+        'Срок ставки': {'var_costs': {'Количество месяцев': {lines[2]: 6}}},
+    })
+
+@pytest.mark.parametrize('frequency', ['Год', 'Квартал'])
+def test_batch_matches_full_recompute(frequency):
+    projects = {f"П{index}": synthetic.generate_project(index, seed=9, frequency=frequency, n_lines=12)
+                for index in range(3)}
+    deltas = {name: _deltas(project_data) for name, project_data in projects.items()}
+    table = scenarios.evaluate_scenarios(projects, deltas)
+
+    for name, project_data in projects.items():
+        for scenario_name, delta in {scenarios.BASE: {}, **deltas[name]}.items():
+            full = calculate_project(scenarios.apply_delta(project_data, delta))
+            row = table.loc[(name, scenario_name)]
+            assert row['NPV'] == pytest.approx(full['npv'], rel=1e-9)
+            if full['irr'] is None:
+                assert np.isnan(row['IRR'])
+            else:
+                assert row['IRR'] == pytest.approx(full['irr'], rel=1e-6)
+
+def test_diff_delta_round_trip():
+    project_data = synthetic.generate_project(0, seed=9)
+    yearly_data = project_data['yearly_data'].copy()
+    yearly_data.loc[3, 'Капитальные затраты'] = 12345.0
+    delta = scenarios.diff_delta(project_data, yearly_data=yearly_data)
+    assert delta == {'yearly_data': {'Капитальные затраты': {'3': 12345.0}}}
+    applied = scenarios.apply_delta(project_data, delta)
+    assert applied['yearly_data'].loc[3, 'Капитальные затраты'] == 12345.0
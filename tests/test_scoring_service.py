@@ -0,0 +1,76 @@
+import json
+import threading
+import urllib.request
+
+import numpy as np
+import pytest
+
+from modules.engine import calculate_project
+from utils import synthetic
+from utils.scoring_service import make_server, project_arrays, score_batch
+
+def payload(project_data):
+    """Проект в формате JSON-запроса сервиса"""
+    data = dict(project_data, yearly_data=project_data['yearly_data'].to_dict(),
+                var_costs=project_data['var_costs'].to_dict())
+    return json.loads(json.dumps(data, ensure_ascii=False))
+
+def assert_matches_engine(result, project_data):
+    expected = calculate_project(project_data)
+    np.testing.assert_allclose(result['npv'], expected['npv'], rtol=1e-9)
+    if expected['irr'] is None:
+        assert result['irr'] is None
+    else:
+        np.testing.assert_allclose(result['irr'], expected['irr'], rtol=1e-7)
+
+@pytest.fixture(scope='module')
+def server():
+    server = make_server(port=0, max_wait_ms=1)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+def post(url, data):
+    request = urllib.request.Request(url, data=json.dumps(data, ensure_ascii=False).encode('utf-8'),
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+@pytest.mark.parametrize('frequency', ['Год', 'Квартал', 'Месяц'])
+def test_response_matches_engine(server, frequency):
+    projects = [payload(synthetic.generate_project(index, seed=4, horizon=(2, 6), frequency=frequency))
+                for index in range(6)]
+    response = post(f"{server}/score", {'projects': projects})
+    for result, project_data in zip(response['results'], projects):
+        assert_matches_engine(result, project_data)
+    assert_matches_engine(post(f"{server}/score", projects[0]), projects[0])
+
+def test_invalid_project_is_reported(server):
+    project_data = payload(synthetic.generate_project(0, seed=4))
+    del project_data['yearly_data']
+    projects = [project_data, payload(synthetic.generate_project(1, seed=4))]
+    results = post(f"{server}/score", {'projects': projects})['results']
+    assert results[0] == {'error': "KeyError: 'yearly_data'"}
+    assert 'npv' in results[1]
+
+def test_columns_with_different_key_order_are_aligned():
+    project_data = payload(synthetic.generate_project(2, seed=4, horizon=(4, 4)))
+    shuffled = dict(project_data)
+    shuffled['yearly_data'] = dict(project_data['yearly_data'])
+    capex = project_data['yearly_data']['Капитальные затраты']
+    shuffled['yearly_data']['Капитальные затраты'] = dict(reversed(capex.items()))
+    shuffled['var_costs'] = dict(project_data['var_costs'])
+    shuffled['var_costs']['Ставка'] = dict(reversed(project_data['var_costs']['Ставка'].items()))
+    np.testing.assert_allclose(project_arrays(shuffled)['cf'], project_arrays(project_data)['cf'], rtol=1e-12)
+    assert_matches_engine(score_batch([shuffled])[0], project_data)
+
+def test_columns_with_missing_keys_are_aligned():
+    project_data = payload(synthetic.generate_project(2, seed=4, horizon=(4, 4)))
+    revenue = dict(project_data['yearly_data']['Выручка'])
+    revenue.pop(next(iter(revenue)))
+    project_data['yearly_data'] = dict(project_data['yearly_data'], Выручка=revenue)
+    expected = calculate_project(project_data)
+    arrays = project_arrays(project_data)
+    np.testing.assert_allclose(arrays['cf'], expected['df']['CF'], rtol=1e-12)
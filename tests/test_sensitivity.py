@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from modules.engine import CASH_FLOW_COMPONENTS, COMPONENT_SIGNS, calculate_npv, calculate_project
+from modules.sensitivity import build_sensitivity_model, scenario_npv, tornado
+from modules.timegrid import project_grid
+from utils import synthetic
+
+CHANGES = {'Выручка': 15.0, 'Фиксированные операционные затраты': -10.0, 'Переменные операционные затраты': 5.0,
+           'Капитальные затраты': 0.0}
+
+@pytest.fixture(scope='module', params=['Год', 'Квартал'])
+def project(request):
+    project_data = synthetic.generate_project(1, seed=6, frequency=request.param)
+    results = calculate_project(project_data)
+    model = build_sensitivity_model(results['df'], project_data['discount_rate'], project_data['impact_duration'],
+                                    times=results['times'])
+    return project_data, results, model
+
+def full_npv(project_data, results, changes, rate, scale=1.0):
+    """NPV полным пересчетом: CF из измененных составляющих, дисконтирование ядром"""
+    factors = np.array([1 + changes.get(col, 0) / 100 for col in CASH_FLOW_COMPONENTS]) * COMPONENT_SIGNS
+    cf = results['df'][CASH_FLOW_COMPONENTS].to_numpy() @ factors * scale
+    grid = project_grid(project_data, len(cf))
+    return calculate_npv(cf, rate, project_data['impact_duration'], grid)
+
+@pytest.mark.parametrize('rate_shift', [0.0, 0.015, -0.1, 0.1234])
+def test_scenario_npv_matches_recomputation(project, rate_shift):
+    project_data, results, model = project
+    rate = project_data['discount_rate'] + rate_shift
+    assert scenario_npv(model, CHANGES, rate) == pytest.approx(full_npv(project_data, results, CHANGES, rate),
+                                                               rel=1e-10)
+
+def test_base_scenario_is_project_npv(project):
+    project_data, results, model = project
+    assert scenario_npv(model, {}, project_data['discount_rate']) == pytest.approx(results['npv'], rel=1e-12)
+
+def test_tornado_matches_recomputation(project):
+    project_data, results, model = project
+    rate = project_data['discount_rate'] + 0.01
+    original = results['npv']
+    rows = {param: (low, high) for param, low, high in tornado(model, CHANGES, 2.0, rate, original)}
+    for param, change in CHANGES.items():
+        delta = abs(change) / 100
+        assert rows[param][0] == pytest.approx(full_npv(project_data, results, CHANGES, rate, 1 - delta) - original)
+        assert rows[param][1] == pytest.approx(full_npv(project_data, results, CHANGES, rate, 1 + delta) - original)
+    low, high = rows['Ставка дисконтирования']
+    assert low == pytest.approx(full_npv(project_data, results, CHANGES, rate - 0.02) - original)
+    assert high == pytest.approx(full_npv(project_data, results, CHANGES, rate + 0.02) - original)
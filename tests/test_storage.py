@@ -0,0 +1,76 @@
+import json
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.engine import calculate_project
+from modules.project_model import compact_project
+from utils import storage, synthetic
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'project_data.db')
+
+def test_project_round_trip(db_path):
+    project_data = compact_project(synthetic.generate_project(0, seed=5, frequency='Квартал', start_date='2025-01-01'))
+    project_id = storage.save_project("Проект", project_data, path=db_path)
+
+    loaded = compact_project(storage.load_project(project_id, path=db_path))
+    for key in ('project_duration', 'impact_duration', 'discount_rate', 'frequency', 'coefficients'):
+        assert loaded[key] == project_data[key]
+    assert loaded['start_date'] == '2025-01-01'
+    pd.testing.assert_frame_equal(loaded['yearly_data'], project_data['yearly_data'], check_index_type=False)
+    pd.testing.assert_frame_equal(loaded['var_costs'], project_data['var_costs'],
+                                  check_index_type=False, check_categorical=False)
+    assert calculate_project(loaded)['npv'] == pytest.approx(calculate_project(project_data)['npv'], rel=1e-12)
+    assert storage.load_project(project_id + 1, path=db_path) is None
+
+def test_calculation_round_trip(db_path):
+    project_data = synthetic.generate_project(1, seed=5)
+    project_id = storage.save_project("Проект", project_data, path=db_path)
+    results = calculate_project(project_data)
+    calculation_id = storage.save_calculation(project_id, results, path=db_path)
+
+    loaded = storage.load_calculation(calculation_id, path=db_path)
+    assert loaded['project_id'] == project_id
+    assert loaded['npv'] == results['npv']
+    np.testing.assert_array_equal(loaded['df']['CF'].to_numpy(), results['df']['CF'].to_numpy())
+    assert storage.list_calculations(project_id, path=db_path)['id'].tolist() == [calculation_id]
+
+def test_scenarios_round_trip(db_path):
+    project_id = storage.save_project("Проект", synthetic.generate_project(2, seed=5), path=db_path)
+    delta = {'multipliers': {'Выручка': 1.1}, 'var_costs': {'Ставка': {'Аналитик': 1000.0}}}
+    storage.save_scenario(project_id, "Рост", delta, path=db_path)
+    storage.save_scenario(project_id, "Сдвиг", {'rate_shift': 0.01}, path=db_path)
+    assert storage.load_scenarios(project_id, path=db_path) == {"Рост": delta, "Сдвиг": {'rate_shift': 0.01}}
+
+    storage.delete_scenario(project_id, "Рост", path=db_path)
+    assert list(storage.load_scenarios(project_id, path=db_path)) == ["Сдвиг"]
+
+def test_legacy_database_is_migrated(tmp_path):
+    # База исходной версии: таблицы хранились в JSON в столбцах TEXT, без периодичности и даты начала
+    path = str(tmp_path / 'legacy.db')
+    conn = sqlite3.connect(path)
+    conn.execute('''CREATE TABLE projects (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL,
+                    project_duration INTEGER NOT NULL, impact_duration INTEGER NOT NULL, discount_rate REAL NOT NULL,
+                    yearly_data TEXT NOT NULL, coefficients TEXT NOT NULL, var_costs TEXT NOT NULL,
+                    created_at TEXT NOT NULL)''')
+    yearly_data = {'Выручка': {'1': 10.0, '2': 20.0}, 'Фиксированные операционные затраты': {'1': 1.0, '2': 1.0},
+                   'Капитальные затраты': {'1': 5.0, '2': 0.0}}
+    var_costs = {'Коэффициент': {'Аналитик': 'K1'}, 'Количество': {'Аналитик': 1.0}, 'Ставка': {'Аналитик': 2.0}}
+    conn.execute('INSERT INTO projects (name, project_duration, impact_duration, discount_rate, yearly_data, '
+                 'coefficients, var_costs, created_at) VALUES (?, 2, 2, 0.1, ?, ?, ?, ?)',
+                 ("Старый", json.dumps(yearly_data), json.dumps({'K1': 1.0}), json.dumps(var_costs), 'x'))
+    conn.commit()
+    conn.close()
+
+    loaded = storage.load_project(1, path=path)
+    assert loaded['frequency'] == 'Год'
+    assert loaded['yearly_data'] == yearly_data
+    columns = {row[1]: row[2] for row in storage.get_connection(path).execute('PRAGMA table_info(projects)')}
+    assert columns['yearly_data'] == columns['var_costs'] == 'BLOB'
+    project_id = storage.save_project("Новый", synthetic.generate_project(0), path=path)
+    assert project_id == 2
+    assert storage.load_project(project_id, path=path)['frequency'] == 'Год'
@@ -0,0 +1,84 @@
+import copy
+
+import numpy as np
+import pytest
+
+from modules.engine import calculate_project
+from modules.sweep import COMPONENTS, RATE, base_position, data_table, default_axes, irr_grid, sweep
+from modules.timegrid import project_grid
+from utils import synthetic
+
+@pytest.fixture(scope='module', params=['Год', 'Квартал'])
+def project(request):
+    project_data = synthetic.generate_project(2, seed=6, horizon=(4, 4), frequency=request.param)
+    # Выручка подбирается так, чтобы у CF был IRR: отток в первом периоде, затем притоки
+    cf = calculate_project(project_data)['df']['CF'].to_numpy()
+    target_cf = np.full(len(cf), 4_000_000.0 / project_grid(project_data, len(cf)).periods_per_year)
+    target_cf[0] = -9_000_000.0
+    project_data['yearly_data']['Выручка'] += target_cf - cf
+    return project_data, calculate_project(project_data)
+
+def scaled(project_data, multipliers, rate):
+    """Копия проекта с умноженными составляющими и другой ставкой"""
+    project_data = copy.deepcopy(project_data)
+    for component, multiplier in multipliers.items():
+        if component == 'Переменные операционные затраты':
+            project_data['var_costs']['Ставка'] *= multiplier
+        else:
+            project_data['yearly_data'][component] *= multiplier
+    project_data['discount_rate'] = rate
+    return project_data
+
+def run(project, axes, **kwargs):
+    project_data, result = project
+    return sweep(result['df'], project_data['discount_rate'], project_data['impact_duration'], axes,
+                 times=result['times'], with_irr=True, **kwargs)
+
+def test_base_point_matches_engine(project):
+    project_data, result = project
+    grid = run(project, default_axes(project_data['discount_rate'], n_points=5))
+    base = tuple(base_position(grid, name, project_data['discount_rate']) for name in grid['axes'])
+    assert base == (2,) * 5
+    np.testing.assert_allclose(grid['npv'][base], result['npv'], rtol=1e-12)
+    np.testing.assert_allclose(grid['irr'][base], result['irr'], rtol=1e-9)
+
+def test_grid_points_match_engine(project):
+    project_data, result = project
+    axes = {'Выручка': [0.8, 1.3], RATE: [0.05, 0.2], 'Переменные операционные затраты': [0.7, 1.1, 1.4]}
+    grid = run(project, axes)
+    for i, revenue in enumerate(axes['Выручка']):
+        for j, rate in enumerate(axes[RATE]):
+            for k, var_costs in enumerate(axes['Переменные операционные затраты']):
+                expected = calculate_project(scaled(project_data, {'Выручка': revenue,
+                                                                   'Переменные операционные затраты': var_costs}, rate))
+                np.testing.assert_allclose(grid['npv'][i, j, k], expected['npv'], rtol=1e-9)
+                if expected['irr'] is None:
+                    assert np.isnan(grid['irr'][i, j, k])
+                else:
+                    np.testing.assert_allclose(grid['irr'][i, j, k], expected['irr'], rtol=1e-7)
+
+def test_serial_and_shared_memory_irr_agree(project):
+    project_data, result = project
+    components = result['df'][COMPONENTS].to_numpy(dtype=float)
+    irr_times = project_grid(project_data, len(components)).irr_times
+    axes = {'Выручка': np.linspace(0.5, 1.5, 31), 'Капитальные затраты': np.linspace(0.5, 1.5, 17)}
+    calls = []
+    serial = irr_grid(components, axes, irr_times, chunk_size=100, parallel=False)
+    shared = irr_grid(components, axes, irr_times, chunk_size=100, parallel=True,
+                      progress=lambda done, total: calls.append((done, total)))
+    assert serial.shape == (31, 17)
+    np.testing.assert_array_equal(shared, serial)
+    assert calls[-1] == (31 * 17, 31 * 17)
+
+def test_data_table(project):
+    project_data, _ = project
+    grid = run(project, {RATE: [0.05, 0.1, 0.15], 'Выручка': [0.9, 1.1]})
+    table = data_table(grid, 'Выручка', RATE)
+    assert table.shape == (2, 3)
+    np.testing.assert_allclose(table.to_numpy(), grid['npv'].T)
+    with pytest.raises(ValueError):
+        data_table(grid, RATE, RATE)
+
+def test_unknown_parameter():
+    with pytest.raises(ValueError):
+        sweep(None, 0.1, 5, {'Налог': [1.0]})
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.engine import calculate_project
+from utils import synthetic
+
+N_LINES = synthetic.LINE_BLOCK + 1500
+
+@pytest.fixture(scope='module')
+def header():
+    return synthetic.project_header(3, seed=7, n_lines=N_LINES)
+
+@pytest.mark.parametrize('block_size', [500, 1000, 7000, synthetic.LINE_BLOCK, 2 * synthetic.LINE_BLOCK])
+def test_lines_do_not_depend_on_block_size(header, block_size):
+    reference = pd.concat(synthetic.line_blocks(header))
+    blocks = list(synthetic.line_blocks(header, block_size))
+    assert all(len(block) == block_size for block in blocks[:-1])
+    pd.testing.assert_frame_equal(pd.concat(blocks), reference)
+
+def test_columnar_matches_generated_project(tmp_path):
+    pytest.importorskip('pyarrow')
+    synthetic.write_columnar(str(tmp_path / 'portfolio'), 2, seed=7, chunk_rows=700, n_lines=N_LINES)
+    var_costs = pd.read_parquet(tmp_path / 'portfolio' / 'var_costs.parquet')
+    for index in range(2):
+        expected = synthetic.generate_project(index, seed=7, n_lines=N_LINES)['var_costs']
+        lines = var_costs[var_costs['Проект'] == synthetic.project_name(index)]
+        lines = lines.drop(columns='Проект').set_index('Специалист').rename_axis(None)
+        pd.testing.assert_frame_equal(lines, expected, check_dtype=False, check_index_type=False)
+
+def test_annual_totals_do_not_depend_on_frequency():
+    # Суммы первого года (до индексации) в среднем по проектам одинаковы для любой сетки
+    totals = {}
+    for frequency, periods_per_year in synthetic.FREQUENCIES.items():
+        revenue, var_costs = [], []
+        for index in range(100):
+            project_data = synthetic.generate_project(index, seed=1, horizon=(3, 3), frequency=frequency)
+            df = calculate_project(project_data)['df'].iloc[:periods_per_year]
+            revenue.append(df['Выручка'].sum())
+            var_costs.append(df['Переменные операционные затраты'].sum())
+        totals[frequency] = np.mean(revenue), np.mean(var_costs)
+    annual = totals['Год']
+    for frequency, values in totals.items():
+        np.testing.assert_allclose(values, annual, rtol=0.1, err_msg=frequency)
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from modules.engine import calculate_npv
+from modules.timegrid import TimeGrid, project_grid, xirr, xnpv
+
+# Пример из справки Excel по функциям ЧИСТНЗ/ЧИСТВНДОХ (XNPV/XIRR)
+EXCEL_FLOWS = [-10000.0, 2750.0, 4250.0, 3250.0, 2750.0]
+EXCEL_DATES = ['2008-01-01', '2008-03-01', '2008-10-30', '2009-02-15', '2009-04-01']
+
+def test_xnpv_matches_excel():
+    assert xnpv(0.09, EXCEL_FLOWS, EXCEL_DATES) == pytest.approx(2086.647602, abs=1e-6)
+
+def test_xirr_matches_excel():
+    assert xirr(EXCEL_FLOWS, EXCEL_DATES) == pytest.approx(0.373362535, abs=1e-8)
+    batch = xirr(np.array([EXCEL_FLOWS, [-100.0, 0.0, 0.0, 0.0, -1.0]]), EXCEL_DATES)
+    assert batch[0] == pytest.approx(0.373362535, abs=1e-8)
+    assert np.isnan(batch[1])
+
+@pytest.mark.parametrize('frequency, per_year', [('Год', 1), ('Квартал', 4), ('Месяц', 12)])
+def test_discount_factors(frequency, per_year):
+    grid = TimeGrid(2 * per_year, frequency)
+    expected = 1.1 ** -(np.arange(1, 2 * per_year + 1) / per_year)
+    np.testing.assert_allclose(grid.discount_factors(0.1), expected, rtol=1e-14)
+    np.testing.assert_allclose(grid.discount_matrix([0.1, 0.2])[1], 1.2 ** -(np.arange(1, 2 * per_year + 1) / per_year))
+    np.testing.assert_array_equal(grid.years, np.repeat([1, 2], per_year))
+    assert grid.irr_times[0] == 0
+    # Коэффициенты кэшируются и защищены от изменения
+    assert grid.discount_factors(0.1) is TimeGrid(2 * per_year, frequency).discount_factors(0.1)
+    with pytest.raises(ValueError):
+        grid.discount_factors(0.1)[0] = 1.0
+
+def test_annual_grid_matches_calculate_npv():
+    cash_flows = np.array([-100.0, 30.0, 40.0, 50.0, 60.0])
+    grid = TimeGrid(5)
+    assert grid.is_annual
+    assert calculate_npv(cash_flows, 0.1, 3, grid) == pytest.approx(calculate_npv(cash_flows, 0.1, 3))
+
+def test_start_date_builds_period_dates():
+    grid = project_grid({'frequency': 'Квартал', 'start_date': '2025-01-01'}, 4)
+    assert grid.labels() == ['2025-04-01', '2025-07-01', '2025-10-01', '2026-01-01']
+    np.testing.assert_allclose(grid.times, np.array([90, 181, 273, 365]) / 365)
+    assert not grid.is_annual
+
+def test_labels_without_dates():
+    assert TimeGrid(5, 'Квартал').labels() == ['1-К1', '1-К2', '1-К3', '1-К4', '2-К1']
+    assert TimeGrid(3).labels() == [1, 2, 3]
+
+def test_invalid_grid():
+    with pytest.raises(ValueError):
+        TimeGrid(4, 'Неделя')
+    with pytest.raises(ValueError):
+        TimeGrid(3, dates=['2025-01-01'])
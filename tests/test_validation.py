@@ -0,0 +1,41 @@
+import io
+
+import openpyxl
+
+from modules import validation
+from modules.engine import calculate_project
+from modules.project_model import compact_project
+from utils import export, synthetic, utils
+from utils.cache import project_hash
+
+def _uploaded_workbook():
+    """Книга проекта, как ее загружает пользователь, с двумя нечисловыми ячейками"""
+    buffer = io.BytesIO()
+    export.write_results_xlsx(buffer, synthetic.generate_project(0, seed=1))
+    book = openpyxl.load_workbook(io.BytesIO(buffer.getvalue()))
+    book['Данные по годам'].cell(3, 2).value = 'н/д'
+    book['Переменные затраты'].cell(2, 3).value = 'много'
+    buffer = io.BytesIO()
+    book.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+def test_excel_upload_reports_coerced_cells():
+    project_data = compact_project(utils.load_from_excel(_uploaded_workbook()))
+    report = validation.validate_project(calculate_project(project_data), project_data)
+
+    coerced = report['issues'][report['issues']['Проблема'] == validation.COERCED]
+    assert sorted(coerced['Значение']) == ['много', 'н/д']
+    assert set(coerced['Таблица']) == {'Данные по периодам', 'Переменные затраты'}
+    assert not report['ok']
+
+def test_recompaction_keeps_coerced_cells_and_hash():
+    project_data = compact_project(utils.load_from_excel(_uploaded_workbook()))
+    again = compact_project(project_data)
+    assert len(validation.coerced_cells(again)) == 2
+    assert project_hash(again) == project_hash(project_data)
+
+def test_clean_project_has_no_coerced_cells():
+    project_data = compact_project(synthetic.generate_project(0, seed=1))
+    assert 'coerced' not in project_data
+    assert validation.coerced_cells(project_data).empty
@@ -0,0 +1,192 @@
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+# При запуске файлом (python utils/bulk_import.py) первым в пути поиска стоит каталог utils,
+# где utils/utils.py заслоняет пакет utils; он заменяется корнем репозитория
+_HERE = os.path.dirname(os.path.abspath(__file__))
+if sys.path and os.path.abspath(sys.path[0] or os.curdir) == _HERE:
+    sys.path[0] = os.path.dirname(_HERE)
+
+from modules.engine import YEARLY_COLUMNS, prepare_yearly_data, prepare_var_costs, calculate_var_costs
+from modules.portfolio import cash_flow_matrix
+from modules.timegrid import project_grid
+from modules.validation import coerced_cells
+
+REQUIRED_SHEETS = {
+    'Параметры проекта': ['Срок проекта', 'Срок влияния', 'Ставка дисконтирования'],
+    'Данные по годам': YEARLY_COLUMNS,
+    'Коэффициенты': [],
+    'Переменные затраты': ['Коэффициент', 'Количество', 'Ставка'],
+}
+# 'times' - показатели степени дисконтирования периодов в годах (см. modules.timegrid)
+MATRIX_COLUMNS = YEARLY_COLUMNS + ['Переменные операционные затраты', 'CF', 'times']
+
+def iter_sources(path):
+    """
+    Источники книг для загрузки: (имя, путь к файлу, элемент архива или None).
+    path - каталог (просматривается рекурсивно) или zip-архив.
+    """
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if info.filename.lower().endswith('.xlsx') and not info.is_dir():
+                    yield info.filename, path, info.filename
+        return
+    for root, _, files in os.walk(path):
+        for filename in sorted(files):
+            if filename.lower().endswith('.xlsx') and not filename.startswith('~$'):
+                full_path = os.path.join(root, filename)
+                yield os.path.relpath(full_path, path), full_path, None
+
+def _rows(workbook, sheet):
+    """Строки листа: заголовок и данные (потоковое чтение read-only)"""
+    rows = workbook[sheet].iter_rows(values_only=True)
+    header = list(next(rows, ()))
+    return header, [row for row in rows if any(v is not None for v in row)]
+
+def _first_row(header, rows):
+    if not rows:
+        raise ValueError("нет строки данных")
+    return {name: value for name, value in zip(header, rows[0]) if name is not None}
+
+def _indexed(header, rows):
+    """Лист с индексом в первом столбце в формате DataFrame.to_dict()"""
+    return {name: {row[0]: row[i] for row in rows}
+            for i, name in enumerate(header) if i > 0 and name is not None}
+
+def parse_workbook(file):
+    """
+    Потоковый разбор книги в формате приложения (openpyxl read-only).
+    Проверяет наличие листов и столбцов; возвращает project_data в том же виде,
+    что и utils.load_from_excel.
+    """
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        missing = [sheet for sheet in REQUIRED_SHEETS if sheet not in workbook.sheetnames]
+        if missing:
+            raise ValueError(f"нет листов: {', '.join(missing)}")
+        sheets = {sheet: _rows(workbook, sheet) for sheet in REQUIRED_SHEETS}
+    finally:
+        workbook.close()
+
+    for sheet, columns in REQUIRED_SHEETS.items():
+        absent = [col for col in columns if col not in sheets[sheet][0]]
+        if absent:
+            raise ValueError(f"на листе '{sheet}' нет столбцов: {', '.join(absent)}")
+
+    try:
+        params = _first_row(*sheets['Параметры проекта'])
+        coefficients = _first_row(*sheets['Коэффициенты'])
+    except ValueError as e:
+        raise ValueError(f"параметры или коэффициенты: {e}")
+    return {
+        'project_duration': params['Срок проекта'],
+        'impact_duration': params['Срок влияния'],
+        'discount_rate': params['Ставка дисконтирования'],
+        'frequency': params.get('Периодичность') or 'Год',
+        'start_date': params.get('Дата начала'),
+        'yearly_data': _indexed(*sheets['Данные по годам']),
+        'coefficients': coefficients,
+        'var_costs': _indexed(*sheets['Переменные затраты'])
+    }
+
+def project_columns(project_data):
+    """Ряды по годам и параметры проекта, готовые для пакетной оценки"""
+    df = prepare_yearly_data(project_data['yearly_data'])
+    grid = project_grid(project_data, len(df))
+    var_costs = prepare_var_costs(project_data['var_costs'], len(df) / grid.periods_per_year)
+    columns = {col: df[col].to_numpy() for col in YEARLY_COLUMNS}
+    columns['Переменные операционные затраты'] = calculate_var_costs(
+        var_costs, project_data['coefficients'], len(df), grid)
+    columns['CF'] = (columns['Выручка'] - columns['Фиксированные операционные затраты']
+                     - columns['Переменные операционные затраты'] - columns['Капитальные затраты'])
+    columns['times'] = grid.times
+    return {
+        'series': columns,
+        'discount_rate': float(project_data['discount_rate']),
+        'impact_duration': int(project_data['impact_duration']),
+        'coerced': len(coerced_cells(project_data))
+    }
+
+def _import_one(source):
+    """Загрузка одной книги в рабочем процессе; ошибки возвращаются, а не выбрасываются"""
+    name, path, member = source
+    try:
+        if member is None:
+            size = os.path.getsize(path)
+            project_data = parse_workbook(path)
+        else:
+            with zipfile.ZipFile(path) as archive, archive.open(member) as f:
+                size = archive.getinfo(member).file_size
+                project_data = parse_workbook(f)
+        return name, size, project_columns(project_data), None
+    except Exception as e:
+        return name, 0, None, f"{type(e).__name__}: {e}"
+
+def bulk_import(path, max_workers=None, chunksize=None, progress=None):
+    """
+    Пакетная загрузка книг из каталога или zip-архива пулом процессов.
+
+    Возвращает словарь: имена загруженных проектов, матрицы проекты x периоды
+    для выручки, затрат, CF и показателей степени дисконтирования (NaN для
+    отсутствующих периодов), массивы ставок и
+    сроков влияния, число нечисловых ячеек входных данных по проектам, таблицу ошибок по файлам и статистику производительности.
+    progress - функция (загружено книг, всего книг), вызывается после каждой книги.
+    """
+    started = time.perf_counter()
+    sources = list(iter_sources(path))
+    workers = max_workers or os.cpu_count() or 1
+    outcomes = []
+    if workers == 1 or len(sources) < 2:
+        for outcome in map(_import_one, sources):
+            outcomes.append(outcome)
+            if progress is not None:
+                progress(len(outcomes), len(sources))
+    else:
+        chunksize = chunksize or max(1, len(sources) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for outcome in executor.map(_import_one, sources, chunksize=chunksize):
+                outcomes.append(outcome)
+                if progress is not None:
+                    progress(len(outcomes), len(sources))
+
+    names, projects, errors = [], [], []
+    total_bytes = 0
+    for name, size, columns, error in outcomes:
+        if error is None:
+            names.append(name)
+            projects.append(columns)
+            total_bytes += size
+        else:
+            errors.append({'Файл': name, 'Ошибка': error})
+
+    seconds = time.perf_counter() - started
+    return {
+        'names': names,
+        'matrices': {col: cash_flow_matrix([p['series'][col] for p in projects]) for col in MATRIX_COLUMNS},
+        'discount_rate': np.array([p['discount_rate'] for p in projects]),
+        'impact_duration': np.array([p['impact_duration'] for p in projects], dtype=int),
+        'coerced': np.array([p['coerced'] for p in projects], dtype=int),
+        'errors': pd.DataFrame(errors, columns=['Файл', 'Ошибка']),
+        'stats': {
+            'files': len(sources),
+            'imported': len(names),
+            'failed': len(errors),
+            'seconds': seconds,
+            'files_per_second': len(sources) / seconds if seconds else 0.0,
+            'mb_per_second': total_bytes / 1e6 / seconds if seconds else 0.0
+        }
+    }
+
+if __name__ == "__main__":
+    result = bulk_import(sys.argv[1])
+    print(result['stats'])
+    if not result['errors'].empty:
+        print(result['errors'].to_string(index=False))
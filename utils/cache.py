@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+TABLE_KEYS = ('yearly_data', 'var_costs')
+
+def _canonical(value):
+    """
+    Приведение данных проекта к виду, не зависящему от порядка ключей и типов чисел.
+    Строки таблиц (периоды, специалисты) остаются в исходном порядке: от него зависит расчет.
+    """
+    if isinstance(value, pd.DataFrame):
+        # То же представление, что и для DataFrame.to_dict(), без построения словарей
+        return sorted([str(col), _canonical_series(value[col])] for col in value.columns)
+    if isinstance(value, pd.Series):
+        return _canonical_series(value)
+    if isinstance(value, dict):
+        return sorted([str(k), _canonical(v)] for k, v in value.items())
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, (bool, int, float)):
+        return repr(float(value))
+    if value is None:
+        return None
+    return str(value)
+
+def _canonical_series(series):
+    keys = [str(k) for k in series.index.tolist()]
+    if series.dtype.kind == 'f':
+        values = [repr(v) for v in series.tolist()]
+    else:
+        values = [_canonical(v) for v in series.tolist()]
+    return [[k, v] for k, v in zip(keys, values)]
+
+def project_hash(project_data):
+    """
+    Хэш содержимого входных данных проекта.
+    Замечания compact_project ('coerced') на расчет не влияют и в хэш не входят.
+    """
+    # Таблицы в виде словарей DataFrame.to_dict() хэшируются как DataFrame, чтобы не сортировать их строки
+    inputs = {key: pd.DataFrame(value) if key in TABLE_KEYS and isinstance(value, dict) else value
+              for key, value in project_data.items() if key != 'coerced'}
+    payload = json.dumps(_canonical(inputs), ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def _sizeof(value):
+    """Оценка занимаемой памяти в байтах"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(_sizeof(v) for v in value.values()) + 64 * len(value)
+    if isinstance(value, (list, tuple)):
+        return sum(_sizeof(v) for v in value) + 8 * len(value)
+    return 64
+
+class CalculationCache:
+    """
+    LRU-кэш результатов расчета по хэшу входных данных.
+    Ограничен числом записей и оценкой объема памяти; при заданном disk_dir
+    результаты дополнительно сохраняются на диск и переживают перезапуск.
+    Один экземпляр разделяется всеми сессиями процесса.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES, disk_dir=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.pkl")
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _write_disk(self, key, value):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def _store(self, key, value):
+        """Добавляет запись в память и вытесняет самые старые при переполнении"""
+        size = _sizeof(value)
+        if key in self._entries:
+            self._bytes -= self._sizes[key]
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        self._sizes[key] = size
+        self._bytes += size
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            old_key, _ = self._entries.popitem(last=False)
+            self._bytes -= self._sizes.pop(old_key)
+            self.evictions += 1
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        value = self._read_disk(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store(key, value)
+        return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._store(key, value)
+        self._write_disk(key, value)
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+calculation_cache = CalculationCache(
+    max_entries=int(os.environ.get('ECONOMIC_CACHE_ENTRIES', DEFAULT_MAX_ENTRIES)),
+    max_bytes=int(os.environ.get('ECONOMIC_CACHE_BYTES', DEFAULT_MAX_BYTES)),
+    disk_dir=os.environ.get('ECONOMIC_CACHE_DIR')
+)
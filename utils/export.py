@@ -0,0 +1,133 @@
+import os
+import tempfile
+
+import pandas as pd
+import xlsxwriter
+
+CHUNK_ROWS = 50_000
+EXCEL_MAX_ROWS = 1_048_576
+SPOOL_MAX_SIZE = 16 * 1024 * 1024
+
+def frame_chunks(df, chunk_rows=CHUNK_ROWS):
+    """Разбиение DataFrame на блоки строк (срезы без копирования данных)"""
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+def array_chunks(columns, chunk_rows=CHUNK_ROWS):
+    """Блоки DataFrame из словаря массивов одинаковой длины (например, результатов моделирования)"""
+    length = len(next(iter(columns.values()))) if columns else 0
+    for start in range(0, length, chunk_rows):
+        yield pd.DataFrame({name: values[start:start + chunk_rows] for name, values in columns.items()})
+
+def _chunk_rows(chunk, index):
+    """Строки блока как списки значений Python"""
+    columns = [chunk[col].tolist() for col in chunk.columns]
+    if index:
+        columns.insert(0, chunk.index.tolist())
+    return zip(*columns)
+
+def write_sheet(workbook, sheet_name, chunks, index=True):
+    """
+    Построчная запись блоков DataFrame на лист книги в режиме constant_memory.
+    При превышении лимита строк Excel запись продолжается на листах 'имя (2)', 'имя (3)' ...
+    """
+    worksheet = None
+    header = None
+    row = 0
+    part = 0
+    for chunk in chunks:
+        if header is None:
+            header = ([chunk.index.name or ''] if index else []) + [str(c) for c in chunk.columns]
+        for values in _chunk_rows(chunk, index):
+            if worksheet is None or row >= EXCEL_MAX_ROWS:
+                part += 1
+                worksheet = workbook.add_worksheet(sheet_name if part == 1 else f"{sheet_name} ({part})")
+                worksheet.write_row(0, 0, header)
+                row = 1
+            worksheet.write_row(row, 0, values)
+            row += 1
+    if worksheet is None:
+        worksheet = workbook.add_worksheet(sheet_name)
+        if header:
+            worksheet.write_row(0, 0, header)
+
+def open_workbook(target):
+    """Книга xlsxwriter с потоковой записью строк; target - путь или файловый объект"""
+    return xlsxwriter.Workbook(target, {'constant_memory': True, 'nan_inf_to_errors': True})
+
+def write_results_xlsx(target, project_data, results=None, chunk_rows=CHUNK_ROWS, var_cost_chunks=None):
+    """
+    Запись данных проекта и результатов расчета в книгу той же структуры,
+    что и utils.save_to_excel, с потоковой записью строк.
+    var_cost_chunks - блоки переменных затрат вместо project_data['var_costs']
+    (для проектов, строки которых не помещаются в память целиком).
+    """
+    workbook = open_workbook(target)
+    write_sheet(workbook, 'Параметры проекта', [pd.DataFrame([{
+        'Срок проекта': project_data['project_duration'],
+        'Срок влияния': project_data['impact_duration'],
+        'Ставка дисконтирования': project_data['discount_rate'],
+        'Периодичность': project_data.get('frequency') or 'Год',
+        'Дата начала': project_data.get('start_date')
+    }])], index=False)
+    write_sheet(workbook, 'Данные по годам', frame_chunks(pd.DataFrame(project_data['yearly_data']), chunk_rows))
+    write_sheet(workbook, 'Коэффициенты', [pd.DataFrame([project_data['coefficients']])], index=False)
+    if var_cost_chunks is None:
+        var_cost_chunks = frame_chunks(pd.DataFrame(project_data['var_costs']), chunk_rows)
+    write_sheet(workbook, 'Переменные затраты', var_cost_chunks)
+    if results is not None:
+        write_sheet(workbook, 'Результаты расчетов', frame_chunks(results['df'], chunk_rows))
+        write_sheet(workbook, 'Итоговые показатели', [pd.DataFrame([{'NPV': results['npv']}])], index=False)
+    workbook.close()
+
+def results_xlsx_file(project_data, results=None):
+    """
+    Книга с результатами во временном файле (в памяти до SPOOL_MAX_SIZE, дальше на диске),
+    готовая к отдаче через st.download_button без повторной сборки.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    write_results_xlsx(spool, project_data, results)
+    spool.seek(0)
+    return spool
+
+def write_csv(chunks, path, index=False):
+    """Запись блоков DataFrame в один CSV-файл; в памяти находится только текущий блок"""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        header_written = False
+        for chunk in chunks:
+            chunk.to_csv(f, header=not header_written, index=index)
+            header_written = True
+    return path
+
+def write_parquet(chunks, path):
+    """Запись блоков DataFrame в Parquet по группам строк (требуется пакет pyarrow)"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Для экспорта в Parquet установите пакет pyarrow")
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    return path
+
+def export_chunks(chunks, path, fmt=None):
+    """Экспорт блоков в CSV, Parquet или XLSX; формат определяется по расширению файла"""
+    fmt = fmt or os.path.splitext(path)[1].lstrip('.').lower()
+    if fmt == 'csv':
+        return write_csv(chunks, path)
+    if fmt == 'parquet':
+        return write_parquet(chunks, path)
+    if fmt == 'xlsx':
+        workbook = open_workbook(path)
+        write_sheet(workbook, 'Результаты', chunks, index=False)
+        workbook.close()
+        return path
+    raise ValueError(f"Неподдерживаемый формат экспорта: {fmt}")
@@ -0,0 +1,232 @@
+import json
+import multiprocessing
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+# Состояние, прогресс и результаты задач хранятся в файлах каталога JOBS_DIR,
+# поэтому внешний брокер не нужен, а завершенные результаты переживают перезапуск
+JOBS_DIR = os.environ.get('ECONOMIC_JOBS_DIR', os.path.join(tempfile.gettempdir(), 'economic_jobs'))
+MAX_WORKERS = int(os.environ.get('ECONOMIC_JOB_WORKERS', 0)) or os.cpu_count() or 1
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+_executor = None
+# Реентерабельная: submit под этой блокировкой вызывает get_executor
+_executor_lock = threading.RLock()
+_futures = {}
+
+class JobCancelled(Exception):
+    """Задача отменена пользователем"""
+
+def _job_dir(job_id, jobs_dir=JOBS_DIR):
+    return os.path.join(jobs_dir, job_id)
+
+def _write_json(path, data):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def _read_json(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+class JobContext:
+    """Связь функции задачи с хранилищем: прогресс и проверка отмены"""
+
+    def __init__(self, job_id, jobs_dir=JOBS_DIR):
+        self.job_id = job_id
+        self.path = _job_dir(job_id, jobs_dir)
+        self._last_write = 0.0
+
+    def cancelled(self):
+        return os.path.exists(os.path.join(self.path, 'cancel'))
+
+    def progress(self, done, total=None, message=''):
+        """
+        Сообщает прогресс (done из total или доля от 0 до 1) и прерывает
+        задачу исключением JobCancelled, если запрошена отмена.
+        Файл состояния обновляется не чаще 10 раз в секунду.
+        """
+        if self.cancelled():
+            raise JobCancelled()
+        now = time.monotonic()
+        if now - self._last_write < 0.1 and (total is None or done < total):
+            return
+        self._last_write = now
+        fraction = done / total if total else done
+        _update_state(self.path, progress=min(max(float(fraction), 0.0), 1.0), message=message)
+
+    def file(self, name):
+        """Путь к рабочему файлу задачи (например, для экспорта)"""
+        return os.path.join(self.path, name)
+
+def _update_state(path, **changes):
+    state = _read_json(os.path.join(path, 'state.json')) or {}
+    state.update(changes)
+    _write_json(os.path.join(path, 'state.json'), state)
+
+def _run(job_id, func, args, kwargs, jobs_dir):
+    """Выполнение задачи в рабочем процессе"""
+    context = JobContext(job_id, jobs_dir)
+    if context.cancelled():
+        _update_state(context.path, state=CANCELLED, finished=time.time())
+        return CANCELLED
+    _update_state(context.path, state=RUNNING, started=time.time(), pid=os.getpid())
+    try:
+        result = func(context, *args, **kwargs)
+    except JobCancelled:
+        _update_state(context.path, state=CANCELLED, finished=time.time())
+        return CANCELLED
+    except Exception as e:
+        _update_state(context.path, state=FAILED, finished=time.time(),
+                      error=f"{type(e).__name__}: {e}", traceback=traceback.format_exc())
+        return FAILED
+    tmp_path = context.file(f'result.pkl.{os.getpid()}.tmp')
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, context.file('result.pkl'))
+    _update_state(context.path, state=DONE, progress=1.0, finished=time.time())
+    return DONE
+
+def get_executor():
+    """Общий пул процессов; forkserver не копирует потоки сервера Streamlit в рабочие процессы"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            _executor = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=context)
+        return _executor
+
+def submit(func, *args, key=None, title='', jobs_dir=JOBS_DIR, **kwargs):
+    """
+    Ставит задачу func(context, *args, **kwargs) в очередь и возвращает ее id.
+    func должна быть функцией верхнего уровня модуля (передается в другой процесс).
+    При заданном key (например, хэше входных данных) повторная постановка той же
+    задачи возвращает уже выполненную или выполняющуюся задачу, а отмененная или
+    завершившаяся ошибкой задача запускается заново.
+    """
+    job_id = key or uuid.uuid4().hex
+    path = _job_dir(job_id, jobs_dir)
+    # Проверка и перезапуск под блокировкой: два сеанса с одним key не запускают задачу дважды
+    with _executor_lock:
+        state = status(job_id, jobs_dir)
+        if state is not None and state['state'] not in (FAILED, CANCELLED):
+            if state['state'] == DONE or job_id in _futures:
+                return job_id
+        if os.path.exists(path):
+            shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+        _write_json(os.path.join(path, 'state.json'), {
+            'id': job_id, 'title': title, 'state': PENDING, 'progress': 0.0, 'message': '',
+            'submitted': time.time()
+        })
+        _futures[job_id] = get_executor().submit(_run, job_id, func, args, kwargs, jobs_dir)
+    return job_id
+
+def status(job_id, jobs_dir=JOBS_DIR):
+    """Состояние задачи: словарь с полями state, progress, message, error; None, если задачи нет"""
+    state = _read_json(os.path.join(_job_dir(job_id, jobs_dir), 'state.json'))
+    if state is None:
+        return None
+    future = _futures.get(job_id)
+    if state['state'] in (PENDING, RUNNING) and future is not None and future.done() and future.exception():
+        # Рабочий процесс завершился аварийно и не успел записать состояние
+        state.update(state=FAILED, error=str(future.exception()))
+    elif state['state'] == RUNNING and not _alive(state.get('pid')):
+        state.update(state=FAILED, error="Рабочий процесс задачи завершился")
+    return state
+
+def _alive(pid):
+    if not pid:
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+def result(job_id, jobs_dir=JOBS_DIR):
+    """Результат завершенной задачи (None, если задача не завершена успешно)"""
+    try:
+        with open(os.path.join(_job_dir(job_id, jobs_dir), 'result.pkl'), 'rb') as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+
+def cancel(job_id, jobs_dir=JOBS_DIR):
+    """
+    Запрашивает отмену: задача из очереди снимается сразу,
+    выполняющаяся прерывается при следующем сообщении о прогрессе.
+    """
+    path = _job_dir(job_id, jobs_dir)
+    if not os.path.isdir(path):
+        return
+    open(os.path.join(path, 'cancel'), 'w').close()
+    future = _futures.get(job_id)
+    if future is not None and future.cancel():
+        _update_state(path, state=CANCELLED, finished=time.time())
+
+def list_jobs(jobs_dir=JOBS_DIR):
+    """Состояния всех задач, новые сначала"""
+    if not os.path.isdir(jobs_dir):
+        return []
+    states = [status(job_id, jobs_dir) for job_id in os.listdir(jobs_dir)]
+    return sorted([s for s in states if s], key=lambda s: s.get('submitted', 0), reverse=True)
+
+def remove(job_id, jobs_dir=JOBS_DIR):
+    """Удаляет задачу и ее результат"""
+    _futures.pop(job_id, None)
+    shutil.rmtree(_job_dir(job_id, jobs_dir), ignore_errors=True)
+
+# Задачи приложения
+
+def simulate_task(context, df, impact_duration, specs, n_draws, **kwargs):
+    """Моделирование Монте-Карло с прогрессом по блокам испытаний"""
+    from modules import monte_carlo
+    return monte_carlo.simulate(df, impact_duration, specs, n_draws,
+                                progress=lambda done: context.progress(done, n_draws, "Испытания"), **kwargs)
+
+def bulk_import_task(context, path, remove_archive=False):
+    """Пакетная загрузка книг и оценка портфеля; remove_archive - удалить архив после загрузки"""
+    import numpy as np
+    from utils.bulk_import import bulk_import
+    from modules.portfolio import evaluate_portfolio, portfolio_table
+    from modules.goal_seek import break_even_table
+    from modules.validation import batch_report
+    # Задача выполняется в процессе общего пула, книги читаются вложенным пулом
+    # того же размера; рабочие процессы ProcessPoolExecutor не демоны, поэтому это допустимо
+    try:
+        result = bulk_import(path, max_workers=MAX_WORKERS,
+                             progress=lambda done, total: context.progress(done, total, "Загрузка книг"))
+    finally:
+        if remove_archive and os.path.exists(path):
+            os.remove(path)
+    if result['names']:
+        matrices = result['matrices']
+        evaluation = evaluate_portfolio(matrices['CF'], result['discount_rate'], result['impact_duration'],
+                                        np.nansum(matrices['Капитальные затраты'], axis=1), times=matrices['times'])
+        result['portfolio'] = portfolio_table(evaluation, index=result['names'])
+        result['break_even'] = break_even_table(matrices, result['discount_rate'], result['impact_duration'],
+                                                times=matrices['times'], index=result['names'])
+        result['validation'] = batch_report(matrices, result['discount_rate'], result['impact_duration'],
+                                            evaluation['npv'], result['coerced'], index=result['names'])
+    return result
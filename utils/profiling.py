@@ -0,0 +1,142 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+import pandas as pd
+
+# Профилирование включается для всех сессий переменной окружения ECONOMIC_PROFILE=1
+# или для одной сессии флажком на боковой панели
+ENABLED = os.environ.get('ECONOMIC_PROFILE', '') not in ('', '0')
+LOG_PATH = os.environ.get('ECONOMIC_PROFILE_LOG')
+
+logger = logging.getLogger('economic.profile')
+if LOG_PATH:
+    _handler = logging.FileHandler(LOG_PATH, encoding='utf-8')
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+_local = threading.local()
+
+class _NullSpan:
+    """Пустой контекст, когда профилирование выключено"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class Recorder:
+    """Замеры одного прогона страницы: интервалы с вложенностью и счетчики"""
+
+    def __init__(self, name):
+        self.name = name
+        self.spans = []
+        self.counters = {}
+        self._stack = []
+        self._started = time.perf_counter()
+        self.seconds = None
+
+    def span(self, name):
+        return _Span(self, name)
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self._started
+        return self
+
+    def to_dict(self):
+        return {
+            'event': 'profile',
+            'page': self.name,
+            'seconds': self.seconds,
+            'spans': self.spans,
+            'counters': self.counters
+        }
+
+    def table(self):
+        """Интервалы, сгруппированные по имени: число вызовов, суммарное и максимальное время"""
+        if not self.spans:
+            return pd.DataFrame(columns=['Этап', 'Вызовов', 'Всего, мс', 'Макс, мс'])
+        spans = pd.DataFrame(self.spans)
+        table = spans.groupby('name', sort=False)['seconds'].agg(['count', 'sum', 'max']).reset_index()
+        table[['sum', 'max']] *= 1e3
+        table.columns = ['Этап', 'Вызовов', 'Всего, мс', 'Макс, мс']
+        return table
+
+class _Span:
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        stack = self.recorder._stack
+        self.path = '/'.join(stack + [self.name])
+        stack.append(self.name)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.started
+        self.recorder._stack.pop()
+        self.recorder.spans.append({'name': self.path, 'seconds': seconds})
+        return False
+
+def current():
+    """Текущий прогон потока или None, если профилирование не ведется"""
+    return getattr(_local, 'recorder', None)
+
+def span(name):
+    """Именованный интервал времени: with profiling.span('этап'): ..."""
+    recorder = getattr(_local, 'recorder', None)
+    if recorder is None:
+        return _NULL_SPAN
+    return recorder.span(name)
+
+def count(name, value=1):
+    """Увеличение именованного счетчика текущего прогона"""
+    recorder = getattr(_local, 'recorder', None)
+    if recorder is not None:
+        recorder.count(name, value)
+
+def timed(name):
+    """Декоратор: вызов функции записывается как интервал с заданным именем"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            recorder = getattr(_local, 'recorder', None)
+            if recorder is None:
+                return func(*args, **kwargs)
+            with recorder.span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+@contextmanager
+def run(name, enabled=ENABLED):
+    """
+    Прогон с записью интервалов и счетчиков в текущем потоке.
+    По завершении результаты пишутся в журнал 'economic.profile' одной строкой JSON.
+    При enabled=False возвращает None и ничего не записывает.
+    """
+    if not enabled:
+        yield None
+        return
+    recorder = Recorder(name)
+    previous = current()
+    _local.recorder = recorder
+    try:
+        yield recorder
+    finally:
+        _local.recorder = previous
+        recorder.finish()
+        logger.info(json.dumps(recorder.to_dict(), ensure_ascii=False))
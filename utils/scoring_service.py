@@ -0,0 +1,249 @@
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from modules.engine import YEARLY_COLUMNS, calculate_cf, calculate_var_costs, numeric_column
+from modules.irr import solve_irr
+from modules.portfolio import cash_flow_matrix, evaluate_portfolio
+from modules.timegrid import project_grid
+
+DEFAULT_MAX_BATCH_SIZE = int(os.environ.get('ECONOMIC_SCORING_BATCH', 256))
+DEFAULT_MAX_WAIT_MS = float(os.environ.get('ECONOMIC_SCORING_WAIT_MS', 5))
+LATENCY_WINDOW = 10000
+
+def _aligned(table):
+    """
+    Таблица как словарь столбцов. Если столбцы-словари (формат DataFrame.to_dict())
+    имеют разные ключи или разный их порядок, строки выравниваются по ключам
+    через DataFrame, как в engine.calculate_project; иначе таблица не копируется.
+    """
+    if not isinstance(table, dict):
+        return table
+    keys = [list(values.keys()) if isinstance(values, dict) else None for values in table.values()]
+    if any(k is not None and k != keys[0] for k in keys):
+        return pd.DataFrame(table)
+    return table
+
+def project_arrays(project_data):
+    """
+    Ряды проекта без построения DataFrame: CF, капитальные затраты и показатели
+    степени дисконтирования. Столбцы приводятся к числам и переменные затраты
+    считаются функциями расчетного ядра, поэтому результат совпадает с
+    engine.calculate_project.
+    """
+    yearly_data = _aligned(project_data['yearly_data'])
+    yearly = {col: numeric_column(yearly_data[col]) for col in YEARLY_COLUMNS}
+    n_periods = len(yearly['Выручка'])
+    grid = project_grid(project_data, n_periods)
+    var_total = calculate_var_costs(_aligned(project_data['var_costs']), project_data['coefficients'], n_periods, grid)
+
+    cfo = calculate_cf(yearly['Выручка'], yearly['Фиксированные операционные затраты'], var_total)
+    return {
+        'cf': cfo + -yearly['Капитальные затраты'],
+        'capex': np.nansum(yearly['Капитальные затраты']),
+        'periods_per_year': grid.periods_per_year,
+        'times': grid.times,
+        'irr_times': grid.irr_times,
+        'discount_rate': float(project_data['discount_rate']),
+        'impact_duration': int(project_data['impact_duration'])
+    }
+
+def _finite(value):
+    return None if value is None or not np.isfinite(value) else float(value)
+
+def score_batch(projects):
+    """
+    Оценка пакета проектов за один векторный проход.
+    Возвращает список словарей NPV, IRR, срока окупаемости и индекса прибыльности
+    (или {'error': ...} для проектов с некорректными данными).
+    """
+    results = [None] * len(projects)
+    prepared = []
+    for i, project_data in enumerate(projects):
+        try:
+            prepared.append((i, project_arrays(project_data)))
+        except Exception as e:
+            results[i] = {'error': f"{type(e).__name__}: {e}"}
+    if not prepared:
+        return results
+
+    positions = [i for i, _ in prepared]
+    arrays = [a for _, a in prepared]
+    cf = cash_flow_matrix([a['cf'] for a in arrays])
+    times = cash_flow_matrix([a['times'] for a in arrays])
+    irr_times = cash_flow_matrix([a['irr_times'] for a in arrays])
+    evaluation = evaluate_portfolio(cf, [a['discount_rate'] for a in arrays], [a['impact_duration'] for a in arrays],
+                                    [a['capex'] for a in arrays], times=times)
+    # IRR не определен для рядов короче двух периодов и нулевых рядов, как в calculate_irr
+    irr = solve_irr(cf, times=irr_times)
+    defined = (np.sum(~np.isnan(cf), axis=1) >= 2) & np.any(np.nan_to_num(cf) != 0, axis=1)
+    irr = np.where(defined, irr, np.nan)
+
+    # Срок окупаемости в годах, как на странице результатов
+    payback_period = evaluation['payback_period'] / np.array([a['periods_per_year'] for a in arrays])
+
+    for k, i in enumerate(positions):
+        results[i] = {
+            'npv': float(evaluation['npv'][k]),
+            'irr': _finite(irr[k]),
+            'payback_period': _finite(payback_period[k]),
+            'profitability_index': _finite(evaluation['profitability_index'][k])
+        }
+    return results
+
+class MicroBatcher:
+    """
+    Объединение одновременных запросов в пакеты: пакет отправляется на оценку,
+    когда набрано max_batch_size запросов или прошло max_wait_ms с первого
+    запроса пакета. Оценку выполняет один фоновый поток.
+    """
+
+    def __init__(self, score=score_batch, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.score = score
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._completed = deque(maxlen=LATENCY_WINDOW)
+        self.requests = 0
+        self.batches = 0
+        self.errors = 0
+        self.started = time.time()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def submit(self, project_data):
+        """Ставит проект в очередь; возвращает Future с результатом оценки"""
+        future = Future()
+        self._queue.put((time.perf_counter(), project_data, future))
+        return future
+
+    def _collect(self):
+        first = self._queue.get()
+        batch = [first]
+        deadline = first[0] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            try:
+                results = self.score([project_data for _, project_data, _ in batch])
+            except Exception as e:
+                results = [{'error': f"{type(e).__name__}: {e}"}] * len(batch)
+            finished = time.perf_counter()
+            with self._lock:
+                self.batches += 1
+                self.requests += len(batch)
+                for (submitted, _, _), result in zip(batch, results):
+                    self._latencies.append(finished - submitted)
+                    self._completed.append(finished)
+                    self.errors += 'error' in result
+            for (_, _, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def metrics(self):
+        """Число запросов и пакетов, средний размер пакета, перцентили задержки и пропускная способность"""
+        with self._lock:
+            latencies = np.array(self._latencies) * 1e3
+            completed = np.array(self._completed)
+            requests, batches, errors = self.requests, self.batches, self.errors
+        now = time.perf_counter()
+        recent = completed[completed >= now - 10] if len(completed) else completed
+        percentiles = np.percentile(latencies, [50, 95, 99]) if len(latencies) else [np.nan] * 3
+        return {
+            'requests': requests,
+            'batches': batches,
+            'errors': errors,
+            'queue': self._queue.qsize(),
+            'mean_batch_size': requests / batches if batches else 0.0,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1e3,
+            'latency_ms': {'p50': _finite(percentiles[0]), 'p95': _finite(percentiles[1]),
+                           'p99': _finite(percentiles[2])},
+            'throughput_rps': len(recent) / 10,
+            'uptime_s': time.time() - self.started
+        }
+
+class ScoringHandler(BaseHTTPRequestHandler):
+    """
+    POST /score - проект в формате utils.load_from_excel или {"projects": [...]};
+    GET /metrics - метрики; GET /health - проверка доступности.
+    """
+    protocol_version = 'HTTP/1.1'
+    batcher = None
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/metrics':
+            self._send(200, self.batcher.metrics())
+        elif self.path == '/health':
+            self._send(200, {'status': 'ok'})
+        else:
+            self._send(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if self.path != '/score':
+            self._send(404, {'error': 'not found'})
+            return
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        except ValueError as e:
+            self._send(400, {'error': f"некорректный JSON: {e}"})
+            return
+        if isinstance(payload, dict) and 'projects' in payload:
+            projects = payload['projects']
+            if not isinstance(projects, list) or not all(isinstance(p, dict) for p in projects):
+                self._send(400, {'error': "'projects' должен быть списком объектов с данными проектов"})
+                return
+            futures = [self.batcher.submit(project_data) for project_data in projects]
+            self._send(200, {'results': [future.result() for future in futures]})
+            return
+        result = self.batcher.submit(payload).result()
+        self._send(400 if 'error' in result else 200, result)
+
+    def log_message(self, format, *args):
+        pass
+
+def make_server(host='127.0.0.1', port=8765, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+    """HTTP-сервер оценки с собственным объединителем запросов"""
+    handler = type('Handler', (ScoringHandler,), {
+        'batcher': MicroBatcher(max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сервис оценки NPV/IRR проектов")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--max-batch-size', type=int, default=DEFAULT_MAX_BATCH_SIZE)
+    parser.add_argument('--max-wait-ms', type=float, default=DEFAULT_MAX_WAIT_MS)
+    args = parser.parse_args()
+    server = make_server(args.host, args.port, args.max_batch_size, args.max_wait_ms)
+    print(f"Сервис оценки: http://{args.host}:{args.port}/score")
+    server.serve_forever()
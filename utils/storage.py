@@ -0,0 +1,297 @@
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+DB_PATH = os.environ.get('ECONOMIC_DB_PATH',
+                         os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'project_data.db'))
+PAGE_SIZE = 50
+PACK_MAGIC = b'EFR1'
+
+# Таблицы базы: имя -> определение столбцов. Таблицы pack_frame хранятся в столбцах BLOB
+TABLES = {
+    'projects': '''(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            project_duration INTEGER NOT NULL,
+            impact_duration INTEGER NOT NULL,
+            discount_rate REAL NOT NULL,
+            yearly_data BLOB NOT NULL,
+            coefficients TEXT NOT NULL,
+            var_costs BLOB NOT NULL,
+            created_at TEXT NOT NULL,
+            frequency TEXT NOT NULL DEFAULT 'Год',
+            start_date TEXT
+        )''',
+    'calculations': '''(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            project_id INTEGER NOT NULL,
+            npv REAL NOT NULL,
+            df BLOB NOT NULL,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY (project_id) REFERENCES projects (id)
+        )''',
+    'scenarios': '''(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            project_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            delta TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            UNIQUE (project_id, name),
+            FOREIGN KEY (project_id) REFERENCES projects (id)
+        )''',
+}
+SCHEMA = [f'CREATE TABLE IF NOT EXISTS {name} {columns}' for name, columns in TABLES.items()]
+INDEXES = ['CREATE INDEX IF NOT EXISTS idx_calculations_project_id ON calculations (project_id)']
+# Столбцы, добавленные после создания схемы: (таблица, столбец, определение)
+MIGRATIONS = [
+    ('projects', 'frequency', "TEXT NOT NULL DEFAULT 'Год'"),
+    ('projects', 'start_date', 'TEXT'),
+]
+# Столбцы pack_frame, объявленные TEXT в базах, созданных до перехода на двоичный формат
+BLOB_COLUMNS = {'projects': ('yearly_data', 'var_costs'), 'calculations': ('df',)}
+
+_connections = {}
+_connections_lock = threading.Lock()
+_write_lock = threading.Lock()
+
+def get_connection(path=DB_PATH):
+    """
+    Соединение с базой, одно на процесс и файл базы.
+    Включается журнал WAL, чтобы чтение не блокировалось записью.
+    """
+    key = (os.getpid(), os.path.abspath(path))
+    with _connections_lock:
+        conn = _connections.get(key)
+        if conn is None:
+            conn = sqlite3.connect(path, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            with conn:
+                for statement in SCHEMA:
+                    conn.execute(statement)
+                _migrate(conn)
+                for statement in INDEXES:
+                    conn.execute(statement)
+            _connections[key] = conn
+        return conn
+
+def _migrate(conn):
+    """Добавляет в существующую базу столбцы из MIGRATIONS и объявляет столбцы BLOB_COLUMNS как BLOB"""
+    for table, column, definition in MIGRATIONS:
+        existing = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+        if column not in existing:
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+    for table, columns in BLOB_COLUMNS.items():
+        declared = {row[1]: row[2] for row in conn.execute(f'PRAGMA table_info({table})')}
+        if any(declared[column].upper() != 'BLOB' for column in columns):
+            _rebuild(conn, table)
+
+def _rebuild(conn, table):
+    """
+    Пересоздание таблицы по TABLES с копированием строк: SQLite не меняет тип
+    объявленного столбца. Индексы создаются заново после миграции (INDEXES).
+    """
+    columns = ', '.join(row[1] for row in conn.execute(f'PRAGMA table_info({table})'))
+    conn.execute(f'CREATE TABLE {table}_new {TABLES[table]}')
+    conn.execute(f'INSERT INTO {table}_new ({columns}) SELECT {columns} FROM {table}')
+    conn.execute(f'DROP TABLE {table}')
+    conn.execute(f'ALTER TABLE {table}_new RENAME TO {table}')
+
+def _frame_arrays(data):
+    """Индекс и столбцы таблицы как массивы без построения DataFrame для словарей"""
+    if isinstance(data, pd.DataFrame):
+        return list(data.columns), data.index.to_numpy(), [data[col].to_numpy() for col in data.columns]
+    columns = list(data)
+    index = list(data[columns[0]]) if columns else []
+    return columns, np.asarray(index), [np.asarray([data[col].get(i) for i in index]) for col in columns]
+
+def _column_array(values):
+    array = np.asarray(values)
+    if array.dtype.kind not in 'biuf':
+        array = array.astype(str)
+    return np.ascontiguousarray(array)
+
+def pack_frame(data):
+    """
+    Компактное двоичное представление таблицы (DataFrame или словаря столбцов):
+    JSON-заголовок с именами и типами столбцов, затем сырые байты массивов
+    numpy, все сжато zlib. Нечисловые столбцы сохраняются строками, pickle не используется.
+    """
+    columns, index, arrays = _frame_arrays(data)
+    arrays = [_column_array(index)] + [_column_array(a) for a in arrays]
+    header = json.dumps({
+        'columns': [str(c) for c in columns],
+        'dtypes': [a.dtype.str for a in arrays],
+        'length': len(index)
+    }, ensure_ascii=False).encode('utf-8')
+    payload = b''.join([len(header).to_bytes(4, 'little'), header] + [a.tobytes() for a in arrays])
+    return PACK_MAGIC + zlib.compress(payload, 1)
+
+def unpack_frame(blob):
+    """Восстановление DataFrame из pack_frame (или из JSON старых записей)"""
+    if isinstance(blob, str):
+        return pd.DataFrame(json.loads(blob))
+    payload = zlib.decompress(blob[len(PACK_MAGIC):])
+    header_size = int.from_bytes(payload[:4], 'little')
+    header = json.loads(payload[4:4 + header_size].decode('utf-8'))
+    offset = 4 + header_size
+    arrays = []
+    for dtype in header['dtypes']:
+        dtype = np.dtype(dtype)
+        arrays.append(np.frombuffer(payload, dtype=dtype, count=header['length'], offset=offset))
+        offset += dtype.itemsize * header['length']
+    return pd.DataFrame(dict(zip(header['columns'], arrays[1:])), index=arrays[0], columns=header['columns'])
+
+def _project_row(name, project_data, created_at):
+    return (
+        str(name),
+        int(project_data['project_duration']),
+        int(project_data['impact_duration']),
+        float(project_data['discount_rate']),
+        pack_frame(project_data['yearly_data']),
+        json.dumps({k: float(v) for k, v in project_data['coefficients'].items()}, ensure_ascii=False),
+        pack_frame(project_data['var_costs']),
+        created_at,
+        project_data.get('frequency') or 'Год',
+        _date_text(project_data.get('start_date'))
+    )
+
+def _date_text(value):
+    if value is None or isinstance(value, float) and np.isnan(value):
+        return None
+    return pd.Timestamp(value).date().isoformat()
+
+def _calculation_row(project_id, results, created_at):
+    return (int(project_id), float(results['npv']), pack_frame(results['df']), created_at)
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+PROJECT_INSERT = '''INSERT INTO projects (name, project_duration, impact_duration, discount_rate,
+                     yearly_data, coefficients, var_costs, created_at, frequency, start_date)
+                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'''
+CALCULATION_INSERT = 'INSERT INTO calculations (project_id, npv, df, created_at) VALUES (?, ?, ?, ?)'
+
+def save_project(name, project_data, path=DB_PATH):
+    """Сохраняет проект и возвращает его id"""
+    conn = get_connection(path)
+    with _write_lock, conn:
+        cursor = conn.execute(PROJECT_INSERT, _project_row(name, project_data, _now()))
+    return cursor.lastrowid
+
+def save_projects(projects, path=DB_PATH):
+    """Пакетное сохранение проектов [(name, project_data), ...] в одной транзакции"""
+    created_at = _now()
+    rows = (_project_row(name, project_data, created_at) for name, project_data in projects)
+    conn = get_connection(path)
+    with _write_lock, conn:
+        cursor = conn.executemany(PROJECT_INSERT, rows)
+    return cursor.rowcount
+
+def load_project(project_id, path=DB_PATH):
+    """Загружает проект в том же виде, что и utils.load_from_excel; None, если проекта нет"""
+    row = get_connection(path).execute(
+        '''SELECT name, project_duration, impact_duration, discount_rate, yearly_data, coefficients, var_costs,
+                  frequency, start_date
+           FROM projects WHERE id = ?''', (int(project_id),)).fetchone()
+    if row is None:
+        return None
+    (_, project_duration, impact_duration, discount_rate, yearly_data, coefficients, var_costs,
+     frequency, start_date) = row
+    return {
+        'project_duration': project_duration,
+        'impact_duration': impact_duration,
+        'discount_rate': discount_rate,
+        'frequency': frequency,
+        'start_date': start_date,
+        'yearly_data': unpack_frame(yearly_data).to_dict(),
+        'coefficients': json.loads(coefficients),
+        'var_costs': unpack_frame(var_costs).to_dict()
+    }
+
+def save_calculation(project_id, results, path=DB_PATH):
+    """Сохраняет снимок расчета проекта и возвращает его id"""
+    conn = get_connection(path)
+    with _write_lock, conn:
+        cursor = conn.execute(CALCULATION_INSERT, _calculation_row(project_id, results, _now()))
+    return cursor.lastrowid
+
+def save_calculations(calculations, path=DB_PATH):
+    """Пакетное сохранение расчетов [(project_id, results), ...] в одной транзакции"""
+    created_at = _now()
+    rows = (_calculation_row(project_id, results, created_at) for project_id, results in calculations)
+    conn = get_connection(path)
+    with _write_lock, conn:
+        cursor = conn.executemany(CALCULATION_INSERT, rows)
+    return cursor.rowcount
+
+def load_calculation(calculation_id, path=DB_PATH):
+    """Загружает снимок расчета: {'project_id', 'npv', 'df'}; None, если расчета нет"""
+    row = get_connection(path).execute(
+        'SELECT project_id, npv, df FROM calculations WHERE id = ?', (int(calculation_id),)).fetchone()
+    if row is None:
+        return None
+    return {'project_id': row[0], 'npv': row[1], 'df': unpack_frame(row[2])}
+
+def list_projects(limit=PAGE_SIZE, before_id=None, path=DB_PATH):
+    """
+    Страница списка проектов, новые сначала. Для следующей страницы передается
+    before_id = наименьший id текущей страницы (постраничный вывод по ключу).
+    """
+    query = 'SELECT id, name, project_duration, impact_duration, discount_rate, created_at FROM projects'
+    params = []
+    if before_id is not None:
+        query += ' WHERE id < ?'
+        params.append(int(before_id))
+    query += ' ORDER BY id DESC LIMIT ?'
+    params.append(int(limit))
+    rows = get_connection(path).execute(query, params).fetchall()
+    return pd.DataFrame(rows, columns=['id', 'Название', 'Срок проекта', 'Срок влияния',
+                                       'Ставка дисконтирования', 'Создан'])
+
+def list_calculations(project_id=None, limit=PAGE_SIZE, before_id=None, path=DB_PATH):
+    """Страница истории расчетов (всех или одного проекта), новые сначала"""
+    query = 'SELECT id, project_id, npv, created_at FROM calculations'
+    conditions = []
+    params = []
+    if project_id is not None:
+        conditions.append('project_id = ?')
+        params.append(int(project_id))
+    if before_id is not None:
+        conditions.append('id < ?')
+        params.append(int(before_id))
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    query += ' ORDER BY id DESC LIMIT ?'
+    params.append(int(limit))
+    rows = get_connection(path).execute(query, params).fetchall()
+    return pd.DataFrame(rows, columns=['id', 'Проект', 'NPV', 'Создан'])
+
+def save_scenario(project_id, name, delta, path=DB_PATH):
+    """
+    Сохраняет сценарий проекта - отличия от базовых данных (см. modules.scenarios)
+    в JSON; сценарий с тем же именем заменяется.
+    """
+    conn = get_connection(path)
+    with _write_lock, conn:
+        cursor = conn.execute(
+            'INSERT OR REPLACE INTO scenarios (project_id, name, delta, created_at) VALUES (?, ?, ?, ?)',
+            (int(project_id), str(name), json.dumps(delta, ensure_ascii=False, default=float), _now()))
+    return cursor.lastrowid
+
+def load_scenarios(project_id, path=DB_PATH):
+    """Сценарии проекта: {имя: отличия} в порядке создания"""
+    rows = get_connection(path).execute(
+        'SELECT name, delta FROM scenarios WHERE project_id = ? ORDER BY id', (int(project_id),)).fetchall()
+    return {name: json.loads(delta) for name, delta in rows}
+
+def delete_scenario(project_id, name, path=DB_PATH):
+    conn = get_connection(path)
+    with _write_lock, conn:
+        conn.execute('DELETE FROM scenarios WHERE project_id = ? AND name = ?', (int(project_id), str(name)))
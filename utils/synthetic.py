@@ -0,0 +1,268 @@
+import argparse
+import os
+import sys
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+# При запуске файлом (python utils/synthetic.py) первым в пути поиска стоит каталог utils,
+# где utils/utils.py заслоняет пакет utils; он заменяется корнем репозитория
+_HERE = os.path.dirname(os.path.abspath(__file__))
+if sys.path and os.path.abspath(sys.path[0] or os.curdir) == _HERE:
+    sys.path[0] = os.path.dirname(_HERE)
+
+from modules.monte_carlo import DISTRIBUTIONS, from_normal
+from modules.timegrid import FREQUENCIES, DEFAULT_FREQUENCY
+from utils import export
+
+# Распределения величин по умолчанию - те же диапазоны, что у тестовых данных
+# страницы ввода. Суммы по годам задаются за год для проекта из len(SPECIALISTS)
+# строк: они делятся на число периодов года и масштабируются по числу строк.
+# Ставка специалиста тоже задается за год и делится на число периодов года
+DEFAULT_SPEC = {
+    'Выручка': {'dist': 'Равномерное', 'low': 1_000_000, 'high': 5_000_000},
+    'Фиксированные операционные затраты': {'dist': 'Равномерное', 'low': 500_000, 'high': 2_000_000},
+    'Капитальные затраты': {'dist': 'Равномерное', 'low': 100_000, 'high': 1_000_000},
+    'Количество': {'dist': 'Равномерное', 'low': 1, 'high': 10},
+    'Ставка': {'dist': 'Равномерное', 'low': 50_000, 'high': 200_000},
+    'Процент индексирования': {'dist': 'Равномерное', 'low': 0.01, 'high': 0.1},
+    'Ставка дисконтирования': {'dist': 'Фиксированное', 'value': 0.1},
+}
+YEARLY_AMOUNTS = ['Выручка', 'Фиксированные операционные затраты', 'Капитальные затраты']
+COEFFICIENTS = {'K1': 1.0, 'K2': 1.2, 'K3': 1.5, 'K4': 1.3, 'K5': 1.1}
+SPECIALISTS = ['Методолог', 'Консультант', 'Архитектор', 'Подрядчик', 'Руководитель проекта', 'Стажер', 'Секретарь']
+IMPACT_YEARS = 3
+LINE_BLOCK = export.CHUNK_ROWS
+
+def _draw(value, rng):
+    """Число или диапазон (low, high) включительно - значение для одного проекта"""
+    if isinstance(value, (tuple, list)):
+        return int(rng.integers(value[0], value[1] + 1))
+    return int(value)
+
+def _sample(spec, size, rng):
+    if spec['dist'] not in DISTRIBUTIONS:
+        raise ValueError(f"Неизвестное распределение: {spec['dist']}")
+    return from_normal(spec, rng.standard_normal(size))
+
+def project_name(index):
+    return f"Проект {index + 1:06d}"
+
+def _line_names(start, stop, n_lines):
+    if n_lines <= len(SPECIALISTS):
+        return SPECIALISTS[start:stop]
+    return [f"{SPECIALISTS[i % len(SPECIALISTS)]} {i // len(SPECIALISTS) + 1}" for i in range(start, stop)]
+
+def project_header(index, seed=0, horizon=5, frequency=DEFAULT_FREQUENCY, n_lines=len(SPECIALISTS), spec=None,
+                   start_date=None):
+    """
+    Параметры, данные по периодам и коэффициенты проекта index без строк
+    переменных затрат (они строятся блоками в line_blocks).
+    horizon - срок в годах, n_lines - число строк специалистов; оба могут быть
+    диапазоном (low, high), тогда значение выбирается для каждого проекта.
+    Каждый проект получает собственный генератор от (seed, index), поэтому
+    проект не зависит от размера блоков и числа сгенерированных до него проектов.
+    """
+    if frequency not in FREQUENCIES:
+        raise ValueError(f"Неизвестная периодичность: {frequency}")
+    spec = dict(DEFAULT_SPEC, **(spec or {}))
+    rng = np.random.default_rng([seed, index])
+    horizon = max(_draw(horizon, rng), 1)
+    n_lines = max(_draw(n_lines, rng), 0)
+    periods_per_year = FREQUENCIES[frequency]
+    n_periods = horizon * periods_per_year
+    scale = max(n_lines, 1) / len(SPECIALISTS) / periods_per_year
+    yearly_data = pd.DataFrame({
+        col: np.maximum(np.round(_sample(spec[col], n_periods, rng) * scale), 0)
+        for col in YEARLY_AMOUNTS
+    }, index=range(1, n_periods + 1))
+    return {
+        'name': project_name(index),
+        'project_duration': horizon,
+        'impact_duration': min(IMPACT_YEARS, horizon) * periods_per_year,
+        'discount_rate': float(_sample(spec['Ставка дисконтирования'], 1, rng)[0]),
+        'frequency': frequency,
+        'start_date': start_date,
+        'yearly_data': yearly_data,
+        'coefficients': dict(COEFFICIENTS),
+        'n_lines': n_lines,
+        'spec': spec,
+        'seed': seed,
+        'index': index
+    }
+
+def _line_unit(header, unit):
+    """Строки переменных затрат с номерами unit * LINE_BLOCK ... от генератора (seed, index, unit + 1)"""
+    spec = header['spec']
+    n_lines = header['n_lines']
+    horizon = header['project_duration']
+    start = unit * LINE_BLOCK
+    stop = min(start + LINE_BLOCK, n_lines)
+    size = stop - start
+    rng = np.random.default_rng([header['seed'], header['index'], unit + 1])
+    # Диапазон ставки задан за год, а в расчете ставка - за период сетки
+    periods_per_year = FREQUENCIES[header['frequency']]
+    return pd.DataFrame({
+        'Коэффициент': rng.choice(list(COEFFICIENTS), size),
+        'Количество': np.maximum(np.round(_sample(spec['Количество'], size, rng)), 1),
+        'Ставка': np.maximum(np.round(_sample(spec['Ставка'], size, rng) / periods_per_year), 0),
+        'Количество лет': rng.integers(1, max(horizon, 2), size).astype(float),
+        'Процент индексирования': _sample(spec['Процент индексирования'], size, rng)
+    }, index=_line_names(start, stop, n_lines))
+
+def line_blocks(header, block_size=LINE_BLOCK):
+    """
+    Строки переменных затрат проекта блоками DataFrame по block_size строк.
+    Строки генерируются единицами по LINE_BLOCK строк от (seed, index, номер единицы)
+    и нарезаются на блоки, поэтому значения не зависят от размера блока, а в
+    памяти находится не больше одной единицы и одного блока.
+    """
+    pending = []
+    size = 0
+    for unit in range((header['n_lines'] + LINE_BLOCK - 1) // LINE_BLOCK):
+        pending.append(_line_unit(header, unit))
+        size += len(pending[-1])
+        while size >= block_size:
+            joined = pending[0] if len(pending) == 1 else pd.concat(pending)
+            yield joined.iloc[:block_size]
+            rest = joined.iloc[block_size:]
+            pending = [rest] if len(rest) else []
+            size = len(rest)
+    if size:
+        yield pending[0] if len(pending) == 1 else pd.concat(pending)
+
+def _project_data(header, var_costs):
+    keys = ('project_duration', 'impact_duration', 'discount_rate', 'frequency', 'start_date',
+            'yearly_data', 'coefficients')
+    return dict({key: header[key] for key in keys}, var_costs=var_costs)
+
+def _full_project(header):
+    blocks = list(line_blocks(header))
+    var_costs = pd.concat(blocks) if blocks else pd.DataFrame(columns=['Коэффициент', 'Количество', 'Ставка'])
+    return _project_data(header, var_costs)
+
+def generate_project(index=0, seed=0, **options):
+    """Синтетический проект в формате project_data (таблицы - DataFrame); options - см. project_header"""
+    return _full_project(project_header(index, seed, **options))
+
+def iter_projects(n_projects, seed=0, **options):
+    """Проекты портфеля по одному: пары (имя, project_data)"""
+    for index in range(n_projects):
+        header = project_header(index, seed, **options)
+        yield header['name'], _full_project(header)
+
+def write_workbooks(path, n_projects, seed=0, progress=None, **options):
+    """
+    Запись портфеля книгами в формате приложения (по одной на проект) в zip-архив
+    (путь с расширением .zip) или каталог; результат читается utils.bulk_import.
+    Книги пишутся потоково по одной, строки переменных затрат - блоками.
+    progress - функция (записано проектов, всего проектов).
+    """
+    archive = zipfile.ZipFile(path, 'w', zipfile.ZIP_STORED, allowZip64=True) if path.lower().endswith('.zip') else None
+    if archive is None:
+        os.makedirs(path, exist_ok=True)
+    try:
+        for index in range(n_projects):
+            header = project_header(index, seed, **options)
+            project_data = _project_data(header, None)
+            filename = f"{header['name']}.xlsx"
+            if archive is None:
+                export.write_results_xlsx(os.path.join(path, filename), project_data,
+                                          var_cost_chunks=line_blocks(header))
+            else:
+                # xlsx уже сжат, поэтому книги хранятся в архиве без повторного сжатия
+                with archive.open(filename, 'w', force_zip64=True) as f:
+                    export.write_results_xlsx(f, project_data, var_cost_chunks=line_blocks(header))
+            if progress is not None:
+                progress(index + 1, n_projects)
+    finally:
+        if archive is not None:
+            archive.close()
+    return path
+
+def _columnar_frames(header, block_size):
+    """Строки трех таблиц колоночного формата для одного проекта"""
+    name = header['name']
+    project = pd.DataFrame([{
+        'Проект': name,
+        'Срок проекта': header['project_duration'],
+        'Срок влияния': header['impact_duration'],
+        'Ставка дисконтирования': header['discount_rate'],
+        'Периодичность': header['frequency'],
+        'Дата начала': None if header['start_date'] is None else pd.Timestamp(header['start_date']),
+        **header['coefficients']
+    }])
+    periods = header['yearly_data'].rename_axis('Период').reset_index()
+    periods.insert(0, 'Проект', name)
+    yield 'projects', project
+    yield 'periods', periods
+    for block in line_blocks(header, block_size):
+        block = block.rename_axis('Специалист').reset_index()
+        block.insert(0, 'Проект', name)
+        yield 'var_costs', block
+
+def write_columnar(path, n_projects, seed=0, chunk_rows=export.CHUNK_ROWS, progress=None, **options):
+    """
+    Запись портфеля в колоночном формате: каталог с файлами Parquet projects.parquet
+    (параметры и коэффициенты), periods.parquet (данные по периодам) и
+    var_costs.parquet (строки специалистов), связанными столбцом 'Проект'.
+    Строки копятся до chunk_rows и записываются группой строк, поэтому память
+    ограничена размером блока (и LINE_BLOCK) при любом числе проектов и строк.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Для записи в Parquet установите пакет pyarrow")
+    os.makedirs(path, exist_ok=True)
+    tables = ('projects', 'periods', 'var_costs')
+    buffers = {table: [] for table in tables}
+    sizes = dict.fromkeys(tables, 0)
+    writers = {}
+
+    def flush(table):
+        if not buffers[table]:
+            return
+        chunk = pa.Table.from_pandas(pd.concat(buffers[table], ignore_index=True), preserve_index=False)
+        if table not in writers:
+            writers[table] = pq.ParquetWriter(os.path.join(path, f"{table}.parquet"), chunk.schema)
+        writers[table].write_table(chunk.cast(writers[table].schema))
+        buffers[table].clear()
+        sizes[table] = 0
+
+    try:
+        for index in range(n_projects):
+            header = project_header(index, seed, **options)
+            for table, frame in _columnar_frames(header, chunk_rows):
+                buffers[table].append(frame)
+                sizes[table] += len(frame)
+                if sizes[table] >= chunk_rows:
+                    flush(table)
+            if progress is not None:
+                progress(index + 1, n_projects)
+        for table in tables:
+            flush(table)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return path
+
+def _range(values):
+    return values[0] if len(values) == 1 else tuple(values)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Генерация синтетического портфеля проектов")
+    parser.add_argument('path', help="zip-архив или каталог книг; каталог Parquet для --format parquet")
+    parser.add_argument('--projects', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--horizon', type=int, nargs='+', default=[5], help="срок в годах или диапазон")
+    parser.add_argument('--frequency', choices=list(FREQUENCIES), default=DEFAULT_FREQUENCY)
+    parser.add_argument('--lines', type=int, nargs='+', default=[len(SPECIALISTS)], help="число строк или диапазон")
+    parser.add_argument('--format', choices=['xlsx', 'parquet'], default='xlsx')
+    args = parser.parse_args()
+    options = {'horizon': _range(args.horizon), 'frequency': args.frequency, 'n_lines': _range(args.lines)}
+    writer = write_columnar if args.format == 'parquet' else write_workbooks
+    writer(args.path, args.projects, args.seed,
+           progress=lambda done, total: print(f"\r{done}/{total}", end='', flush=True), **options)
+    print(f"\nПортфель записан: {args.path}")
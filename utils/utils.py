@@ -2,40 +2,25 @@ import pandas as pd
 import streamlit as st
 from io import BytesIO
 import numpy as np
+from utils import profiling
 
-def save_to_excel(data, filename="project_data.xlsx"):
+@profiling.timed('excel.save')
+def save_to_excel(data, filename="project_data.xlsx", results=None):
     """
     Сохраняет данные проекта в Excel файл
     """
-    output = BytesIO()
-    writer = pd.ExcelWriter(output, engine='xlsxwriter')
-
-    # Сохраняем основные параметры проекта
-    pd.DataFrame([{
-        'Срок проекта': data['project_duration'],
-        'Срок влияния': data['impact_duration'],
-        'Ставка дисконтирования': data['discount_rate']
-    }]).to_excel(writer, sheet_name='Параметры проекта', index=False)
-
-    # Сохраняем данные по годам
-    pd.DataFrame(data['yearly_data']).to_excel(writer, sheet_name='Данные по годам')
-
-    # Сохраняем коэффициенты
-    pd.DataFrame([data['coefficients']]).to_excel(writer, sheet_name='Коэффициенты', index=False)
-
-    # Сохраняем переменные операционные затраты
-    pd.DataFrame(data['var_costs']).to_excel(writer, sheet_name='Переменные затраты')
-
-    # Если есть результаты расчетов, сохраняем их
-    if 'calculation_results' in st.session_state:
+    # Если результаты не переданы явно, берем результаты текущей сессии
+    if results is None and 'calculation_results' in st.session_state:
         results = st.session_state['calculation_results']
-        results['df'].to_excel(writer, sheet_name='Результаты расчетов')
-        pd.DataFrame([{'NPV': results['npv']}]).to_excel(writer, sheet_name='Итоговые показатели', index=False)
 
-    writer.close()
+    from utils import export
+
+    output = BytesIO()
+    export.write_results_xlsx(output, data, results)
     processed_data = output.getvalue()
     return processed_data
 
+@profiling.timed('excel.load')
 def load_from_excel(uploaded_file):
     """
     Загружает данные проекта из Excel файла
@@ -58,6 +43,8 @@ def load_from_excel(uploaded_file):
         'project_duration': params['Срок проекта'],
         'impact_duration': params['Срок влияния'],
         'discount_rate': params['Ставка дисконтирования'],
+        'frequency': params.get('Периодичность', 'Год'),
+        'start_date': None if pd.isna(params.get('Дата начала')) else params['Дата начала'],
         'yearly_data': yearly_data,
         'coefficients': coefficients,
         'var_costs': var_costs
@@ -76,27 +63,29 @@ def format_number(number):
     else:
         return f"{number:.2f}"
 
-def generate_test_excel(filename="test_project_data.xlsx"):
+def generate_test_excel(filename="test_project_data.xlsx", seed=None):
     """
     Генерирует тестовый Excel файл с примерными данными проекта
+    (при заданном seed - воспроизводимыми)
     """
+    rng = np.random.default_rng(seed)
     project_duration = 5
     impact_duration = 3
     discount_rate = 0.1
 
     # Генерация тестовых данных по годам
     yearly_data = pd.DataFrame({
-        'Выручка': np.random.randint(1000000, 5000000, project_duration),
-        'Фиксированные операционные затраты': np.random.randint(500000, 2000000, project_duration),
-        'Капитальные затраты': np.random.randint(100000, 1000000, project_duration)
+        'Выручка': rng.integers(1000000, 5000000, project_duration),
+        'Фиксированные операционные затраты': rng.integers(500000, 2000000, project_duration),
+        'Капитальные затраты': rng.integers(100000, 1000000, project_duration)
     }, index=range(1, project_duration + 1))
 
     # Генерация тестовых данных для переменных операционных затрат
     specialists = ['Методолог', 'Консультант', 'Архитектор', 'Подрядчик', 'Руководитель проекта', 'Стажер', 'Секретарь']
     var_costs = pd.DataFrame({
         'Коэффициент': ['K1', 'K2', 'K3', 'K4', 'K5', 'K1', 'K2'],
-        'Количество': np.random.randint(1, 10, 7),
-        'Ставка': np.random.randint(50000, 200000, 7)
+        'Количество': rng.integers(1, 10, 7),
+        'Ставка': rng.integers(50000, 200000, 7)
     }, index=specialists)
 
     # Создаем тестовые данные проекта
@@ -138,5 +127,41 @@ def generate_test_excel(filename="test_project_data.xlsx"):
 
     return filename
 
-# Генерируем тестовый Excel файл
-generate_test_excel()
+def job_panel(job_id):
+    """
+    Прогресс фоновой задачи с кнопкой отмены. Пока задача выполняется, панель
+    обновляется раз в секунду без перезапуска страницы; после завершения
+    страница перезапускается, чтобы забрать результат.
+    Возвращает состояние задачи (см. utils.jobs.status).
+    """
+    from utils import jobs
+
+    state = jobs.status(job_id)
+    if state is None or state['state'] in jobs.FINISHED_STATES:
+        return state
+
+    @st.fragment(run_every=1.0)
+    def poll():
+        current = jobs.status(job_id)
+        if current is None or current['state'] in jobs.FINISHED_STATES:
+            st.rerun()
+        label = "В очереди" if current['state'] == jobs.PENDING else current.get('message') or "Выполняется"
+        st.progress(current.get('progress', 0.0), text=f"{current.get('title', '')}: {label}")
+        if st.button("Отменить", key=f"cancel_{job_id}"):
+            jobs.cancel(job_id)
+            st.rerun()
+
+    poll()
+    return state
+
+def paginated_table(frame, key, page_size=50):
+    """Таблица по страницам: на странице выводится только page_size строк"""
+    n_pages = max((len(frame) + page_size - 1) // page_size, 1)
+    page = 1
+    if n_pages > 1:
+        page = st.number_input(f"Страница (из {n_pages})", min_value=1, max_value=n_pages, value=1, step=1,
+                               key=f"{key}_page")
+    start = (int(page) - 1) * page_size
+    st.dataframe(frame.iloc[start:start + page_size])
+    if n_pages > 1:
+        st.caption(f"Строки {start + 1}-{min(start + page_size, len(frame))} из {len(frame)}")